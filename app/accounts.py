@@ -0,0 +1,408 @@
+import os
+import shutil
+import zipfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+import orjson
+from sqlalchemy import Select, delete, select, update
+from sqlalchemy.orm import Session
+
+from app.avatars import avatar_files
+from app.config import settings
+from app.enums import AccountJobType, JobStatus, ReactionType
+from app.models import (
+    AccountJob,
+    Comment,
+    CommentReaction,
+    Post,
+    PostFile,
+    PostReaction,
+    Report,
+    Tag,
+    User,
+    Vault,
+    post_tag,
+    post_vault,
+)
+from app.moderation import remove_reports
+from app.reactions import reaction_delta, update_post_counters
+from app.user_stats import invalidate_profiles
+from app.utils import delete_comments, delete_posts, queue_file_deletions
+
+EXPORT_FOLDER = "exports"
+
+
+def select_chunk(db: Session, query: Select, id_column, after_id: int) -> list:
+    return db.execute(
+        query.where(id_column > after_id)
+        .order_by(id_column)
+        .limit(settings.ACCOUNT_JOB_CHUNK_SIZE)
+    ).all()
+
+
+def user_chunk(db: Session, job: AccountJob, model, *columns) -> list:
+    return select_chunk(
+        db,
+        select(model.id, *columns).where(model.user_id == job.user_id),
+        model.id,
+        job.cursor,
+    )
+
+
+"""
+Export stages
+"""
+
+
+def export_profile(db: Session, job: AccountJob) -> list[dict]:
+    query = select(
+        User.id,
+        User.username,
+        User.date_created,
+        User.post_count,
+        User.vault_count,
+        User.comment_count,
+        User.like_count,
+    ).where(User.id == job.user_id)
+    return [row._asdict() for row in select_chunk(db, query, User.id, job.cursor)]
+
+
+def export_posts(db: Session, job: AccountJob) -> list[dict]:
+    posts = [
+        row._asdict()
+        for row in user_chunk(
+            db,
+            job,
+            Post,
+            Post.date_created,
+            Post.title,
+            Post.like_count,
+            Post.dislike_count,
+        )
+    ]
+    tags = defaultdict(list)
+    if posts:
+        rows = db.execute(
+            select(post_tag.c.post_id, Tag.name)
+            .join(Tag, Tag.id == post_tag.c.tag_id)
+            .where(post_tag.c.post_id.in_([post["id"] for post in posts]))
+            .order_by(Tag.name)
+        )
+        for post_id, name in rows:
+            tags[post_id].append(name)
+    return [{**post, "tags": tags[post["id"]]} for post in posts]
+
+
+def media_name(post_id: int, filename: str) -> str:
+    return f"media/{post_id}/{filename}"
+
+
+def export_post_files(db: Session, job: AccountJob) -> list[dict]:
+    query = (
+        select(
+            PostFile.id,
+            PostFile.post_id,
+            PostFile.date_created,
+            PostFile.filename,
+            PostFile.content_type,
+            PostFile.size,
+            PostFile.width,
+            PostFile.height,
+        )
+        .join(Post)
+        .where(Post.user_id == job.user_id)
+    )
+    return [
+        {**row._asdict(), "media": media_name(row.post_id, row.filename)}
+        for row in select_chunk(db, query, PostFile.id, job.cursor)
+    ]
+
+
+def export_comments(db: Session, job: AccountJob) -> list[dict]:
+    return [
+        row._asdict()
+        for row in user_chunk(
+            db,
+            job,
+            Comment,
+            Comment.post_id,
+            Comment.parent_id,
+            Comment.content,
+            Comment.date_created,
+        )
+    ]
+
+
+def export_post_reactions(db: Session, job: AccountJob) -> list[dict]:
+    return [
+        row._asdict()
+        for row in user_chunk(
+            db,
+            job,
+            PostReaction,
+            PostReaction.post_id,
+            PostReaction.type,
+            PostReaction.date_created,
+        )
+    ]
+
+
+def export_comment_reactions(db: Session, job: AccountJob) -> list[dict]:
+    return [
+        row._asdict()
+        for row in user_chunk(
+            db,
+            job,
+            CommentReaction,
+            CommentReaction.comment_id,
+            CommentReaction.type,
+            CommentReaction.date_created,
+        )
+    ]
+
+
+def export_vaults(db: Session, job: AccountJob) -> list[dict]:
+    vaults = [
+        row._asdict()
+        for row in user_chunk(
+            db, job, Vault, Vault.title, Vault.privacy, Vault.date_created
+        )
+    ]
+    posts = defaultdict(list)
+    if vaults:
+        rows = db.execute(
+            select(post_vault.c.vault_id, post_vault.c.post_id)
+            .where(post_vault.c.vault_id.in_([vault["id"] for vault in vaults]))
+            .order_by(post_vault.c.vault_id, post_vault.c.date_added)
+        )
+        for vault_id, post_id in rows:
+            posts[vault_id].append(post_id)
+    return [{**vault, "post_ids": posts[vault["id"]]} for vault in vaults]
+
+
+def export_reports(db: Session, job: AccountJob) -> list[dict]:
+    return [
+        row._asdict()
+        for row in user_chunk(
+            db,
+            job,
+            Report,
+            Report.target_type,
+            Report.target_id,
+            Report.detail,
+            Report.date_created,
+        )
+    ]
+
+
+EXPORTS = {
+    "profile": export_profile,
+    "posts": export_posts,
+    "post_files": export_post_files,
+    "comments": export_comments,
+    "post_reactions": export_post_reactions,
+    "comment_reactions": export_comment_reactions,
+    "vaults": export_vaults,
+    "reports": export_reports,
+}
+
+
+def export_folder(job: AccountJob) -> str:
+    return os.path.join(settings.UPLOAD_FOLDER, EXPORT_FOLDER, str(job.id))
+
+
+def export_stage(export):
+    def run(db: Session, job: AccountJob) -> list[int]:
+        rows = export(db, job)
+        if rows:
+            path = os.path.join(export_folder(job), job.stage, f"{job.cursor:012d}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                for row in rows:
+                    f.write(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+            os.replace(f"{path}.tmp", f"{path}.jsonl")
+        return [row["id"] for row in rows]
+
+    return run
+
+
+def media_files(db: Session, job: AccountJob):
+    profile_picture = db.scalar(
+        select(User.profile_picture).where(User.id == job.user_id)
+    )
+    if profile_picture:
+        path = avatar_files(profile_picture)[-1]
+        yield f"profile/{os.path.basename(path)}", path
+
+    query = (
+        select(PostFile.id, PostFile.post_id, PostFile.filename, PostFile.file_path)
+        .join(Post)
+        .where(Post.user_id == job.user_id)
+    )
+    after_id = 0
+    while rows := select_chunk(db, query, PostFile.id, after_id):
+        for row in rows:
+            yield media_name(row.post_id, row.filename), row.file_path
+        after_id = rows[-1].id
+
+
+def build_archive(db: Session, job: AccountJob) -> list[int]:
+    folder = export_folder(job)
+    path = os.path.join(EXPORT_FOLDER, f"{job.id}.zip")
+    archive_path = os.path.join(settings.UPLOAD_FOLDER, path)
+
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    with zipfile.ZipFile(f"{archive_path}.tmp", "w", zipfile.ZIP_DEFLATED) as archive:
+        for stage in EXPORTS:
+            chunk_folder = os.path.join(folder, stage)
+            with archive.open(f"{stage}.jsonl", "w", force_zip64=True) as entry:
+                if not os.path.isdir(chunk_folder):
+                    continue
+                for name in sorted(os.listdir(chunk_folder)):
+                    with open(os.path.join(chunk_folder, name), "rb") as chunk:
+                        shutil.copyfileobj(chunk, entry)
+
+        for name, file_path in media_files(db, job):
+            file_path = os.path.join(settings.UPLOAD_FOLDER, file_path)
+            if os.path.exists(file_path):
+                archive.write(file_path, name, compress_type=zipfile.ZIP_STORED)
+
+    os.replace(f"{archive_path}.tmp", archive_path)
+    shutil.rmtree(folder, ignore_errors=True)
+    job.path = path
+    return []
+
+
+"""
+Deletion stages
+"""
+
+
+def delete_user_comment_reactions(db: Session, job: AccountJob) -> list[int]:
+    ids = [row.id for row in user_chunk(db, job, CommentReaction)]
+    if ids:
+        db.execute(delete(CommentReaction).where(CommentReaction.id.in_(ids)))
+    return ids
+
+
+def delete_user_post_reactions(db: Session, job: AccountJob) -> list[int]:
+    rows = user_chunk(db, job, PostReaction, PostReaction.post_id, PostReaction.type)
+    update_post_counters(
+        db,
+        {
+            row.post_id: reaction_delta(row.type, ReactionType.NONE)
+            for row in rows
+            if row.type != ReactionType.NONE
+        },
+    )
+    ids = [row.id for row in rows]
+    if ids:
+        db.execute(delete(PostReaction).where(PostReaction.id.in_(ids)))
+    return ids
+
+
+def delete_user_comments(db: Session, job: AccountJob) -> list[int]:
+    rows = user_chunk(db, job, Comment, Comment.parent_id, Comment.path)
+    if rows:
+        delete_comments(db, rows)
+    return [row.id for row in rows]
+
+
+def delete_user_vaults(db: Session, job: AccountJob) -> list[int]:
+    ids = [row.id for row in user_chunk(db, job, Vault)]
+    if ids:
+        db.execute(delete(Vault).where(Vault.id.in_(ids)))
+    return ids
+
+
+def delete_user_posts(db: Session, job: AccountJob) -> list[int]:
+    ids = [row.id for row in user_chunk(db, job, Post)]
+    if ids:
+        delete_posts(db, ids)
+    return ids
+
+
+def delete_user_reports(db: Session, job: AccountJob) -> list[int]:
+    rows = user_chunk(db, job, Report, Report.target_type, Report.target_id)
+    if rows:
+        remove_reports(db, rows)
+    return [row.id for row in rows]
+
+
+def delete_user(db: Session, job: AccountJob) -> list[int]:
+    paths = set(
+        db.scalars(
+            select(AccountJob.path).where(
+                AccountJob.user_id == job.user_id, AccountJob.path.is_not(None)
+            )
+        )
+    )
+    paths.update(
+        avatar_files(
+            db.scalar(select(User.profile_picture).where(User.id == job.user_id))
+        )
+    )
+    queue_file_deletions(db, {path for path in paths if path})
+    db.execute(
+        delete(AccountJob).where(
+            AccountJob.user_id == job.user_id, AccountJob.id != job.id
+        )
+    )
+    db.execute(delete(User).where(User.id == job.user_id))
+    invalidate_profiles(db, [job.user_id])
+    return []
+
+
+STAGES = {
+    AccountJobType.EXPORT: {
+        **{stage: export_stage(export) for stage, export in EXPORTS.items()},
+        "archive": build_archive,
+    },
+    AccountJobType.DELETE: {
+        "comment_reactions": delete_user_comment_reactions,
+        "post_reactions": delete_user_post_reactions,
+        "comments": delete_user_comments,
+        "vaults": delete_user_vaults,
+        "posts": delete_user_posts,
+        "reports": delete_user_reports,
+        "user": delete_user,
+    },
+}
+
+
+def first_stage(job_type: AccountJobType) -> str:
+    return next(iter(STAGES[job_type]))
+
+
+def advance_job(db: Session, job: AccountJob) -> bool:
+    stages = list(STAGES[job.type])
+    ids = STAGES[job.type][job.stage](db, job)
+    if ids:
+        job.cursor = ids[-1]
+        job.progress += len(ids)
+    elif job.stage == stages[-1]:
+        job.status = JobStatus.DONE
+        job.date_finished = datetime.now()
+    else:
+        job.stage = stages[stages.index(job.stage) + 1]
+        job.cursor = 0
+    job.locked_at = datetime.now()
+    db.commit()
+    return job.status == JobStatus.RUNNING
+
+
+def expire_exports(db: Session):
+    cutoff = datetime.now() - timedelta(seconds=settings.EXPORT_TTL_SECONDS)
+    expired = db.execute(
+        select(AccountJob.id, AccountJob.path).where(
+            AccountJob.path.is_not(None), AccountJob.date_finished < cutoff
+        )
+    ).all()
+    if expired:
+        queue_file_deletions(db, {path for _, path in expired})
+        db.execute(
+            update(AccountJob)
+            .where(AccountJob.id.in_([job_id for job_id, _ in expired]))
+            .values(path=None)
+        )
+    db.commit()
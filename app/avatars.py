@@ -0,0 +1,28 @@
+from app.config import settings
+
+AVATAR_FOLDER = "avatars"
+
+
+def is_avatar(profile_picture: str) -> bool:
+    return profile_picture.startswith(f"{AVATAR_FOLDER}/")
+
+
+def avatar_path(profile_picture: str, size: int) -> str:
+    return f"{profile_picture}/{size}.webp"
+
+
+def avatar_files(profile_picture: str) -> list[str]:
+    if not profile_picture:
+        return []
+    if is_avatar(profile_picture):
+        return [avatar_path(profile_picture, size) for size in settings.AVATAR_SIZES]
+    return [profile_picture]
+
+
+def avatar_url(username: str, profile_picture: str, size: int = None) -> str | None:
+    if not profile_picture:
+        return None
+    if is_avatar(profile_picture):
+        size = size or settings.AVATAR_SIZES[0]
+        return f"{settings.API_URL}/{avatar_path(profile_picture, size)}"
+    return f"{settings.API_URL}/users/{username}/profile-picture"
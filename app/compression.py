@@ -0,0 +1,106 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for item in header.replace(" ", "").lower().split(","):
+        encoding, _, quality = item.partition(";q=")
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding)
+    return encodings
+
+
+def choose_encoding(header: str) -> str | None:
+    encodings = accepted_encodings(header)
+    if brotli and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def create_compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    if content_type.startswith("text/event-stream"):
+        return False
+    return any(content_type.startswith(prefix) for prefix in settings.COMPRESS_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compress = finish = None
+
+        async def send_compressed(message):
+            nonlocal start, compress, finish
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compress is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    not is_compressible(headers)
+                    or not more_body
+                    and len(body) < settings.COMPRESS_MIN_SIZE
+                ):
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+
+                compress, finish = create_compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                if not more_body:
+                    body = compress(body) + finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+                await send(start)
+
+            body = compress(body)
+            if not more_body:
+                body += finish()
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -20,6 +20,91 @@ class Settings(BaseSettings):
         "video/avi",
         "video/mkv",
     ]
+    ANIMATED_IMAGE_TYPES: list = ["image/gif"]
+    PREVIEW_SIZE: int = 320
+    PREVIEW_FRAMES: int = 24
+    PREVIEW_FPS: int = 8
+    PREVIEW_BITRATE: str = "250k"
+    PLACEHOLDER_SIZE: int = 16
+    AVATAR_SIZES: list[int] = [40, 128, 512]
+    AVATAR_MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
+    AVATAR_QUALITY: int = 80
+    SIMILARITY_DISTANCE: int = 6
+    SIMILARITY_INDEX_REFRESH_SECONDS: int = 300
+    SIMILARITY_PENDING_INTERVAL_SECONDS: int = 10
+    SIMILARITY_INDEX_BATCH_SIZE: int = 500
+    TAG_INDEX_REFRESH_SECONDS: int = 300
+    RELATED_MAX_TAG_POSTS: int = 50000
+    FEED_MODEL_PATH: str = os.path.join(os.getcwd(), "models", "feed.npz")
+    FEED_MODEL_MAX_AGE: int = 3600
+    FEED_MAX_USER_LIKES: int = 200
+    FEED_PAIR_CHUNK_SIZE: int = 2_000_000
+    FEED_NEIGHBORS: int = 50
+    FEED_TOP_TAGS: int = 10
+    FEED_CANDIDATES: int = 500
+    FEED_TAG_WEIGHT: float = 0.5
+    FEED_POPULARITY_WEIGHT: float = 0.2
+    FEED_CACHE_SECONDS: int = 300
+    FEED_CACHE_SIZE: int = 10000
+    COMMENT_REPLY_PREVIEW: int = 3
+    COMMENT_MAX_DEPTH: int = 8
+    REACTION_WRITE_BEHIND: bool = False
+    REACTION_FLUSH_INTERVAL_MS: int = 500
+    REACTION_FLUSH_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_FLUSH_INTERVAL_MS: int = 2000
+    NOTIFICATION_FLUSH_BATCH_SIZE: int = 500
+    LIVE_BROKER: str = "memory"
+    LIVE_REDIS_URL: str = "redis://localhost:6379/0"
+    LIVE_QUEUE_SIZE: int = 32
+    LIVE_KEEPALIVE_SECONDS: float = 15.0
+    LIVE_RETRY_MS: int = 3000
+    LIVE_MAX_SECONDS: float = 300.0
+    LIVE_MAX_SUBSCRIBERS: int = 10000
+    METRICS_ENABLED: bool = True
+    ADMIN_USER_IDS: list[int] = []
+    PROFILE_DIR: str = os.path.join(os.getcwd(), "profiles")
+    MEDIA_QUEUE: bool = False
+    MEDIA_JOB_MAX_ATTEMPTS: int = 3
+    MEDIA_JOB_TIMEOUT_SECONDS: int = 600
+    MEDIA_WORKER_POLL_SECONDS: float = 1.0
+    FILE_DELETION_BATCH_SIZE: int = 500
+    FILE_DELETION_SECONDS: int = 300
+    ACCOUNT_JOB_CHUNK_SIZE: int = 500
+    ACCOUNT_JOB_MAX_ATTEMPTS: int = 3
+    EXPORT_TTL_SECONDS: int = 7 * 24 * 3600
+    COUNTER_RECONCILE_SECONDS: int = 3600
+    PROFILE_CACHE_SECONDS: int = 30
+    PROFILE_CACHE_SIZE: int = 10000
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_CAPACITY: int = 120
+    RATE_LIMIT_REFILL_PER_SECOND: float = 2.0
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_COSTS: dict[str, int] = {
+        "GET /posts?query": 5,
+        "POST /posts": 20,
+        "POST /posts/{post_id}/files": 20,
+        "POST /users/{username}/profile-picture": 10,
+        "POST /login": 10,
+        "POST /users": 10,
+        "POST /reports": 5,
+        "GET /posts:batch": 5,
+        "GET /posts:files": 5,
+        "POST /users:batch": 5,
+        "POST /users/{username}/export": 20,
+    }
+    CONCURRENCY_LIMITS: dict[str, int] = {
+        "GET /posts?query": 16,
+        "POST /posts": 4,
+        "POST /posts/{post_id}/files": 4,
+        "POST /users/{username}/profile-picture": 4,
+    }
+    COMPRESS_MIN_SIZE: int = 1024
+    COMPRESS_TYPES: list[str] = ["application/json", "text/"]
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    BATCH_MAX_SIZE: int = 100
 
     class Config:
         env_file = ".env"
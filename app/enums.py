@@ -23,3 +23,23 @@ class ReportType(str, Enum):
 class Privacy(str, Enum):
     PUBLIC = "public"
     PRIVATE = "private"
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    DONE = "done"
+
+
+class AccountJobType(str, Enum):
+    EXPORT = "export"
+    DELETE = "delete"
+
+
+class NotificationType(str, Enum):
+    POST_LIKE = "post_like"
+    POST_COMMENT = "post_comment"
+    POST_VAULT = "post_vault"
+    COMMENT_LIKE = "comment_like"
+    COMMENT_REPLY = "comment_reply"
@@ -0,0 +1,59 @@
+from hashlib import blake2b
+from starlette.datastructures import Headers, MutableHeaders
+
+
+def weak_etag(body: bytes) -> str:
+    return f'W/"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (
+        tag.removeprefix("W/") for tag in tags
+    )
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start = None
+
+        async def send_with_etag(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] == 200 and headers.get(
+                    "content-type", ""
+                ).startswith("application/json"):
+                    start = message
+                    return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, None
+            headers = MutableHeaders(raw=held["headers"])
+            if message.get("more_body", False):
+                await send(held)
+                await send(message)
+                return
+
+            etag = weak_etag(message.get("body", b""))
+            headers["ETag"] = etag
+            if if_none_match and etag_matches(etag, if_none_match):
+                del headers["Content-Length"]
+                del headers["Content-Type"]
+                await send({**held, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(held)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
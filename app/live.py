@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from collections import defaultdict
+from threading import Lock
+import orjson
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+KEEPALIVE = b": keepalive\n\n"
+
+
+def encode_event(event: str, data: dict) -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), orjson.dumps(data))
+
+
+def post_channel(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+class Subscription:
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.LIVE_QUEUE_SIZE)
+
+    def put(self, frame: bytes):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            frame = RESYNC
+        self.queue.put_nowait(frame)
+
+    async def get(self, timeout: float) -> bytes:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return KEEPALIVE
+
+
+class MemoryBroker:
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.count = 0
+        self.lock = Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, asyncio.get_running_loop())
+        with self.lock:
+            self.channels[channel].add(subscription)
+            self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscriptions = self.channels.get(subscription.channel, set())
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+                self.count -= 1
+            if not subscriptions:
+                self.channels.pop(subscription.channel, None)
+
+    def publish(self, channel: str, frame: bytes):
+        self.deliver(channel, frame)
+
+    def deliver(self, channel: str, frame: bytes):
+        with self.lock:
+            subscriptions = list(self.channels.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, frame)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+class RedisBroker(MemoryBroker):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{"live:*": self.receive})
+        self.thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, channel: str, frame: bytes):
+        self.client.publish(f"live:{channel}", frame)
+
+    def receive(self, message: dict):
+        self.deliver(message["channel"].decode().removeprefix("live:"), message["data"])
+
+
+def create_broker():
+    if settings.LIVE_BROKER == "redis":
+        import redis
+
+        return RedisBroker(redis.Redis.from_url(settings.LIVE_REDIS_URL))
+    return MemoryBroker()
+
+
+class LiveUpdates:
+    def __init__(self):
+        self.broker = None
+
+    def get_broker(self):
+        if self.broker is None:
+            self.broker = create_broker()
+        return self.broker
+
+    def publish(self, channel: str, event: str, data: dict):
+        try:
+            self.get_broker().publish(channel, encode_event(event, data))
+        except Exception:
+            logger.exception("Live update for %s failed", channel)
+
+    def is_full(self) -> bool:
+        return self.get_broker().count >= settings.LIVE_MAX_SUBSCRIBERS
+
+    async def stream(self, channel: str):
+        broker = self.get_broker()
+        subscription = broker.subscribe(channel)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.LIVE_MAX_SECONDS
+        try:
+            yield b"retry: %d\n\n" % settings.LIVE_RETRY_MS
+            while (remaining := deadline - loop.time()) > 0:
+                yield await subscription.get(
+                    min(remaining, settings.LIVE_KEEPALIVE_SECONDS)
+                )
+        finally:
+            broker.unsubscribe(subscription)
+
+
+live_updates = LiveUpdates()
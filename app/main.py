@@ -1,15 +1,53 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 
-from app.routers import post, auth, post_file, user, vault, comment, report, tag
+from app.routers import (
+    post,
+    auth,
+    post_file,
+    user,
+    vault,
+    comment,
+    report,
+    tag,
+    feed,
+    metrics,
+    account,
+    notification,
+    live,
+)
 from app.database import engine
-from app.models import Base
 from app.config import settings
+from app.compression import CompressionMiddleware
+from app.etag import ETagMiddleware
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.notifications import notification_buffer
+from app.ratelimit import RateLimitMiddleware
+from app.reactions import reaction_buffer
+from app.similarity import similarity_index
+from app.tag_index import tag_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+    if settings.REACTION_WRITE_BEHIND:
+        reaction_buffer.start()
+    notification_buffer.start()
+    tag_index.start()
+    similarity_index.start()
+    yield
+    reaction_buffer.stop()
+    notification_buffer.stop()
+    tag_index.stop()
+    similarity_index.stop()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(post.router)
 app.include_router(post_file.router)
 app.include_router(comment.router)
@@ -17,8 +55,14 @@ app.include_router(vault.router)
 app.include_router(user.router)
 app.include_router(report.router)
 app.include_router(tag.router)
+app.include_router(feed.router)
 app.include_router(auth.router)
+app.include_router(account.router)
+app.include_router(notification.router)
+app.include_router(live.router)
 
+app.add_middleware(ETagMiddleware)
+app.add_middleware(RateLimitMiddleware, routes=app.routes)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ORIGINS,
@@ -26,10 +70,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
-add_pagination(app)
-
-Base.metadata.create_all(bind=engine)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
 
-if not os.path.exists(settings.UPLOAD_FOLDER):
-    os.makedirs(settings.UPLOAD_FOLDER)
+add_pagination(app)
@@ -0,0 +1,79 @@
+import argparse
+import logging
+import time
+
+from app.accounts import expire_exports
+from app.config import settings
+from app.database import SessionLocal
+from app.reactions import reconcile_post_counters
+from app.recommender import save_model
+from app.user_stats import reconcile_user_counters
+from app.worker import requeue_stale_jobs, run_file_deletions
+
+logger = logging.getLogger(__name__)
+
+
+def with_session(task):
+    def run():
+        db = SessionLocal()
+        try:
+            task(db)
+        finally:
+            db.close()
+
+    return run
+
+
+TASKS = {
+    "counters": (
+        with_session(reconcile_post_counters),
+        settings.COUNTER_RECONCILE_SECONDS,
+    ),
+    "feed-model": (save_model, settings.FEED_MODEL_MAX_AGE),
+    "user-counters": (
+        with_session(reconcile_user_counters),
+        settings.COUNTER_RECONCILE_SECONDS,
+    ),
+    "media-jobs": (
+        with_session(requeue_stale_jobs),
+        settings.MEDIA_JOB_TIMEOUT_SECONDS,
+    ),
+    "file-deletions": (run_file_deletions, settings.FILE_DELETION_SECONDS),
+    "account-exports": (
+        with_session(expire_exports),
+        settings.FILE_DELETION_SECONDS,
+    ),
+}
+
+
+def run_task(name: str):
+    task, _ = TASKS[name]
+    start = time.perf_counter()
+    try:
+        task()
+    except Exception:
+        logger.exception("Maintenance task %s failed", name)
+    else:
+        logger.info("%s finished in %.1f s", name, time.perf_counter() - start)
+
+
+def run(names: list[str], once: bool = False):
+    due = dict.fromkeys(names, 0.0)
+    while True:
+        for name, next_run in due.items():
+            if next_run <= time.monotonic():
+                run_task(name)
+                due[name] = time.monotonic() + TASKS[name][1]
+        if once:
+            return
+        time.sleep(max(0, min(due.values()) - time.monotonic()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--task", action="append", choices=sorted(TASKS))
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    run(args.task or list(TASKS), args.once)
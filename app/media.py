@@ -0,0 +1,157 @@
+import numpy as np
+import os
+from base64 import b64encode
+from hashlib import blake2b
+from io import BytesIO
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+from moviepy import VideoFileClip
+
+from app.avatars import AVATAR_FOLDER, avatar_path
+from app.config import settings
+from app.utils import create_preview_filename, create_thumbnail_filename
+
+HASH_SIZE = 8
+MIN_FRAME_DURATION = 20
+
+
+def dhash(img: Image.Image) -> str:
+    gray = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return bits.tobytes().hex()
+
+
+def file_hash(path: str) -> str:
+    with Image.open(path) as img:
+        return dhash(img)
+
+
+def get_media_size(file, file_path):
+    if file.content_type in settings.ALLOWED_IMAGE_TYPES:
+        with Image.open(file_path) as img:
+            return img.size
+    if file.content_type in settings.ALLOWED_VIDEO_TYPES:
+        with VideoFileClip(file_path, audio=False) as clip:
+            return tuple(clip.size)
+    return (None, None)
+
+
+def create_image_thumbnail(file_path, thumbnail_path):
+    with Image.open(file_path) as img:
+        img.thumbnail(size=(1024, 1024))
+        img.save(thumbnail_path)
+
+
+def create_video_thumbnail(file_path, thumbnail_path):
+    clip = VideoFileClip(file_path)
+    frame = clip.get_frame(1)
+    image = Image.fromarray(frame)
+    image.thumbnail(size=(1024, 1024))
+    image.save(thumbnail_path)
+
+
+def create_animated_image_preview(file_path, preview_path):
+    with Image.open(file_path) as img:
+        frame_count = getattr(img, "n_frames", 1)
+        step = max(1, frame_count // settings.PREVIEW_FRAMES)
+        duration = max(img.info.get("duration", 100) * step, MIN_FRAME_DURATION)
+        frames = []
+        for index in range(0, frame_count, step)[: settings.PREVIEW_FRAMES]:
+            img.seek(index)
+            frame = img.convert("RGBA")
+            frame.thumbnail(size=(settings.PREVIEW_SIZE, settings.PREVIEW_SIZE))
+            frames.append(frame)
+
+    frames[0].save(
+        preview_path,
+        save_all=True,
+        append_images=frames[1:],
+        duration=duration,
+        loop=0,
+        quality=60,
+    )
+
+
+def create_video_preview(file_path, preview_path):
+    with VideoFileClip(file_path, audio=False) as clip:
+        scale = min(1, settings.PREVIEW_SIZE / max(clip.size))
+        width = int(clip.w * scale) // 2 * 2
+        height = int(clip.h * scale) // 2 * 2
+        duration = min(clip.duration, settings.PREVIEW_FRAMES / settings.PREVIEW_FPS)
+
+        preview = clip.subclipped(0, duration).resized(new_size=(width, height))
+        preview.write_videofile(
+            preview_path,
+            fps=settings.PREVIEW_FPS,
+            codec="libx264",
+            bitrate=settings.PREVIEW_BITRATE,
+            audio=False,
+            preset="veryfast",
+            ffmpeg_params=["-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+            logger=None,
+        )
+
+
+def create_placeholder(thumbnail_path):
+    with Image.open(thumbnail_path) as img:
+        img = img.convert("RGB")
+        img.thumbnail(size=(settings.PLACEHOLDER_SIZE, settings.PLACEHOLDER_SIZE))
+        buffer = BytesIO()
+        img.save(buffer, format="WEBP", quality=30)
+    return f"data:image/webp;base64,{b64encode(buffer.getvalue()).decode()}"
+
+
+def create_avatars(data: bytes, user_id: int) -> str:
+    digest = blake2b(data, digest_size=16, key=str(user_id).encode()).hexdigest()
+    profile_picture = f"{AVATAR_FOLDER}/{digest}"
+    try:
+        with Image.open(BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+    except (OSError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail="Invalid image")
+
+    os.makedirs(os.path.join(settings.UPLOAD_FOLDER, profile_picture), exist_ok=True)
+
+    for size in settings.AVATAR_SIZES:
+        path = os.path.join(settings.UPLOAD_FOLDER, avatar_path(profile_picture, size))
+        avatar = ImageOps.fit(img, (size, size), Image.Resampling.LANCZOS)
+        avatar.save(f"{path}.tmp", format="WEBP", quality=settings.AVATAR_QUALITY)
+        os.replace(f"{path}.tmp", path)
+    return profile_picture
+
+
+def create_preview(file, file_path, preview_path):
+    if file.content_type in settings.ANIMATED_IMAGE_TYPES:
+        create_animated_image_preview(file_path, preview_path)
+    elif file.content_type in settings.ALLOWED_VIDEO_TYPES:
+        create_video_preview(file_path, preview_path)
+
+
+def create_thumbnail(file, file_path, thumbnail_path):
+    if file.content_type in settings.ALLOWED_IMAGE_TYPES:
+        create_image_thumbnail(file_path, thumbnail_path)
+    elif file.content_type in settings.ALLOWED_VIDEO_TYPES:
+        create_video_thumbnail(file_path, thumbnail_path)
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+
+def process_post_file(post_file):
+    file_path = os.path.join(settings.UPLOAD_FOLDER, post_file.file_path)
+    folder = os.path.dirname(file_path)
+    thumbnail_filename = create_thumbnail_filename(post_file, post_file.filename)
+    thumbnail_path = os.path.join(folder, thumbnail_filename)
+
+    create_thumbnail(post_file, file_path, thumbnail_path)
+    post_file.width, post_file.height = get_media_size(post_file, file_path)
+    post_file.thumbnail_path = os.path.relpath(thumbnail_path, settings.UPLOAD_FOLDER)
+    post_file.placeholder = create_placeholder(thumbnail_path)
+    post_file.phash = file_hash(thumbnail_path)
+
+    preview_filename = create_preview_filename(post_file, post_file.filename)
+    if preview_filename:
+        preview_path = os.path.join(folder, preview_filename)
+        create_preview(post_file, file_path, preview_path)
+        post_file.preview_path = os.path.relpath(preview_path, settings.UPLOAD_FOLDER)
@@ -0,0 +1,253 @@
+import asyncio
+import cProfile
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.config import settings
+from app.utils import get_token_user_id
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+current_request = ContextVar("current_request", default=None)
+
+
+class RequestStats:
+    def __init__(self, profile: bool = False):
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.handler_time = 0.0
+        self.handler_end = None
+        self.serialization_time = 0.0
+        self.profile = profile
+        self.profile_path = None
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, labels: dict, value: float):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts = self.series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            series = {key: list(counts) for key, counts in self.series.items()}
+
+        for key, counts in sorted(series.items()):
+            labels = ",".join(f'{name}="{value}"' for name, value in key)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {counts[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-1]}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Total request time.", TIME_BUCKETS
+)
+request_statements = Histogram(
+    "http_request_db_statements", "SQL statements per request.", COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL.", TIME_BUCKETS
+)
+request_pool_wait = Histogram(
+    "http_request_pool_wait_seconds",
+    "Time spent waiting for a connection.",
+    TIME_BUCKETS,
+)
+request_handler_time = Histogram(
+    "http_request_handler_seconds", "Time spent in the endpoint.", TIME_BUCKETS
+)
+request_serialization_time = Histogram(
+    "http_request_serialization_seconds",
+    "Time spent validating and encoding the response.",
+    TIME_BUCKETS,
+)
+histograms = [
+    request_duration,
+    request_statements,
+    request_db_time,
+    request_pool_wait,
+    request_handler_time,
+    request_serialization_time,
+]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for histogram in histograms for line in histogram.render())
+
+
+def instrument_pool(engine):
+    pool = engine.pool
+    connect = pool.connect
+
+    @wraps(connect)
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            stats = current_request.get()
+            if stats:
+                stats.pool_wait += time.perf_counter() - start
+
+    pool.connect = timed_connect
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        start = conn.info["query_start_time"].pop()
+        stats = current_request.get()
+        if stats:
+            stats.statements += 1
+            stats.db_time += time.perf_counter() - start
+
+    event.listen(engine, "engine_disposed", instrument_pool)
+    instrument_pool(engine)
+
+
+def finish_handler(stats: RequestStats, start: float, profiler, name: str):
+    if profiler:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stats.profile_path = os.path.join(
+            settings.PROFILE_DIR, f"{int(time.time() * 1000)}-{name}.prof"
+        )
+        profiler.dump_stats(stats.profile_path)
+    stats.handler_end = time.perf_counter()
+    stats.handler_time += stats.handler_end - start
+
+
+def timed_endpoint(endpoint):
+    if getattr(endpoint, "timed", False):
+        return endpoint
+    name = endpoint.__name__
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            stats = current_request.get()
+            if not stats:
+                return await endpoint(*args, **kwargs)
+
+            profiler = cProfile.Profile() if stats.profile else None
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if profiler:
+                    profiler.disable()
+                finish_handler(stats, start, profiler, name)
+
+        async_wrapper.timed = True
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        stats = current_request.get()
+        if not stats:
+            return endpoint(*args, **kwargs)
+
+        profiler = cProfile.Profile() if stats.profile else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                return profiler.runcall(endpoint, *args, **kwargs)
+            return endpoint(*args, **kwargs)
+        finally:
+            finish_handler(stats, start, profiler, name)
+
+    wrapper.timed = True
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request):
+            response = await handler(request)
+            stats = current_request.get()
+            if stats and stats.handler_end:
+                stats.serialization_time += time.perf_counter() - stats.handler_end
+            return response
+
+        return instrumented_handler
+
+
+def wants_profile(request: Request) -> bool:
+    if "x-profile" not in request.headers:
+        return False
+    user_id = get_token_user_id(request.cookies.get("auth_token"))
+    return user_id is not None and user_id in settings.ADMIN_USER_IDS
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(profile=wants_profile(Request(scope)))
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and stats.profile_path:
+                headers = message.setdefault("headers", [])
+                headers.append((b"x-profile-file", stats.profile_path.encode()))
+            await send(message)
+
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": route.path if route else "unmatched",
+            }
+            request_duration.observe(labels, time.perf_counter() - start)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.db_time)
+            request_pool_wait.observe(labels, stats.pool_wait)
+            request_handler_time.observe(labels, stats.handler_time)
+            request_serialization_time.observe(labels, stats.serialization_time)
@@ -8,29 +8,72 @@ from sqlalchemy import (
     ForeignKey,
     Table,
     Enum,
+    Index,
+    UniqueConstraint,
     select,
     func,
 )
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
+from app.avatars import avatar_url
 from app.database import Base
-from app.enums import TagType, ReactionType, ReportType, Privacy
+from app.enums import (
+    TagType,
+    ReactionType,
+    ReportType,
+    Privacy,
+    JobStatus,
+    AccountJobType,
+    NotificationType,
+)
 
 
 post_tag = Table(
     "post_tag",
     Base.metadata,
-    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Column(
+        "post_id",
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE", name="fk_post_tag_post_id_posts"),
+        primary_key=True,
+    ),
+    Column(
+        "tag_id",
+        Integer,
+        ForeignKey("tags.id", ondelete="CASCADE", name="fk_post_tag_tag_id_tags"),
+        primary_key=True,
+    ),
+    Index("ix_post_tag_tag_id", "tag_id"),
 )
 
 
 post_vault = Table(
     "post_vault",
     Base.metadata,
-    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
-    Column("vault_id", Integer, ForeignKey("vaults.id"), primary_key=True),
+    Column(
+        "post_id",
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE", name="fk_post_vault_post_id_posts"),
+        primary_key=True,
+    ),
+    Column(
+        "vault_id",
+        Integer,
+        ForeignKey(
+            "vaults.id", ondelete="CASCADE", name="fk_post_vault_vault_id_vaults"
+        ),
+        primary_key=True,
+    ),
+    Column(
+        "date_added",
+        DateTime,
+        default=func.now(),
+        server_default=func.now(),
+        nullable=False,
+    ),
+    Column("position", Integer),
+    Index("ix_post_vault_vault_id_date_added", "vault_id", "date_added", "post_id"),
 )
 
 
@@ -38,9 +81,17 @@ class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     date_created = Column(DateTime, default=func.now(), nullable=True)
-    username = Column(String, nullable=False)
+    username = Column(String, nullable=False, unique=True, index=True)
     password = Column(String, nullable=False)
     profile_picture = Column(String, nullable=False)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    vault_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_notification_count = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    date_deleted = Column(DateTime)
     posts = relationship("Post", back_populates="user", lazy="dynamic")
     vaults = relationship("Vault", back_populates="user", lazy="dynamic")
     comments = relationship("Comment", back_populates="user", lazy="dynamic")
@@ -53,42 +104,49 @@ class User(Base):
         return naturaltime(datetime.now() - self.date_created)
 
     @property
-    def vault_count(self) -> int:
-        return self.vaults.count()
-
-    @property
-    def post_count(self) -> int:
-        return self.posts.count()
-
-    @property
-    def comment_count(self) -> int:
-        return self.comments.count()
+    def liked_posts(self) -> int:
+        return self.like_count
 
     @property
-    def liked_posts(self) -> int:
-        return self.post_reactions.filter(PostReaction.type == "like").count()
+    def avatar(self) -> str | None:
+        return avatar_url(self.username, self.profile_picture)
 
 
 class Post(Base):
     __tablename__ = "posts"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     date_created = Column(DateTime, default=func.now())
     title = Column(String)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    dislike_count = Column(Integer, nullable=False, default=0, server_default="0")
     user = relationship("User", back_populates="posts")
-    tags = relationship("Tag", secondary=post_tag, back_populates="posts")
-    vaults = relationship("Vault", secondary=post_vault, back_populates="posts")
+    tags = relationship(
+        "Tag", secondary=post_tag, back_populates="posts", passive_deletes=True
+    )
+    vaults = relationship(
+        "Vault", secondary=post_vault, back_populates="posts", passive_deletes=True
+    )
     files = relationship(
-        "PostFile", back_populates="post", lazy="dynamic", cascade="all, delete-orphan"
+        "PostFile",
+        back_populates="post",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     comments = relationship(
-        "Comment", back_populates="post", lazy="dynamic", cascade="all, delete-orphan"
+        "Comment",
+        back_populates="post",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     reactions = relationship(
         "PostReaction",
         back_populates="post",
         lazy="dynamic",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     @hybrid_property
@@ -106,11 +164,11 @@ class Post(Base):
 
     @property
     def likes(self) -> int:
-        return self.reactions.filter(PostReaction.type == "like").count()
+        return self.like_count
 
     @property
     def dislikes(self) -> int:
-        return self.reactions.filter(PostReaction.type == "dislike").count()
+        return self.dislike_count
 
     @property
     def time_since(self) -> str:
@@ -120,23 +178,87 @@ class Post(Base):
 class PostFile(Base):
     __tablename__ = "post_files"
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE", name="fk_post_files_post_id_posts"),
+        nullable=False,
+        index=True,
+    )
     date_created = Column(DateTime, default=func.now(), nullable=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     thumbnail_path = Column(String, nullable=False)
+    preview_path = Column(String)
     content_type = Column(String, nullable=False)
     size = Column(Integer)
     width = Column(Integer)
     height = Column(Integer)
+    placeholder = Column(String)
+    phash = Column(String(16), index=True)
     post = relationship("Post", back_populates="files")
+    jobs = relationship("MediaJob", back_populates="post_file", passive_deletes=True)
+
+
+class MediaJob(Base):
+    __tablename__ = "media_jobs"
+    __table_args__ = (Index("ix_media_jobs_status_id", "status", "id"),)
+    id = Column(Integer, primary_key=True)
+    post_file_id = Column(
+        Integer,
+        ForeignKey("post_files.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    date_created = Column(DateTime, default=func.now())
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    locked_at = Column(DateTime)
+    error = Column(String)
+    post_file = relationship("PostFile", back_populates="jobs")
+
+
+class AccountJob(Base):
+    __tablename__ = "account_jobs"
+    __table_args__ = (Index("ix_account_jobs_status_id", "status", "id"),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    date_created = Column(DateTime, default=func.now())
+    type = Column(Enum(AccountJobType), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    stage = Column(String, nullable=False)
+    cursor = Column(Integer, nullable=False, default=0, server_default="0")
+    progress = Column(Integer, nullable=False, default=0, server_default="0")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    locked_at = Column(DateTime)
+    error = Column(String)
+    path = Column(String)
+    date_finished = Column(DateTime)
+
+
+class FileDeletion(Base):
+    __tablename__ = "file_deletions"
+    id = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False)
+    date_created = Column(DateTime, default=func.now())
 
 
 class PostReaction(Base):
     __tablename__ = "post_reactions"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "post_id", name="uq_post_reactions_user_id_post_id"
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    post_id = Column(
+        Integer,
+        ForeignKey(
+            "posts.id", ondelete="CASCADE", name="fk_post_reactions_post_id_posts"
+        ),
+        nullable=False,
+        index=True,
+    )
     date_created = Column(DateTime, default=func.now())
     type = Column(Enum(ReactionType), nullable=False, default=ReactionType.NONE)
     user = relationship("User", back_populates="post_reactions")
@@ -146,13 +268,17 @@ class PostReaction(Base):
 class Vault(Base):
     __tablename__ = "vaults"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     date_created = Column(DateTime, default=func.now())
     title = Column(String, nullable=False)
     privacy = Column(Enum(Privacy), nullable=False, default=Privacy.PRIVATE)
     user = relationship("User", back_populates="vaults")
     posts = relationship(
-        "Post", secondary=post_vault, back_populates="vaults", lazy="dynamic"
+        "Post",
+        secondary=post_vault,
+        back_populates="vaults",
+        lazy="dynamic",
+        passive_deletes=True,
     )
 
     @property
@@ -170,7 +296,9 @@ class Tag(Base):
     date_created = Column(DateTime, default=func.now())
     name = Column(String, nullable=False)
     type = Column(Enum(TagType), nullable=False)
-    posts = relationship("Post", secondary=post_tag, back_populates="tags")
+    posts = relationship(
+        "Post", secondary=post_tag, back_populates="tags", passive_deletes=True
+    )
 
     @property
     def count(self) -> int:
@@ -180,8 +308,22 @@ class Tag(Base):
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE", name="fk_comments_post_id_posts"),
+        nullable=False,
+        index=True,
+    )
+    parent_id = Column(
+        Integer,
+        ForeignKey(
+            "comments.id", ondelete="CASCADE", name="fk_comments_parent_id_comments"
+        ),
+        index=True,
+    )
+    path = Column(String, index=True)
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
     date_created = Column(DateTime, default=func.now())
     content = Column(String, nullable=False)
     user = relationship("User", back_populates="comments")
@@ -191,6 +333,7 @@ class Comment(Base):
         back_populates="Comment",
         lazy="dynamic",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     @hybrid_property
@@ -222,8 +365,17 @@ class Comment(Base):
 class CommentReaction(Base):
     __tablename__ = "comment_reactions"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    comment_id = Column(
+        Integer,
+        ForeignKey(
+            "comments.id",
+            ondelete="CASCADE",
+            name="fk_comment_reactions_comment_id_comments",
+        ),
+        nullable=False,
+        index=True,
+    )
     date_created = Column(DateTime, default=func.now())
     type = Column(Enum(ReactionType), nullable=False, default=ReactionType.NONE)
     user = relationship("User", back_populates="comment_reactions")
@@ -232,6 +384,12 @@ class CommentReaction(Base):
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "target_type", "target_id", name="uq_reports_user_id_target"
+        ),
+        Index("ix_reports_target_type_target_id", "target_type", "target_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date_created = Column(DateTime, default=func.now())
@@ -239,3 +397,66 @@ class Report(Base):
     target_id = Column(Integer, nullable=False)
     detail = Column(String, nullable=False)
     user = relationship("User", back_populates="reports")
+
+
+class ReportSummary(Base):
+    __tablename__ = "report_summary"
+    __table_args__ = (
+        Index("ix_report_summary_report_count", "report_count", "last_reported"),
+        Index("ix_report_summary_last_reported", "last_reported"),
+    )
+    target_type = Column(Enum(ReportType), primary_key=True)
+    target_id = Column(Integer, primary_key=True)
+    report_count = Column(Integer, nullable=False, default=0, server_default="0")
+    date_created = Column(DateTime, default=func.now())
+    last_reported = Column(DateTime, nullable=False)
+    date_resolved = Column(DateTime)
+    resolved_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+
+
+notification_actor = Table(
+    "notification_actors",
+    Base.metadata,
+    Column(
+        "notification_id",
+        Integer,
+        ForeignKey(
+            "notifications.id",
+            ondelete="CASCADE",
+            name="fk_notification_actors_notification_id_notifications",
+        ),
+        primary_key=True,
+    ),
+    Column(
+        "user_id",
+        Integer,
+        ForeignKey(
+            "users.id",
+            ondelete="CASCADE",
+            name="fk_notification_actors_user_id_users",
+        ),
+        primary_key=True,
+    ),
+)
+
+
+class Notification(Base):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "type", "target_id", name="uq_notifications_user_id_target"
+        ),
+        Index("ix_notifications_user_id_date_updated", "user_id", "date_updated", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    type = Column(Enum(NotificationType), nullable=False)
+    target_id = Column(Integer, nullable=False)
+    post_id = Column(Integer, nullable=False)
+    actor_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_actor_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    date_created = Column(DateTime, default=func.now())
+    date_updated = Column(DateTime, nullable=False)
+    date_read = Column(DateTime)
@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import bindparam, delete, func, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.enums import ReportType
+from app.models import Report, ReportSummary
+
+
+def add_report(
+    db: Session, user_id: int, target_type: ReportType, target_id: int, detail: str
+) -> bool:
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    created = db.execute(
+        dialect.insert(Report)
+        .values(
+            user_id=user_id,
+            target_type=target_type,
+            target_id=target_id,
+            detail=detail,
+        )
+        .on_conflict_do_nothing(
+            index_elements=["user_id", "target_type", "target_id"]
+        )
+    ).rowcount
+    if not created:
+        return False
+
+    statement = dialect.insert(ReportSummary).values(
+        target_type=target_type,
+        target_id=target_id,
+        report_count=1,
+        last_reported=datetime.now(),
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["target_type", "target_id"],
+            set_={
+                "report_count": ReportSummary.report_count + 1,
+                "last_reported": statement.excluded.last_reported,
+                "date_resolved": None,
+                "resolved_by": None,
+            },
+        )
+    )
+    return True
+
+
+def resolve_reports(db: Session, targets: list[tuple], user_id: int) -> int:
+    return db.execute(
+        update(ReportSummary)
+        .where(
+            tuple_(ReportSummary.target_type, ReportSummary.target_id).in_(targets),
+            ReportSummary.report_count > 0,
+        )
+        .values(report_count=0, date_resolved=func.now(), resolved_by=user_id),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+
+
+def remove_reports(db: Session, reports):
+    db.connection().execute(
+        update(ReportSummary)
+        .where(
+            ReportSummary.target_type == bindparam("report_type"),
+            ReportSummary.target_id == bindparam("report_target_id"),
+            ReportSummary.report_count > 0,
+        )
+        .values(report_count=ReportSummary.report_count - 1),
+        [
+            {"report_type": report.target_type, "report_target_id": report.target_id}
+            for report in reports
+        ],
+    )
+    db.execute(delete(Report).where(Report.id.in_([report.id for report in reports])))
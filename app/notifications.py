@@ -0,0 +1,210 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from threading import Event, Lock, Thread
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import NotificationType
+from app.models import Comment, Notification, Post, User, notification_actor
+from app.user_stats import update_user_counters
+
+logger = logging.getLogger(__name__)
+
+COMMENT_TYPES = (NotificationType.COMMENT_LIKE, NotificationType.COMMENT_REPLY)
+
+
+def save_notifications(db: Session, events: dict):
+    user_ids = {event_key[0] for event_key in events}
+    user_ids.update(actor_id for actors in events.values() for actor_id in actors)
+    active = set(
+        db.scalars(
+            select(User.id).where(User.id.in_(user_ids), User.date_deleted.is_(None))
+        )
+    )
+    events = {
+        event_key: {
+            actor_id: date for actor_id, date in actors.items() if actor_id in active
+        }
+        for event_key, actors in events.items()
+        if event_key[0] in active
+    }
+    post_ids = {event_key[3] for event_key in events}
+    comment_ids = {
+        event_key[2] for event_key in events if event_key[1] in COMMENT_TYPES
+    }
+    post_ids = set(db.scalars(select(Post.id).where(Post.id.in_(post_ids))))
+    if comment_ids:
+        comment_ids = set(
+            db.scalars(select(Comment.id).where(Comment.id.in_(comment_ids)))
+        )
+    events = {
+        (user_id, notification_type, target_id, post_id): actors
+        for (user_id, notification_type, target_id, post_id), actors in events.items()
+        if actors
+        and post_id in post_ids
+        and (notification_type not in COMMENT_TYPES or target_id in comment_ids)
+    }
+    if not events:
+        return
+
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    key = tuple_(Notification.user_id, Notification.type, Notification.target_id)
+    unread = {
+        tuple(row)
+        for row in db.execute(
+            select(Notification.user_id, Notification.type, Notification.target_id)
+            .where(key.in_([event_key[:3] for event_key in events]))
+            .where(Notification.date_read.is_(None))
+        )
+    }
+
+    rows = []
+    for (user_id, notification_type, target_id, post_id), actors in events.items():
+        last_actor_id = next(reversed(actors))
+        rows.append(
+            {
+                "user_id": user_id,
+                "type": notification_type,
+                "target_id": target_id,
+                "post_id": post_id,
+                "last_actor_id": last_actor_id,
+                "date_updated": actors[last_actor_id],
+            }
+        )
+    statement = dialect.insert(Notification).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "type", "target_id"],
+        set_={
+            "last_actor_id": statement.excluded.last_actor_id,
+            "date_updated": statement.excluded.date_updated,
+            "date_read": None,
+        },
+    ).returning(
+        Notification.id,
+        Notification.user_id,
+        Notification.type,
+        Notification.target_id,
+    )
+    ids = {tuple(row[1:]): row.id for row in db.execute(statement)}
+
+    db.execute(
+        dialect.insert(notification_actor).on_conflict_do_nothing(),
+        [
+            {"notification_id": ids[event_key[:3]], "user_id": actor_id}
+            for event_key, actors in events.items()
+            for actor_id in actors
+        ],
+    )
+    actor_count = (
+        select(func.count())
+        .select_from(notification_actor)
+        .where(notification_actor.c.notification_id == Notification.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Notification)
+        .where(Notification.id.in_(list(ids.values())))
+        .values(actor_count=actor_count),
+        execution_options={"synchronize_session": False},
+    )
+    unread_deltas = Counter(key[0] for key in ids if key not in unread)
+    update_user_counters(db, "unread_notification_count", unread_deltas)
+
+
+def mark_read(db: Session, user_id: int, ids: list[int] | None = None) -> int:
+    notifications = update(Notification).where(
+        Notification.user_id == user_id, Notification.date_read.is_(None)
+    )
+    if ids is not None:
+        notifications = notifications.where(Notification.id.in_(ids))
+    count = db.execute(
+        notifications.values(date_read=func.now()),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    update_user_counters(db, "unread_notification_count", {user_id: -count})
+    return count
+
+
+def delete_notifications(db: Session, *criteria):
+    rows = db.execute(
+        delete(Notification)
+        .where(*criteria)
+        .returning(Notification.user_id, Notification.date_read),
+        execution_options={"synchronize_session": False},
+    ).all()
+    unread_deltas = Counter(user_id for user_id, date_read in rows if date_read is None)
+    update_user_counters(
+        db,
+        "unread_notification_count",
+        {user_id: -count for user_id, count in unread_deltas.items()},
+    )
+
+
+class NotificationBuffer:
+    def __init__(self):
+        self.pending = defaultdict(dict)
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    def add(
+        self,
+        user_id: int,
+        notification_type: NotificationType,
+        target_id: int,
+        post_id: int,
+        actor_id: int,
+    ):
+        if user_id == actor_id:
+            return
+        with self.lock:
+            actors = self.pending[(user_id, notification_type, target_id, post_id)]
+            actors.pop(actor_id, None)
+            actors[actor_id] = datetime.now()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                events, self.pending = self.pending, defaultdict(dict)
+
+            keys, size = list(events), settings.NOTIFICATION_FLUSH_BATCH_SIZE
+            for start in range(0, len(keys), size):
+                batch = {key: events[key] for key in keys[start : start + size]}
+                db = SessionLocal()
+                try:
+                    save_notifications(db, batch)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to flush %d notifications", len(batch))
+                    with self.lock:
+                        for key, actors in batch.items():
+                            self.pending[key] = {**actors, **self.pending[key]}
+                finally:
+                    db.close()
+
+    def run(self):
+        while not self.stopped.wait(settings.NOTIFICATION_FLUSH_INTERVAL_MS / 1000):
+            self.flush()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = Thread(target=self.run, name="notification-buffer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+
+notification_buffer = NotificationBuffer()
@@ -0,0 +1,173 @@
+import logging
+import time
+from collections import OrderedDict
+from math import ceil
+from threading import Lock
+from urllib.parse import parse_qs
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
+from starlette.routing import Match
+
+from app.config import settings
+from app.utils import get_token_user_id
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+    async def take(self, key: str, cost: int, capacity: int, rate: float) -> float:
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > settings.RATE_LIMIT_MAX_KEYS:
+                self.buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisBackend:
+    def __init__(self, client):
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, cost: int, capacity: int, rate: float) -> float:
+        return float(
+            await self.script(
+                keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time(), cost]
+            )
+        )
+
+
+def create_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from redis import asyncio as redis
+
+        return RedisBackend(redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    return MemoryBackend()
+
+
+class RateLimiter:
+    def __init__(self):
+        self.backend = None
+
+    async def take(self, key: str, cost: int) -> float:
+        if self.backend is None:
+            self.backend = create_backend()
+        capacity = settings.RATE_LIMIT_CAPACITY
+        return await self.backend.take(
+            key, min(cost, capacity), capacity, settings.RATE_LIMIT_REFILL_PER_SECOND
+        )
+
+
+class ConcurrencyLimiter:
+    def __init__(self):
+        self.active = {}
+        self.lock = Lock()
+
+    def acquire(self, key: str) -> bool:
+        with self.lock:
+            if self.active.get(key, 0) >= settings.CONCURRENCY_LIMITS[key]:
+                return False
+            self.active[key] = self.active.get(key, 0) + 1
+            return True
+
+    def release(self, key: str):
+        with self.lock:
+            self.active[key] -= 1
+
+
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+def route_key(scope, routes) -> str | None:
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            key = f"{scope['method']} {route.path}"
+            for param in parse_qs(scope["query_string"].decode()):
+                if f"{key}?{param}" in settings.RATE_LIMIT_COSTS:
+                    return f"{key}?{param}"
+            return key
+    return None
+
+
+def client_key(request: Request) -> str:
+    user_id = get_token_user_id(request.cookies.get("auth_token"))
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, routes: list):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        key = route_key(scope, self.routes)
+        cost = settings.RATE_LIMIT_COSTS.get(key, 1)
+        try:
+            retry_after = await rate_limiter.take(client_key(Request(scope)), cost)
+        except Exception:
+            logger.exception("Rate limit backend failed")
+            retry_after = 0
+        if retry_after:
+            response = ORJSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, ceil(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        if key not in settings.CONCURRENCY_LIMITS:
+            await self.app(scope, receive, send)
+            return
+
+        if not concurrency_limiter.acquire(key):
+            response = ORJSONResponse(
+                {"detail": "Server is busy"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            concurrency_limiter.release(key)
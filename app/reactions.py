@@ -0,0 +1,253 @@
+import logging
+from collections import Counter, defaultdict
+from threading import Event, Lock, Thread
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import ReactionType
+from app.models import Post, PostReaction, User
+from app.user_stats import update_user_counters
+
+logger = logging.getLogger(__name__)
+
+
+def reaction_delta(old_type: ReactionType, new_type: ReactionType) -> tuple[int, int]:
+    likes = (new_type == ReactionType.LIKE) - (old_type == ReactionType.LIKE)
+    dislikes = (new_type == ReactionType.DISLIKE) - (old_type == ReactionType.DISLIKE)
+    return likes, dislikes
+
+
+def get_reaction_type(db: Session, user_id: int, post_id: int) -> ReactionType:
+    reaction_type = (
+        db.query(PostReaction.type)
+        .filter(PostReaction.user_id == user_id, PostReaction.post_id == post_id)
+        .scalar()
+    )
+    return reaction_type or ReactionType.NONE
+
+
+def update_post_counters(db: Session, deltas: dict):
+    if not deltas:
+        return
+    db.connection().execute(
+        update(Post)
+        .where(Post.id == bindparam("post_id"))
+        .values(
+            like_count=Post.like_count + bindparam("likes"),
+            dislike_count=Post.dislike_count + bindparam("dislikes"),
+        ),
+        [
+            {"post_id": post_id, "likes": likes, "dislikes": dislikes}
+            for post_id, (likes, dislikes) in deltas.items()
+        ],
+    )
+
+
+def upsert_reactions(db: Session, reactions: dict):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    rows = [
+        {"user_id": user_id, "post_id": post_id, "type": reaction_type}
+        for (user_id, post_id), reaction_type in reactions.items()
+    ]
+    for start in range(0, len(rows), 1000):
+        statement = dialect.insert(PostReaction).values(rows[start : start + 1000])
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "post_id"],
+                set_={"type": statement.excluded.type},
+            )
+        )
+
+
+def live_reactions(db: Session, reactions: dict) -> dict:
+    post_ids = set(
+        db.scalars(
+            select(Post.id).where(Post.id.in_({post_id for _, post_id in reactions}))
+        )
+    )
+    user_ids = set(
+        db.scalars(
+            select(User.id).where(
+                User.id.in_({user_id for user_id, _ in reactions}),
+                User.date_deleted.is_(None),
+            )
+        )
+    )
+    return {
+        (user_id, post_id): reaction_type
+        for (user_id, post_id), reaction_type in reactions.items()
+        if user_id in user_ids and post_id in post_ids
+    }
+
+
+def apply_reaction(
+    db: Session, user_id: int, post_id: int, reaction_type: ReactionType
+) -> ReactionType:
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    db.execute(
+        dialect.insert(PostReaction)
+        .values(user_id=user_id, post_id=post_id, type=ReactionType.NONE)
+        .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+    )
+    reaction = (PostReaction.user_id == user_id, PostReaction.post_id == post_id)
+    old_type = db.scalar(select(PostReaction.type).where(*reaction).with_for_update())
+    db.execute(
+        update(PostReaction).where(*reaction).values(type=reaction_type),
+        execution_options={"synchronize_session": False},
+    )
+
+    likes, dislikes = reaction_delta(old_type, reaction_type)
+    update_post_counters(db, {post_id: (likes, dislikes)})
+    update_user_counters(db, "like_count", {user_id: likes})
+    db.commit()
+    return old_type
+
+
+def reconcile_post_counters(db: Session):
+    def reaction_count(reaction_type):
+        return (
+            select(func.count(PostReaction.id))
+            .where(PostReaction.post_id == Post.id, PostReaction.type == reaction_type)
+            .scalar_subquery()
+        )
+
+    db.execute(
+        update(Post).values(
+            like_count=reaction_count(ReactionType.LIKE),
+            dislike_count=reaction_count(ReactionType.DISLIKE),
+        )
+    )
+    db.commit()
+
+
+class ReactionBuffer:
+    def __init__(self):
+        self.pending = {}
+        self.changes = {}
+        self.deltas = defaultdict(lambda: [0, 0])
+        self.flushing = {}
+        self.flushing_changes = {}
+        self.flushing_deltas = {}
+        self.failures = Counter()
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    def add(
+        self, db: Session, user_id: int, post_id: int, reaction_type: ReactionType
+    ) -> ReactionType:
+        key = (user_id, post_id)
+        with self.lock:
+            old_type = self.pending.get(key, self.flushing.get(key))
+        if old_type is None:
+            old_type = get_reaction_type(db, user_id, post_id)
+
+        with self.lock:
+            old_type = self.pending.get(key, self.flushing.get(key, old_type))
+            likes, dislikes = reaction_delta(old_type, reaction_type)
+            self.pending[key] = reaction_type
+            self._count(self.changes, key, likes, dislikes)
+        return old_type
+
+    def get(self, user_id: int, post_id: int) -> ReactionType | None:
+        key = (user_id, post_id)
+        with self.lock:
+            return self.pending.get(key, self.flushing.get(key))
+
+    def delta(self, post_id: int) -> tuple[int, int]:
+        with self.lock:
+            likes, dislikes = self.deltas.get(post_id, (0, 0))
+            flushing_likes, flushing_dislikes = self.flushing_deltas.get(
+                post_id, (0, 0)
+            )
+        return likes + flushing_likes, dislikes + flushing_dislikes
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                self.flushing, self.pending = self.pending, {}
+                self.flushing_changes, self.changes = self.changes, {}
+                self.flushing_deltas, self.deltas = self.deltas, defaultdict(
+                    lambda: [0, 0]
+                )
+
+            db = SessionLocal()
+            try:
+                reactions = live_reactions(db, self.flushing)
+                post_deltas = defaultdict(lambda: [0, 0])
+                user_deltas = Counter()
+                for user_id, post_id in reactions:
+                    likes, dislikes = self.flushing_changes[(user_id, post_id)]
+                    post_deltas[post_id][0] += likes
+                    post_deltas[post_id][1] += dislikes
+                    user_deltas[user_id] += likes
+
+                upsert_reactions(db, reactions)
+                update_post_counters(db, post_deltas)
+                update_user_counters(db, "like_count", user_deltas)
+                db.commit()
+                with self.lock:
+                    for key in self.flushing:
+                        self.failures.pop(key, None)
+                    self._clear_flushing()
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to flush %d reactions", len(self.flushing))
+                with self.lock:
+                    self._requeue()
+                    self._clear_flushing()
+            finally:
+                db.close()
+
+    def _count(self, changes: dict, key: tuple, likes: int, dislikes: int):
+        change = changes.setdefault(key, [0, 0])
+        change[0] += likes
+        change[1] += dislikes
+        self.deltas[key[1]][0] += likes
+        self.deltas[key[1]][1] += dislikes
+
+    def _requeue(self):
+        for key, reaction_type in self.flushing.items():
+            self.failures[key] += 1
+            if self.failures[key] >= settings.REACTION_FLUSH_MAX_ATTEMPTS:
+                logger.error("Dropping reaction %s after repeated failures", key)
+                del self.failures[key]
+                continue
+            self.pending.setdefault(key, reaction_type)
+            self._count(self.changes, key, *self.flushing_changes[key])
+
+    def _clear_flushing(self):
+        self.flushing, self.flushing_changes, self.flushing_deltas = {}, {}, {}
+
+    def run(self):
+        while not self.stopped.wait(settings.REACTION_FLUSH_INTERVAL_MS / 1000):
+            self.flush()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = Thread(target=self.run, name="reaction-buffer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+
+reaction_buffer = ReactionBuffer()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        reconcile_post_counters(db)
+    finally:
+        db.close()
@@ -0,0 +1,268 @@
+import numpy as np
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from sqlalchemy import desc, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import ReactionType
+from app.models import Post, PostReaction, post_tag
+
+
+def _csr(rows, cols, n_rows, *values):
+    order = np.argsort(rows, kind="stable")
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=ptr[1:])
+    return (ptr, cols[order], *(value[order] for value in values))
+
+
+def _top_k_per_row(rows, cols, scores, n_rows, k):
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=ptr[1:])
+    keep = np.arange(len(rows)) - ptr[rows] < k
+    return _csr(rows[keep], cols[keep], n_rows, scores[keep])
+
+
+def _co_like_pairs(user_ptr, user_posts, n_posts):
+    keys, counts, chunk_keys, chunk_pairs = [], [], [], 0
+
+    def merge_chunk():
+        chunk_unique, chunk_counts = np.unique(
+            np.concatenate(chunk_keys), return_counts=True
+        )
+        keys.append(chunk_unique)
+        counts.append(chunk_counts)
+        chunk_keys.clear()
+
+    for user in range(len(user_ptr) - 1):
+        liked = user_posts[user_ptr[user] : user_ptr[user + 1]]
+        liked = liked[: settings.FEED_MAX_USER_LIKES]
+        if len(liked) < 2:
+            continue
+        pairs = np.add.outer(liked * n_posts, liked).ravel()
+        chunk_keys.append(pairs[pairs // n_posts != pairs % n_posts])
+        chunk_pairs += len(pairs)
+        if chunk_pairs >= settings.FEED_PAIR_CHUNK_SIZE:
+            merge_chunk()
+            chunk_pairs = 0
+    if chunk_keys:
+        merge_chunk()
+
+    if not keys:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(counts))
+    return keys // n_posts, keys % n_posts, counts
+
+
+def train(db: Session) -> dict:
+    post_ids = np.array(
+        [post_id for (post_id,) in db.query(Post.id).order_by(Post.id)], dtype=np.int64
+    )
+    n_posts = len(post_ids)
+
+    reactions = np.array(
+        db.query(PostReaction.user_id, PostReaction.post_id)
+        .filter(PostReaction.type == ReactionType.LIKE)
+        .order_by(desc(PostReaction.date_created))
+        .all(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    reactions = reactions[np.isin(reactions[:, 1], post_ids)]
+    like_users, like_user_idx = np.unique(reactions[:, 0], return_inverse=True)
+    like_posts = np.searchsorted(post_ids, reactions[:, 1])
+    popularity = np.bincount(like_posts, minlength=n_posts).astype(np.float64)
+
+    user_ptr, user_posts = _csr(like_user_idx, like_posts, len(like_users))
+    rows, cols, counts = _co_like_pairs(user_ptr, user_posts, n_posts)
+    scores = counts / np.sqrt(popularity[rows] * popularity[cols])
+    neighbor_ptr, neighbor_idx, neighbor_score = _top_k_per_row(
+        rows, cols, scores, n_posts, settings.FEED_NEIGHBORS
+    )
+
+    links = np.array(
+        db.query(post_tag.c.post_id, post_tag.c.tag_id).all(), dtype=np.int64
+    ).reshape(-1, 2)
+    links = links[np.isin(links[:, 0], post_ids)]
+    tag_ids, link_tags = np.unique(links[:, 1], return_inverse=True)
+    link_posts = np.searchsorted(post_ids, links[:, 0])
+    tag_ptr, tag_idx = _csr(link_posts, link_tags, n_posts)
+
+    by_popularity = np.lexsort((-popularity[link_posts], link_tags))
+    tag_post_ptr, tag_post_idx = _csr(
+        link_tags[by_popularity], link_posts[by_popularity], len(tag_ids)
+    )
+
+    return {
+        "post_ids": post_ids,
+        "popularity": popularity,
+        "neighbor_ptr": neighbor_ptr,
+        "neighbor_idx": neighbor_idx,
+        "neighbor_score": neighbor_score,
+        "tag_ids": tag_ids,
+        "tag_ptr": tag_ptr,
+        "tag_idx": tag_idx,
+        "tag_post_ptr": tag_post_ptr,
+        "tag_post_idx": tag_post_idx,
+    }
+
+
+def _gather(ptr, values, rows):
+    starts, ends = ptr[rows], ptr[rows + 1]
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    positions = np.arange(lengths.sum()) + offsets
+    return np.repeat(np.arange(len(rows)), lengths), values[positions], positions
+
+
+class Recommender:
+    def __init__(self):
+        self.model = None
+        self.model_mtime = None
+        self.cache = OrderedDict()
+        self.lock = Lock()
+
+    def load(self):
+        path = settings.FEED_MODEL_PATH
+        if os.path.exists(path):
+            mtime = os.path.getmtime(path)
+            if mtime != self.model_mtime:
+                with np.load(path) as data:
+                    model = {key: data[key] for key in data.files}
+                with self.lock:
+                    self.model, self.model_mtime = model, mtime
+                    self.cache.clear()
+        return self.model
+
+    def rank(self, db: Session, user_id: int | None) -> list[int]:
+        model = self.load()
+        if model is None:
+            return self._fallback(db)
+        if not len(model["post_ids"]):
+            return []
+        if user_id is None:
+            return self._popular(model)
+
+        with self.lock:
+            cached = self.cache.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                self.cache.move_to_end(user_id)
+                return cached[1]
+
+        ranked = self._personalized(db, model, user_id)
+        with self.lock:
+            self.cache[user_id] = (time.monotonic() + settings.FEED_CACHE_SECONDS, ranked)
+            self.cache.move_to_end(user_id)
+            while len(self.cache) > settings.FEED_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return ranked
+
+    def _fallback(self, db: Session) -> list[int]:
+        return db.scalars(
+            select(Post.id)
+            .order_by(desc(Post.like_count), desc(Post.id))
+            .limit(settings.FEED_CANDIDATES)
+        ).all()
+
+    def _popular(self, model: dict) -> list[int]:
+        post_ids = model["post_ids"]
+        top = np.lexsort((-post_ids, -model["popularity"]))[: settings.FEED_CANDIDATES]
+        return post_ids[top].tolist()
+
+    def _personalized(self, db: Session, model: dict, user_id: int) -> list[int]:
+        post_ids = model["post_ids"]
+        reactions = (
+            db.query(PostReaction.post_id, PostReaction.type)
+            .filter(
+                PostReaction.user_id == user_id,
+                PostReaction.type != ReactionType.NONE,
+            )
+            .order_by(desc(PostReaction.date_created))
+            .limit(settings.FEED_MAX_USER_LIKES)
+            .all()
+        )
+        reacted = np.array([post_id for post_id, _ in reactions], dtype=np.int64)
+        weights = np.array(
+            [
+                1.0 if reaction_type == ReactionType.LIKE else -1.0
+                for _, reaction_type in reactions
+            ]
+        )
+        positions = np.searchsorted(post_ids, reacted)
+        known = (positions < len(post_ids)) & (
+            post_ids[np.minimum(positions, len(post_ids) - 1)] == reacted
+        )
+        positions, weights = positions[known], weights[known]
+        if not weights.any():
+            return self._popular(model)
+
+        n_posts = len(post_ids)
+        co_like = np.zeros(n_posts)
+        liked = positions[weights > 0]
+        sources, neighbors, entries = _gather(
+            model["neighbor_ptr"], model["neighbor_idx"], liked
+        )
+        np.add.at(co_like, neighbors, model["neighbor_score"][entries])
+
+        affinity = np.zeros(len(model["tag_ids"]))
+        sources, tags, _ = _gather(model["tag_ptr"], model["tag_idx"], positions)
+        np.add.at(affinity, tags, weights[sources])
+
+        candidates = [np.flatnonzero(co_like)]
+        top_tags = np.argsort(-affinity)[: settings.FEED_TOP_TAGS]
+        top_tags = top_tags[affinity[top_tags] > 0]
+        for tag in top_tags:
+            start = model["tag_post_ptr"][tag]
+            end = min(model["tag_post_ptr"][tag + 1], start + settings.FEED_CANDIDATES)
+            candidates.append(model["tag_post_idx"][start:end])
+        candidates.append(
+            np.argsort(-model["popularity"], kind="stable")[: settings.FEED_CANDIDATES]
+        )
+        candidates = np.setdiff1d(np.concatenate(candidates), positions)
+
+        sources, tags, _ = _gather(model["tag_ptr"], model["tag_idx"], candidates)
+        tag_score = np.bincount(
+            sources, weights=affinity[tags], minlength=len(candidates)
+        )
+
+        score = (
+            co_like[candidates] / max(co_like.max(), 1e-9)
+            + settings.FEED_TAG_WEIGHT * tag_score / max(np.abs(affinity).sum(), 1e-9)
+            + settings.FEED_POPULARITY_WEIGHT
+            * np.log1p(model["popularity"][candidates])
+            / np.log1p(max(model["popularity"].max(), 1))
+        )
+        top = np.argsort(-score, kind="stable")[: settings.FEED_CANDIDATES]
+        return post_ids[candidates[top]].tolist()
+
+
+recommender = Recommender()
+
+
+training_lock = Lock()
+
+
+def save_model():
+    if not training_lock.acquire(blocking=False):
+        return
+    db = SessionLocal()
+    try:
+        model = train(db)
+        path = settings.FEED_MODEL_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(f"{path}.tmp.npz", **model)
+        os.replace(f"{path}.tmp.npz", path)
+    finally:
+        db.close()
+        training_lock.release()
+
+
+if __name__ == "__main__":
+    save_model()
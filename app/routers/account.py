@@ -0,0 +1,118 @@
+import os
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.accounts import first_stage
+from app.config import settings
+from app.database import get_db
+from app.enums import AccountJobType, JobStatus
+from app.metrics import InstrumentedRoute
+from app.models import AccountJob
+from app.schemas import AccountJobResponse
+from app.utils import get_current_user
+from app.worker import run_account_jobs
+
+
+router = APIRouter(tags=["Account"], route_class=InstrumentedRoute)
+
+
+def start_job(
+    db: Session, user, job_type: AccountJobType, background_tasks: BackgroundTasks
+) -> AccountJob:
+    job = (
+        db.query(AccountJob)
+        .filter(
+            AccountJob.user_id == user.id,
+            AccountJob.type == job_type,
+            AccountJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+        )
+        .first()
+    )
+    if not job:
+        job = AccountJob(user_id=user.id, type=job_type, stage=first_stage(job_type))
+        db.add(job)
+    if job_type == AccountJobType.DELETE:
+        user.date_deleted = datetime.now()
+    db.commit()
+    db.refresh(job)
+
+    if not settings.MEDIA_QUEUE:
+        background_tasks.add_task(run_account_jobs)
+    return job
+
+
+def set_download(job: AccountJob) -> AccountJob:
+    if job.path:
+        job.download = f"{settings.API_URL}/jobs/{job.id}/download"
+    return job
+
+
+@router.post("/users/{username}/export", response_model=AccountJobResponse)
+def export_user(
+    username: str,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if user.username != username:
+        raise HTTPException(status_code=401, detail="Not authorized")
+
+    return start_job(db, user, AccountJobType.EXPORT, background_tasks)
+
+
+@router.delete("/users/{username}", response_model=AccountJobResponse)
+def delete_user(
+    username: str,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if user.username != username:
+        raise HTTPException(status_code=401, detail="Not authorized")
+
+    job = start_job(db, user, AccountJobType.DELETE, background_tasks)
+    response.delete_cookie("auth_token")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=AccountJobResponse)
+def get_job(
+    job_id: int,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = (
+        db.query(AccountJob)
+        .filter(AccountJob.id == job_id, AccountJob.user_id == user.id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return set_download(job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export(
+    job_id: int,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = (
+        db.query(AccountJob)
+        .filter(AccountJob.id == job_id, AccountJob.user_id == user.id)
+        .first()
+    )
+    if not job or not job.path:
+        raise HTTPException(status_code=404, detail="Export not found")
+
+    file_path = os.path.join(settings.UPLOAD_FOLDER, job.path)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Export not found")
+    return FileResponse(
+        file_path,
+        media_type="application/zip",
+        filename=f"{user.username}-export-{job.id}.zip",
+    )
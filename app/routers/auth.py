@@ -3,11 +3,12 @@ from sqlalchemy.orm import Session
 
 from app.models import User
 from app.database import get_db
+from app.metrics import InstrumentedRoute
 from app.utils import verify_password, create_token, get_current_user
 from app.schemas import UserCreate, UserBase
 
 
-router = APIRouter(tags=["Auth"])
+router = APIRouter(tags=["Auth"], route_class=InstrumentedRoute)
 
 
 @router.get("/verify-token", response_model=UserBase)
@@ -17,7 +18,11 @@ def verify_auth_token(user: dict = Depends(get_current_user)):
 
 @router.post("/login")
 def login(response: Response, user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = (
+        db.query(User)
+        .filter(User.username == user.username, User.date_deleted.is_(None))
+        .first()
+    )
     if not db_user:
         raise HTTPException(status_code=404, detail="Username or password is incorrect")
 
@@ -1,20 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
 from typing import Optional
-from sqlalchemy import desc
+from sqlalchemy import desc, select, union_all
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.database import get_db
-from app.enums import ReactionType
+from app.live import live_updates, post_channel
+from app.metrics import InstrumentedRoute
+from app.enums import NotificationType, ReactionType
 from app.models import Comment, Post, CommentReaction
-from app.schemas import CommentBase, CommentResponse, ReactionBase
-from app.utils import get_current_user, get_optional_user
+from app.notifications import notification_buffer
+from app.schemas import (
+    CommentBase,
+    CommentResponse,
+    CommentThreadResponse,
+    CommentCursorPage,
+    ReactionBase,
+)
+from app.user_stats import update_user_counters
+from app.utils import (
+    get_current_user,
+    get_optional_user,
+    comment_path,
+    comment_descendants,
+    load_comment_details,
+    paginate_rows,
+    select_comments,
+    encode_cursor,
+    decode_cursor,
+    delete_comments,
+)
 
-router = APIRouter(tags=["Post Comment"])
+router = APIRouter(tags=["Post Comment"], route_class=InstrumentedRoute)
 
 
-@router.get("/posts/{post_id}/comments", response_model=Page[CommentResponse])
+@router.get("/posts/{post_id}/comments", response_model=Page[CommentThreadResponse])
 def get_comments(
     post_id: int,
     user: Optional[dict] = Depends(get_optional_user),
@@ -24,30 +45,103 @@ def get_comments(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    paginated_comments = paginate(
-        db_post.comments.order_by(
-            desc(Comment.reaction_count), desc(Comment.date_created)
-        )
+    comments = (
+        select_comments()
+        .where(Comment.post_id == post_id, Comment.parent_id.is_(None))
+        .order_by(desc(Comment.reaction_count), desc(Comment.date_created))
     )
 
-    if user:
-        comment_ids = [comment.id for comment in paginated_comments.items]
-        reactions = (
-            db.query(CommentReaction)
-            .filter(
-                CommentReaction.comment_id.in_(comment_ids),
-                CommentReaction.user_id == user.id,
+    def load_threads(comments):
+        reply_limit = settings.COMMENT_REPLY_PREVIEW
+        first_replies = [
+            select(
+                select(Comment.id)
+                .where(comment_descendants(comment_path(comment)))
+                .order_by(Comment.path)
+                .limit(reply_limit + 1)
+                .subquery()
             )
-            .all()
-        )
+            for comment in comments
+            if comment.reply_count
+        ]
+        replies = []
+        if first_replies:
+            replies = db.execute(
+                select_comments()
+                .where(Comment.id.in_(union_all(*first_replies)))
+                .order_by(Comment.path)
+            ).all()
+
+        thread_replies = {}
+        for reply in replies:
+            root_id = int(reply.path.split("/", 1)[0])
+            thread_replies.setdefault(root_id, []).append(reply)
+
+        details = load_comment_details(db, list(comments) + replies, user)
+        threads = []
+        for comment in comments:
+            comment_replies = thread_replies.get(comment.id, [])
+            next_cursor = None
+            if len(comment_replies) > reply_limit:
+                comment_replies = comment_replies[:reply_limit]
+                next_cursor = encode_cursor(comment_replies[-1].path)
+            threads.append(
+                {
+                    **details[comment.id],
+                    "replies": [details[reply.id] for reply in comment_replies],
+                    "next_cursor": next_cursor,
+                }
+            )
+        return threads
+
+    return paginate_rows(db, comments, load_threads)
 
-        reaction_map = {reaction.comment_id: reaction.type for reaction in reactions}
-        for comment in paginated_comments.items:
-            comment.user_reaction = ReactionType.NONE
-            if reaction_map.get(comment.id):
-                comment.user_reaction = reaction_map.get(comment.id)
 
-    return paginated_comments
+@router.get(
+    "/posts/{post_id}/comments/{comment_id}/replies",
+    response_model=CommentCursorPage,
+)
+def get_comment_replies(
+    post_id: int,
+    comment_id: int,
+    cursor: str = Query(None),
+    size: int = Query(20, ge=1, le=100),
+    user: Optional[dict] = Depends(get_optional_user),
+    db: Session = Depends(get_db),
+):
+    db_comment = (
+        db.query(Comment)
+        .filter(Comment.post_id == post_id, Comment.id == comment_id)
+        .first()
+    )
+    if not db_comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    replies = (
+        select_comments()
+        .where(comment_descendants(comment_path(db_comment)))
+        .order_by(Comment.path)
+    )
+    if cursor:
+        try:
+            (path,) = decode_cursor(cursor)
+        except (TypeError, ValueError):
+            path = None
+        if not isinstance(path, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        replies = replies.where(Comment.path > path)
+    replies = db.execute(replies.limit(size + 1)).all()
+
+    next_cursor = None
+    if len(replies) > size:
+        replies = replies[:size]
+        next_cursor = encode_cursor(replies[-1].path)
+
+    details = load_comment_details(db, replies, user)
+    return {
+        "items": [details[reply.id] for reply in replies],
+        "next_cursor": next_cursor,
+    }
 
 
 @router.post("/posts/{post_id}/comments", response_model=CommentResponse)
@@ -61,10 +155,55 @@ def create_comment(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    db_comment = Comment(user_id=user.id, post_id=db_post.id, content=comment.content)
+    parent_path = None
+    if comment.parent_id:
+        db_parent = (
+            db.query(Comment)
+            .filter(Comment.id == comment.parent_id, Comment.post_id == post_id)
+            .first()
+        )
+        if not db_parent:
+            raise HTTPException(status_code=404, detail="Comment not found")
+
+        parent_path = comment_path(db_parent)
+        if parent_path.count("/") + 1 >= settings.COMMENT_MAX_DEPTH:
+            raise HTTPException(status_code=400, detail="Reply thread is too deep")
+
+    db_comment = Comment(
+        user_id=user.id,
+        post_id=db_post.id,
+        parent_id=comment.parent_id,
+        content=comment.content,
+    )
     db.add(db_comment)
+    db.flush()
+
+    db_comment.path = comment_path(db_comment)
+    if parent_path:
+        db_comment.path = f"{parent_path}/{db_comment.path}"
+        db.query(Comment).filter(Comment.id == comment.parent_id).update(
+            {Comment.reply_count: Comment.reply_count + 1}
+        )
+
+    update_user_counters(db, "comment_count", {user.id: 1})
+    notification_buffer.add(
+        db_post.user_id, NotificationType.POST_COMMENT, post_id, post_id, user.id
+    )
+    if comment.parent_id:
+        notification_buffer.add(
+            db_parent.user_id,
+            NotificationType.COMMENT_REPLY,
+            comment.parent_id,
+            post_id,
+            user.id,
+        )
     db.commit()
     db.refresh(db_comment)
+    live_updates.publish(
+        post_channel(post_id),
+        "comment",
+        {"id": db_comment.id, "parent_id": db_comment.parent_id},
+    )
     return db_comment
 
 
@@ -86,8 +225,10 @@ def delete_comment(
     )
     if not db_comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    db.delete(db_comment)
+
+    delete_comments(db, [db_comment])
     db.commit()
+    live_updates.publish(post_channel(post_id), "comment_deleted", {"id": comment_id})
     return {"detail": "Removed comment"}
 
 
@@ -116,22 +257,26 @@ def react_to_comment(
         .first()
     )
 
+    old_type = db_reaction.type if db_reaction else ReactionType.NONE
+    if reaction.type == ReactionType.LIKE and old_type != ReactionType.LIKE:
+        notification_buffer.add(
+            db_comment.user_id,
+            NotificationType.COMMENT_LIKE,
+            comment_id,
+            post_id,
+            user.id,
+        )
+
     if db_reaction:
         db_reaction.type = reaction.type
-        db.commit()
-        return {
-            "type": db_reaction.type,
-            "likes": db_comment.likes,
-            "dislikes": db_comment.dislikes,
-        }
-
-    comment_reaction = CommentReaction(
-        user_id=user.id, comment_id=comment_id, type=reaction.type
-    )
-    db.add(comment_reaction)
+    else:
+        db.add(
+            CommentReaction(user_id=user.id, comment_id=comment_id, type=reaction.type)
+        )
     db.commit()
-    return {
-        "type": comment_reaction.type,
-        "likes": db_comment.likes,
-        "dislikes": db_comment.dislikes,
-    }
+
+    counts = {"likes": db_comment.likes, "dislikes": db_comment.dislikes}
+    live_updates.publish(
+        post_channel(post_id), "comment_reaction", {"id": comment_id, **counts}
+    )
+    return {"type": reaction.type, **counts}
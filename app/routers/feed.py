@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from fastapi_pagination import Page, paginate
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.metrics import InstrumentedRoute
+from app.models import Post
+from app.recommender import recommender
+from app.schemas import PostBase
+from app.utils import get_optional_user, set_post_thumbnails
+
+router = APIRouter(tags=["Feed"], route_class=InstrumentedRoute)
+
+
+@router.get("/feed/for-you", response_model=Page[PostBase])
+def get_for_you_feed(
+    user: Optional[dict] = Depends(get_optional_user),
+    db: Session = Depends(get_db),
+):
+    post_ids = recommender.rank(db, user.id if user else None)
+
+    def load_posts(page_ids):
+        posts = {post.id: post for post in db.query(Post).filter(Post.id.in_(page_ids))}
+        return [posts[post_id] for post_id in page_ids if post_id in posts]
+
+    paginated_posts = paginate(post_ids, transformer=load_posts, safe=True)
+    set_post_thumbnails(db, paginated_posts.items)
+    return paginated_posts
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.live import live_updates, post_channel
+from app.metrics import InstrumentedRoute
+from app.models import Post
+
+router = APIRouter(tags=["Live"], route_class=InstrumentedRoute)
+
+
+@router.get("/posts/{post_id}/live")
+def stream_post_updates(post_id: int, db: Session = Depends(get_db)):
+    if not db.query(Post.id).filter(Post.id == post_id).first():
+        raise HTTPException(status_code=404, detail="Post not found")
+    if live_updates.is_full():
+        raise HTTPException(
+            status_code=503, detail="Server is busy", headers={"Retry-After": "5"}
+        )
+
+    return StreamingResponse(
+        live_updates.stream(post_channel(post_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,106 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from humanize import naturaltime
+from sqlalchemy import desc, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.metrics import InstrumentedRoute
+from app.models import Notification, User
+from app.notifications import mark_read
+from app.schemas import NotificationCursorPage, NotificationsRead
+from app.utils import (
+    check_batch_size,
+    decode_cursor,
+    encode_cursor,
+    get_current_user,
+    user_summary,
+)
+
+router = APIRouter(tags=["Notification"], route_class=InstrumentedRoute)
+
+
+@router.get("/notifications", response_model=NotificationCursorPage)
+def get_notifications(
+    cursor: str = Query(None),
+    size: int = Query(20, ge=1, le=100),
+    unread: bool = Query(False),
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    notifications = (
+        select(
+            Notification.id,
+            Notification.type,
+            Notification.target_id,
+            Notification.post_id,
+            Notification.actor_count,
+            Notification.date_updated,
+            Notification.date_read,
+            User.id.label("actor_id"),
+            User.username,
+            User.profile_picture,
+        )
+        .outerjoin(User, User.id == Notification.last_actor_id)
+        .where(Notification.user_id == user.id)
+        .order_by(desc(Notification.date_updated), desc(Notification.id))
+    )
+    if unread:
+        notifications = notifications.where(Notification.date_read.is_(None))
+    if cursor:
+        try:
+            date_updated, notification_id = decode_cursor(cursor)
+            date_updated = datetime.fromisoformat(date_updated)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        notifications = notifications.where(
+            tuple_(Notification.date_updated, Notification.id)
+            < tuple_(date_updated, notification_id)
+        )
+    rows = db.execute(notifications.limit(size + 1)).all()
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].date_updated, rows[-1].id)
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "type": row.type,
+                "target_id": row.target_id,
+                "post_id": row.post_id,
+                "actor_count": row.actor_count,
+                "actor": (
+                    user_summary(row.actor_id, row.username, row.profile_picture)
+                    if row.actor_id
+                    else None
+                ),
+                "date_updated": row.date_updated,
+                "time_since": naturaltime(datetime.now() - row.date_updated),
+                "read": row.date_read is not None,
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+        "unread_count": user.unread_notification_count,
+    }
+
+
+@router.get("/notifications/unread-count")
+def get_unread_count(user: dict = Depends(get_current_user)):
+    return {"unread_count": user.unread_notification_count}
+
+
+@router.post("/notifications:read")
+def read_notifications(
+    read: NotificationsRead,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if read.ids is not None:
+        check_batch_size(read.ids)
+    count = mark_read(db, user.id, read.ids)
+    db.commit()
+    return {"detail": "Notifications read", "count": count}
@@ -1,50 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Form, File, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Form,
+    File,
+    UploadFile,
+)
 from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import or_, desc
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, desc, func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import Optional
 
 from app.config import settings
 from app.database import get_db
-from app.models import Post, PostReaction, PostFile, Tag
-from app.schemas import PostCreate, PostResponse, ReactionBase, PostBase
+from app.live import live_updates, post_channel
+from app.metrics import InstrumentedRoute
+from app.enums import NotificationType, ReactionType
+from app.models import Post, PostReaction, PostFile, Tag, post_tag
+from app.schemas import (
+    PostCreate,
+    PostResponse,
+    PostCreateResponse,
+    ReactionBase,
+    PostBase,
+    PostsDelete,
+)
+from app.notifications import notification_buffer
+from app.reactions import apply_reaction, reaction_buffer
+from app.similarity import find_similar_posts
+from app.tag_index import tag_index
+from app.user_stats import update_user_counters
+from app.worker import run_file_deletions
 from app.utils import (
     add_tag,
+    check_batch_size,
+    delete_posts,
     get_current_user,
     get_optional_user,
     validate_files,
     add_files,
+    load_post_cards,
+    paginate_rows,
+    parse_ids,
+    set_post_thumbnails,
 )
 
 
-router = APIRouter(tags=["Post"])
+router = APIRouter(tags=["Post"], route_class=InstrumentedRoute)
 
 
 @router.get("/posts", response_model=Page[PostBase])
 def get_posts(query: str = Query(None, min_length=1), db: Session = Depends(get_db)):
-    posts = db.query(Post).order_by(desc(Post.reaction_count), desc(Post.date_created))
+    posts = select(Post.id).order_by(
+        desc(Post.reaction_count), desc(Post.date_created)
+    )
 
     if query:
-        posts = posts.filter(
+        posts = posts.where(
             or_(
                 Post.title.ilike(f"%{query}%"),
                 Post.tags.any(Tag.name.ilike(f"%{query}%")),
             )
         )
 
-    paginated_posts = paginate(posts)
-    for post in paginated_posts.items:
-        post_file = db.query(PostFile).filter(PostFile.post_id == post.id).first()
-        if post_file:
-            post.thumbnail = f"{settings.API_URL}/posts/{post.id}/files/{post_file.filename}?type=thumbnail"
-    return paginated_posts
+    return paginate_rows(
+        db, posts, lambda rows: load_post_cards(db, [post_id for (post_id,) in rows])
+    )
 
 
-@router.post("/posts", response_model=PostResponse)
+@router.post("/posts", response_model=PostCreateResponse)
 async def create_post(
     title: Optional[str] = Form(None),
     files: list[UploadFile] = File(...),
+    check_duplicates: bool = Form(False),
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -52,13 +82,86 @@ async def create_post(
 
     db_post = Post(title=title, user_id=user.id)
     db.add(db_post)
+    update_user_counters(db, "post_count", {user.id: 1})
     db.commit()
     db.refresh(db_post)
 
-    await add_files(db, files, db_post, user)
+    post_files = await add_files(db, files, db_post, user)
+    if check_duplicates:
+        hashes = [post_file.phash for post_file in post_files if post_file.phash]
+        db_post.duplicates = find_similar_posts(db, db_post.id, hashes)
     return db_post
 
 
+@router.get("/posts:batch", response_model=list[PostResponse])
+def get_posts_batch(
+    ids: str = Query(..., min_length=1),
+    user: Optional[dict] = Depends(get_optional_user),
+    db: Session = Depends(get_db),
+):
+    post_ids = parse_ids(ids)
+    posts = {
+        post.id: post
+        for post in db.query(Post)
+        .options(joinedload(Post.user), selectinload(Post.tags))
+        .filter(Post.id.in_(post_ids))
+    }
+
+    tag_ids = {tag.id for post in posts.values() for tag in post.tags}
+    tag_counts = {}
+    if tag_ids:
+        tag_counts = dict(
+            db.query(post_tag.c.tag_id, func.count())
+            .filter(post_tag.c.tag_id.in_(tag_ids))
+            .group_by(post_tag.c.tag_id)
+        )
+
+    reactions = {}
+    if user and posts:
+        reactions = dict(
+            db.query(PostReaction.post_id, PostReaction.type).filter(
+                PostReaction.user_id == user.id, PostReaction.post_id.in_(posts)
+            )
+        )
+
+    results = []
+    for post_id in post_ids:
+        post = posts.get(post_id)
+        if not post:
+            continue
+
+        likes, dislikes = post.like_count, post.dislike_count
+        user_reaction = reactions.get(post_id, ReactionType.NONE)
+        if settings.REACTION_WRITE_BEHIND:
+            like_delta, dislike_delta = reaction_buffer.delta(post_id)
+            likes += like_delta
+            dislikes += dislike_delta
+            if user:
+                user_reaction = reaction_buffer.get(user.id, post_id) or user_reaction
+
+        results.append(
+            {
+                "id": post.id,
+                "title": post.title,
+                "date_created": post.date_created,
+                "time_since": post.time_since,
+                "likes": likes,
+                "dislikes": dislikes,
+                "user_reaction": user_reaction,
+                "user": {
+                    "id": post.user.id,
+                    "username": post.user.username,
+                    "avatar": post.user.avatar,
+                },
+                "tags": [
+                    {"name": tag.name, "type": tag.type, "count": tag_counts[tag.id]}
+                    for tag in post.tags
+                ],
+            }
+        )
+    return results
+
+
 @router.get("/posts/{post_id}", response_model=PostResponse)
 def get_post(
     post_id: int,
@@ -74,9 +177,65 @@ def get_post(
         if reaction:
             db_post.user_reaction = reaction.type
 
+    if settings.REACTION_WRITE_BEHIND:
+        response = PostResponse.model_validate(db_post, from_attributes=True)
+        likes, dislikes = reaction_buffer.delta(post_id)
+        response.likes += likes
+        response.dislikes += dislikes
+        if user:
+            response.user_reaction = (
+                reaction_buffer.get(user.id, post_id) or response.user_reaction
+            )
+        return response
+
     return db_post
 
 
+@router.get("/posts/{post_id}/similar", response_model=list[PostBase])
+def get_similar_posts(
+    post_id: int,
+    distance: int = Query(settings.SIMILARITY_DISTANCE, ge=0, le=32),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    db_post = db.query(Post).filter(Post.id == post_id).first()
+    if not db_post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    hashes = [
+        phash
+        for (phash,) in db.query(PostFile.phash).filter(
+            PostFile.post_id == post_id, PostFile.phash.isnot(None), PostFile.phash != ""
+        )
+    ]
+    post_ids = find_similar_posts(db, post_id, hashes, distance, limit)
+    rank = {similar_id: index for index, similar_id in enumerate(post_ids)}
+    posts = db.query(Post).filter(Post.id.in_(post_ids)).all()
+    posts = sorted(posts, key=lambda post: rank[post.id])
+
+    set_post_thumbnails(db, posts)
+    return posts
+
+
+@router.get("/posts/{post_id}/related", response_model=list[PostBase])
+def get_related_posts(
+    post_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    db_post = db.query(Post).filter(Post.id == post_id).first()
+    if not db_post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    post_ids = tag_index.related_posts(post_id, limit)
+    rank = {related_id: index for index, related_id in enumerate(post_ids)}
+    posts = db.query(Post).filter(Post.id.in_(post_ids)).all()
+    posts = sorted(posts, key=lambda post: rank[post.id])
+
+    set_post_thumbnails(db, posts)
+    return posts
+
+
 @router.put("/posts/{post_id}", response_model=PostResponse)
 def update_post(
     post_id: int,
@@ -102,6 +261,7 @@ def update_post(
 @router.delete("/posts/{post_id}")
 def delete_post(
     post_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user: dict = Depends(get_current_user),
 ):
@@ -109,11 +269,36 @@ def delete_post(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    db.delete(db_post)
+    delete_posts(db, [post_id])
     db.commit()
+    tag_index.remove_post(post_id)
+    if not settings.MEDIA_QUEUE:
+        background_tasks.add_task(run_file_deletions)
     return {"detail": "Post removed"}
 
 
+@router.delete("/posts")
+def delete_many_posts(
+    posts: PostsDelete,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: dict = Depends(get_current_user),
+):
+    post_ids = list(dict.fromkeys(posts.post_ids))
+    check_batch_size(post_ids)
+    post_ids = db.scalars(
+        select(Post.id).where(Post.id.in_(post_ids), Post.user_id == user.id)
+    ).all()
+    if post_ids:
+        delete_posts(db, post_ids)
+        db.commit()
+        for post_id in post_ids:
+            tag_index.remove_post(post_id)
+        if not settings.MEDIA_QUEUE:
+            background_tasks.add_task(run_file_deletions)
+    return {"detail": "Posts removed", "count": len(post_ids)}
+
+
 @router.post("/posts/{post_id}/reactions")
 def react_to_post(
     reaction: ReactionBase,
@@ -125,28 +310,23 @@ def react_to_post(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    db_reaction = (
-        db.query(PostReaction)
-        .filter(
-            PostReaction.post_id == post_id,
-            PostReaction.user_id == user.id,
-        )
-        .first()
-    )
-    if db_reaction:
-        db_reaction.type = reaction.type
-        db.commit()
-        return {
-            "type": db_reaction.type,
-            "likes": db_post.likes,
-            "dislikes": db_post.dislikes,
+    owner_id = db_post.user_id
+    if settings.REACTION_WRITE_BEHIND:
+        old_type = reaction_buffer.add(db, user.id, post_id, reaction.type)
+        likes, dislikes = reaction_buffer.delta(post_id)
+        counts = {
+            "likes": db_post.likes + likes,
+            "dislikes": db_post.dislikes + dislikes,
         }
+    else:
+        old_type = apply_reaction(db, user.id, post_id, reaction.type)
+        db.refresh(db_post)
+        counts = {"likes": db_post.likes, "dislikes": db_post.dislikes}
 
-    post_reaction = PostReaction(user_id=user.id, post_id=post_id, type=reaction.type)
-    db.add(post_reaction)
-    db.commit()
-    return {
-        "type": post_reaction.type,
-        "likes": db_post.likes,
-        "dislikes": db_post.dislikes,
-    }
+    if reaction.type == ReactionType.LIKE and old_type != ReactionType.LIKE:
+        notification_buffer.add(
+            owner_id, NotificationType.POST_LIKE, post_id, post_id, user.id
+        )
+
+    live_updates.publish(post_channel(post_id), "reaction", counts)
+    return {"type": reaction.type, **counts}
@@ -1,5 +1,14 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Query,
+)
 from fastapi.responses import FileResponse
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -8,12 +17,43 @@ from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import get_db
+from app.metrics import InstrumentedRoute
 from app.models import Post, PostFile
-from app.schemas import FileBase
-from app.utils import get_current_user, validate_files, add_files
-
-
-router = APIRouter(tags=["Post File"])
+from app.schemas import FileBase, PostFilesResponse
+from app.similarity import find_similar_posts
+from app.utils import (
+    get_current_user,
+    validate_files,
+    add_files,
+    file_fields,
+    parse_ids,
+    post_file_paths,
+    queue_file_deletions,
+)
+from app.worker import run_file_deletions
+
+
+router = APIRouter(tags=["Post File"], route_class=InstrumentedRoute)
+
+
+@router.get("/posts:files", response_model=list[PostFilesResponse])
+def get_posts_files(ids: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+    post_ids = parse_ids(ids)
+    files = {
+        post_id: []
+        for (post_id,) in db.query(Post.id).filter(Post.id.in_(post_ids))
+    }
+    for file in (
+        db.query(PostFile)
+        .filter(PostFile.post_id.in_(post_ids))
+        .order_by(PostFile.post_id, PostFile.id)
+    ):
+        files[file.post_id].append(file_fields(file.post_id, file))
+    return [
+        {"post_id": post_id, "files": files[post_id]}
+        for post_id in post_ids
+        if post_id in files
+    ]
 
 
 @router.get("/posts/{post_id}/files", response_model=Page[FileBase])
@@ -25,6 +65,8 @@ def get_post_files(post_id: int, db: Session = Depends(get_db)):
     paginated_files = paginate(db_post.files)
     for file in paginated_files.items:
         file.src = f"{settings.API_URL}/posts/{db_post.id}/files/{file.filename}"
+        if file.preview_path:
+            file.preview = f"{file.src}?type=preview"
     return paginated_files
 
 
@@ -33,6 +75,7 @@ async def upload_files(
     post_id: int,
     user: dict = Depends(get_current_user),
     files: list[UploadFile] = File(...),
+    check_duplicates: bool = Form(False),
     db: Session = Depends(get_db),
 ):
     post = db.query(Post).filter(Post.id == post_id, Post.user_id == user.id).first()
@@ -40,7 +83,11 @@ async def upload_files(
         raise HTTPException(status_code=404, detail="Post not found")
 
     validate_files(files)
-    await add_files(db, files, post, user)
+    post_files = await add_files(db, files, post, user)
+    if check_duplicates:
+        hashes = [post_file.phash for post_file in post_files if post_file.phash]
+        duplicates = find_similar_posts(db, post.id, hashes)
+        return {"detail": "Files added", "duplicates": duplicates}
     return {"detail": "Files added"}
 
 
@@ -57,20 +104,27 @@ def get_file(
         raise HTTPException(status_code=404, detail="File not found")
 
     path = file.file_path
+    media_type = file.content_type
     if type == "thumbnail":
         path = file.thumbnail_path
+    elif type == "preview":
+        if not file.preview_path:
+            raise HTTPException(status_code=404, detail="Preview not found")
+        path = file.preview_path
+        media_type = None
 
     file_path = os.path.join(settings.UPLOAD_FOLDER, path)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path, media_type=file.content_type)
+    return FileResponse(file_path, media_type=media_type)
 
 
 @router.delete("/posts/{post_id}/files/{file_id}")
 def delete_file(
     post_id: int,
     file_id: int,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -86,10 +140,9 @@ def delete_file(
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    file_path = os.path.join(settings.UPLOAD_FOLDER, file.file_path)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
+    queue_file_deletions(db, post_file_paths([file]))
     db.delete(file)
     db.commit()
+    if not settings.MEDIA_QUEUE:
+        background_tasks.add_task(run_file_deletions)
     return {"detail": "Removed file"}
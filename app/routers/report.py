@@ -1,20 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_pagination import Page
+from sqlalchemy import desc, select
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Literal
 
 from app.database import get_db
+from app.metrics import InstrumentedRoute
 from app.enums import ReportType
-from app.models import Report, Comment, User, Post
-from app.schemas import ReportCreate, ReportResponse
-from app.utils import get_optional_user
+from app.models import Report, ReportSummary, Comment, User, Post
+from app.moderation import add_report, resolve_reports
+from app.schemas import (
+    ReportCreate,
+    ReportResolve,
+    ReportResponse,
+    ReportSummaryResponse,
+)
+from app.utils import (
+    check_batch_size,
+    get_current_user,
+    get_moderator,
+    paginate_rows,
+    user_summary,
+)
 
-router = APIRouter(tags=["Report"])
+router = APIRouter(tags=["Report"], route_class=InstrumentedRoute)
 
 
 @router.post("/reports", response_model=ReportResponse)
 def create_report(
     report: ReportCreate,
-    user: Optional[dict] = Depends(get_optional_user),
+    user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if report.target_type == ReportType.USER:
@@ -32,13 +47,96 @@ def create_report(
         if not db_comment:
             raise HTTPException(status_code=404, detail="Comment not found")
 
-    db_report = Report(
-        user_id=user.id,
-        target_id=report.target_id,
-        target_type=report.target_type,
-        detail=report.detail,
+    add_report(db, user.id, report.target_type, report.target_id, report.detail)
+    db.commit()
+    return (
+        db.query(Report)
+        .filter(
+            Report.user_id == user.id,
+            Report.target_type == report.target_type,
+            Report.target_id == report.target_id,
+        )
+        .one()
+    )
+
+
+@router.get("/reports", response_model=Page[ReportSummaryResponse])
+def get_report_queue(
+    sort: Literal["count", "recent"] = Query("count"),
+    target_type: ReportType = Query(None),
+    user: dict = Depends(get_moderator),
+    db: Session = Depends(get_db),
+):
+    summaries = select(
+        ReportSummary.target_type,
+        ReportSummary.target_id,
+        ReportSummary.report_count,
+        ReportSummary.date_created,
+        ReportSummary.last_reported,
+    ).where(ReportSummary.report_count > 0)
+    if target_type:
+        summaries = summaries.where(ReportSummary.target_type == target_type)
+    if sort == "count":
+        summaries = summaries.order_by(
+            desc(ReportSummary.report_count), desc(ReportSummary.last_reported)
+        )
+    else:
+        summaries = summaries.order_by(desc(ReportSummary.last_reported))
+
+    return paginate_rows(db, summaries, lambda rows: [row._asdict() for row in rows])
+
+
+@router.get("/reports/{target_type}/{target_id}", response_model=Page[ReportResponse])
+def get_target_reports(
+    target_type: ReportType,
+    target_id: int,
+    user: dict = Depends(get_moderator),
+    db: Session = Depends(get_db),
+):
+    reports = (
+        select(
+            Report.id,
+            Report.date_created,
+            Report.target_id,
+            Report.target_type,
+            Report.detail,
+            User.id.label("user_id"),
+            User.username,
+            User.profile_picture,
+        )
+        .join(User, User.id == Report.user_id)
+        .where(Report.target_type == target_type, Report.target_id == target_id)
+        .order_by(desc(Report.date_created), desc(Report.id))
+    )
+
+    def load_reports(rows):
+        return [
+            {
+                "id": row.id,
+                "date_created": row.date_created,
+                "target_id": row.target_id,
+                "target_type": row.target_type,
+                "detail": row.detail,
+                "user": user_summary(row.user_id, row.username, row.profile_picture),
+            }
+            for row in rows
+        ]
+
+    return paginate_rows(db, reports, load_reports)
+
+
+@router.post("/reports:resolve")
+def resolve_report_targets(
+    resolve: ReportResolve,
+    user: dict = Depends(get_moderator),
+    db: Session = Depends(get_db),
+):
+    targets = list(
+        dict.fromkeys(
+            (target.target_type, target.target_id) for target in resolve.targets
+        )
     )
-    db.add(db_report)
+    check_batch_size(targets)
+    count = resolve_reports(db, targets, user.id)
     db.commit()
-    db.refresh(db_report)
-    return db_report
+    return {"detail": "Reports resolved", "count": count}
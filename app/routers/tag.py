@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.metrics import InstrumentedRoute
 from app.enums import TagType
-from app.models import Tag
+from app.models import Tag, post_tag
 from app.schemas import TagBase
+from app.tag_index import tag_index
 
-router = APIRouter(tags=["Tag"])
+router = APIRouter(tags=["Tag"], route_class=InstrumentedRoute)
 
 
 @router.get("/tags", response_model=Page[TagBase])
@@ -25,4 +28,45 @@ def get_tags(
     if type:
         tags = tags.filter(Tag.type == type)
 
-    return paginate(tags)
+    def load_counts(tags):
+        counts = dict(
+            db.query(post_tag.c.tag_id, func.count())
+            .filter(post_tag.c.tag_id.in_([tag.id for tag in tags]))
+            .group_by(post_tag.c.tag_id)
+        )
+        return [
+            {"name": tag.name, "type": tag.type, "count": counts.get(tag.id, 0)}
+            for tag in tags
+        ]
+
+    return paginate(tags, transformer=load_counts)
+
+
+@router.get("/tags/{name}/related", response_model=list[TagBase])
+def get_related_tags(
+    name: str,
+    type: TagType = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    db_tag = db.query(Tag).filter(Tag.name == name)
+    if type:
+        db_tag = db_tag.filter(Tag.type == type)
+    db_tag = db_tag.first()
+    if not db_tag:
+        raise HTTPException(status_code=404, detail="Tag not found")
+
+    related = tag_index.related_tags(db_tag.id, limit)
+    tags = {
+        tag.id: tag
+        for tag in db.query(Tag).filter(Tag.id.in_([tag_id for tag_id, _ in related]))
+    }
+    return [
+        {
+            "name": tags[tag_id].name,
+            "type": tags[tag_id].type,
+            "count": tag_index.tag_count(tag_id),
+        }
+        for tag_id, _ in related
+        if tag_id in tags
+    ]
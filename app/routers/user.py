@@ -1,22 +1,61 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Path,
+    Response,
+    Query,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
 from typing import Optional
-from sqlalchemy import desc
+from sqlalchemy import desc, exists, func, select, union_all
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from uuid import uuid4
 
 import app.schemas as schemas
+from app.avatars import (
+    AVATAR_FOLDER,
+    avatar_files,
+    avatar_path,
+    avatar_url,
+    is_avatar,
+)
 from app.enums import ReactionType, Privacy
 from app.config import settings
 from app.database import get_db
-from app.models import User, PostFile, PostReaction, CommentReaction, Comment, Post
-from app.utils import hash_password, create_token, get_current_user, get_optional_user
+from app.metrics import InstrumentedRoute
+from app.models import (
+    User,
+    PostReaction,
+    Comment,
+    Post,
+    Vault,
+    post_vault,
+)
+from app.user_stats import get_profile, get_profiles, profile_cache
+from app.utils import (
+    check_batch_size,
+    hash_password,
+    create_token,
+    get_current_user,
+    get_optional_user,
+    load_comment_details,
+    paginate_rows,
+    queue_file_deletions,
+    select_comments,
+    set_post_thumbnails,
+)
+from app.worker import run_file_deletions
 
 
-router = APIRouter(tags=["User"])
+router = APIRouter(tags=["User"], route_class=InstrumentedRoute)
 
 
 @router.post("/users")
@@ -31,7 +70,11 @@ def register_user(
     db_user = User(username=user.username, password=hashed_password, profile_picture="")
 
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Username is already taken")
     db.refresh(db_user)
 
     token = create_token(db_user.id)
@@ -41,10 +84,17 @@ def register_user(
 
 @router.get("/users/{username}", response_model=schemas.UserResponse)
 def get_user(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
+    profile = get_profile(db, username)
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return profile
+
+
+@router.post("/users:batch", response_model=list[schemas.UserResponse])
+def get_users(batch: schemas.UserBatch, db: Session = Depends(get_db)):
+    usernames = list(dict.fromkeys(batch.usernames))
+    check_batch_size(usernames)
+    return get_profiles(db, usernames)
 
 
 @router.get("/users/{username}/posts", response_model=Page[schemas.PostBase])
@@ -54,10 +104,7 @@ def get_user_posts(username: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
 
     paginated_posts = paginate(user.posts.order_by(desc(Post.date_created)))
-    for post in paginated_posts.items:
-        post_file = db.query(PostFile).filter(PostFile.post_id == post.id).first()
-        if post_file:
-            post.thumbnail = f"{settings.API_URL}/posts/{post.id}/files/{post_file.filename}?type=thumbnail"
+    set_post_thumbnails(db, paginated_posts.items)
     return paginated_posts
 
 
@@ -72,15 +119,17 @@ def get_user_post_reactions(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    post_reactions = user.post_reactions
+    posts = (
+        db.query(Post)
+        .join(PostReaction, PostReaction.post_id == Post.id)
+        .filter(PostReaction.user_id == user.id)
+        .order_by(desc(PostReaction.date_created))
+    )
     if type:
-        post_reactions = post_reactions.filter(PostReaction.type == type)
+        posts = posts.filter(PostReaction.type == type)
 
-    paginated_posts = paginate(post_reactions)
-    for post in paginated_posts.items:
-        post_file = db.query(PostFile).filter(PostFile.post_id == post.id).first()
-        if post_file:
-            post.thumbnail = f"{settings.API_URL}/posts/{post.id}/files/{post_file.filename}?type=thumbnail"
+    paginated_posts = paginate(posts)
+    set_post_thumbnails(db, paginated_posts.items)
 
     return paginated_posts
 
@@ -95,24 +144,17 @@ def get_user_comments(
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    paginated_comments = paginate(db_user.comments.order_by(desc(Comment.date_created)))
-    if user:
-        comment_ids = [comment.id for comment in paginated_comments.items]
-        reactions = (
-            db.query(CommentReaction)
-            .filter(
-                CommentReaction.comment_id.in_(comment_ids),
-                CommentReaction.user_id == user.id,
-            )
-            .all()
-        )
+    comments = (
+        select_comments()
+        .where(Comment.user_id == db_user.id)
+        .order_by(desc(Comment.date_created))
+    )
 
-        reaction_map = {reaction.comment_id: reaction.type for reaction in reactions}
-        for comment in paginated_comments.items:
-            comment.user_reaction = ReactionType.NONE
-            if reaction_map.get(comment.id):
-                comment.user_reaction = reaction_map.get(comment.id)
-    return paginated_comments
+    def load_comments(comments):
+        details = load_comment_details(db, comments, user)
+        return [details[comment.id] for comment in comments]
+
+    return paginate_rows(db, comments, load_comments)
 
 
 @router.get("/users/{username}/vaults", response_model=Page[schemas.UserVaultResponse])
@@ -126,35 +168,90 @@ def get_user_vaults(
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    paginated_vaults = paginate(db_user.vaults)
-    if not user:
-        paginated_vaults.items = [
-            vault for vault in paginated_vaults.items if vault.privacy == Privacy.PUBLIC
-        ]
-    elif user.id != db_user.id:
-        paginated_vaults.items = [
-            vault for vault in paginated_vaults.items if vault.privacy == Privacy.PUBLIC
-        ]
-
-    for vault in paginated_vaults.items[:]:
-        has_post = any(post_id == post.id for post in vault.posts)
-
-        vault.has_post = has_post
-        vault.posts = vault.posts[-3:]
+    has_post = exists().where(
+        post_vault.c.vault_id == Vault.id, post_vault.c.post_id == post_id
+    )
+    vaults = db.query(Vault, has_post.label("has_post")).filter(
+        Vault.user_id == db_user.id
+    )
+    if not user or user.id != db_user.id:
+        vaults = vaults.filter(Vault.privacy == Privacy.PUBLIC)
+
+    def load_vaults(rows):
+        vault_ids = [vault.id for vault, _ in rows]
+        post_counts = dict(
+            db.query(post_vault.c.vault_id, func.count())
+            .filter(post_vault.c.vault_id.in_(vault_ids))
+            .group_by(post_vault.c.vault_id)
+        )
 
-        for post in vault.posts:
-            post_file = db.query(PostFile).filter(PostFile.post_id == post.id).first()
-            if post_file:
-                post.thumbnail = f"{settings.API_URL}/posts/{post.id}/files/{post_file.filename}?type=thumbnail"
+        latest = union_all(
+            *(
+                select(
+                    select(
+                        post_vault.c.vault_id,
+                        post_vault.c.post_id,
+                        post_vault.c.date_added,
+                    )
+                    .where(post_vault.c.vault_id == vault_id)
+                    .order_by(
+                        desc(post_vault.c.date_added), desc(post_vault.c.post_id)
+                    )
+                    .limit(3)
+                    .subquery()
+                )
+                for vault_id in vault_ids
+            )
+        ).subquery()
+        previews = (
+            db.query(latest.c.vault_id, Post)
+            .join(Post, Post.id == latest.c.post_id)
+            .order_by(
+                latest.c.vault_id, desc(latest.c.date_added), desc(latest.c.post_id)
+            )
+            .all()
+            if vault_ids
+            else []
+        )
+        set_post_thumbnails(db, [post for _, post in previews])
+
+        vault_posts = {}
+        for vault_id, post in previews:
+            vault_posts.setdefault(vault_id, []).append(post)
+
+        return [
+            {
+                "id": vault.id,
+                "title": vault.title,
+                "privacy": vault.privacy,
+                "time_since": vault.time_since,
+                "user": db_user,
+                "post_count": post_counts.get(vault.id, 0),
+                "has_post": vault_has_post,
+                "posts": vault_posts.get(vault.id, []),
+            }
+            for vault, vault_has_post in rows
+        ]
 
-    return paginated_vaults
+    vaults = vaults.order_by(desc(Vault.date_created), desc(Vault.id))
+    return paginate(vaults, transformer=load_vaults)
 
 
 @router.get("/users/{username}/profile-picture")
-def get_user_profile_picture(username: str, db: Session = Depends(get_db)):
+def get_user_profile_picture(
+    username: str, size: int = Query(None), db: Session = Depends(get_db)
+):
     user = db.query(User).filter(User.username == username).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if not user.profile_picture:
+        raise HTTPException(status_code=404, detail="file not found")
+
+    if is_avatar(user.profile_picture):
+        sizes = sorted(settings.AVATAR_SIZES)
+        wanted = size or sizes[-1]
+        size = next((option for option in sizes if option >= wanted), sizes[-1])
+        return RedirectResponse(avatar_url(username, user.profile_picture, size))
 
     file_path = os.path.join(settings.UPLOAD_FOLDER, user.profile_picture)
     if not os.path.exists(file_path):
@@ -162,9 +259,29 @@ def get_user_profile_picture(username: str, db: Session = Depends(get_db)):
     return FileResponse(file_path)
 
 
+@router.get("/avatars/{avatar_id}/{size}.webp")
+def get_avatar(
+    size: int, avatar_id: str = Path(..., pattern="^[0-9a-f]{32}$")
+):
+    if size not in settings.AVATAR_SIZES:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    file_path = os.path.join(
+        settings.UPLOAD_FOLDER, avatar_path(f"{AVATAR_FOLDER}/{avatar_id}", size)
+    )
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    return FileResponse(
+        file_path,
+        media_type="image/webp",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
 @router.post("/users/{username}/profile-picture")
 async def upload_user_profile_picture(
     username: str,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -175,16 +292,22 @@ async def upload_user_profile_picture(
     if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    _, ext = os.path.splitext(file.filename)
-    unique_filename = f"{uuid4().hex}{ext}"
-    upload_path = os.path.join(settings.UPLOAD_FOLDER, user.username, "profilepicture")
-    file_path = os.path.join(upload_path, unique_filename)
+    data = await file.read(settings.AVATAR_MAX_FILE_SIZE + 1)
+    if len(data) > settings.AVATAR_MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="File too large")
 
-    os.makedirs(upload_path, exist_ok=True)
-    with open(file_path, "wb") as f:
-        while content := await file.read(1024 * 1024):
-            f.write(content)
+    from app.media import create_avatars
 
-    user.profile_picture = os.path.relpath(file_path, settings.UPLOAD_FOLDER)
+    user_id = user.id
+    profile_picture = await run_in_threadpool(create_avatars, data, user_id)
+    if profile_picture != user.profile_picture:
+        queue_file_deletions(db, set(avatar_files(user.profile_picture)))
+        user.profile_picture = profile_picture
     db.commit()
-    return {"detail": "Updated user profile picture"}
+    profile_cache.invalidate([user_id])
+    if not settings.MEDIA_QUEUE:
+        background_tasks.add_task(run_file_deletions)
+    return {
+        "detail": "Updated user profile picture",
+        "avatar": avatar_url(username, profile_picture),
+    }
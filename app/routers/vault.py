@@ -1,15 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
+from sqlalchemy import (
+    String,
+    delete,
+    desc,
+    insert,
+    literal,
+    select,
+    tuple_,
+    type_coerce,
+    update,
+)
 from sqlalchemy.orm import Session
 
-from app.config import settings
 from app.database import get_db
-from app.models import Vault, Post, PostFile
-from app.schemas import VaultBase, VaultResponse, PostBase
-from app.utils import get_current_user
+from app.metrics import InstrumentedRoute
+from app.enums import NotificationType, Privacy
+from app.models import Vault, Post, post_vault
+from app.notifications import notification_buffer
+from app.schemas import (
+    VaultBase,
+    VaultResponse,
+    PostBase,
+    PostCursorPage,
+    VaultPostsUpdate,
+    VaultPostPosition,
+)
+from app.user_stats import update_user_counters
+from app.utils import (
+    get_current_user,
+    set_post_thumbnails,
+    encode_cursor,
+    decode_cursor,
+    vault_has_post,
+)
 
-router = APIRouter(tags=["Vault"])
+router = APIRouter(tags=["Vault"], route_class=InstrumentedRoute)
 
 
 @router.post("/vaults", response_model=VaultResponse)
@@ -28,6 +56,7 @@ def create_vault(
 
     db_vault = Vault(title=vault.title, user_id=user.id, privacy=vault.privacy)
     db.add(db_vault)
+    update_user_counters(db, "vault_count", {user.id: 1})
     db.commit()
     return db_vault
 
@@ -76,27 +105,121 @@ def delete_vault(
     if not db_vault:
         raise HTTPException(status_code=404, detail="Vault not found")
 
+    update_user_counters(db, "vault_count", {user.id: -1})
     db.delete(db_vault)
     db.commit()
     return {"detail": "Successfully deleted vault"}
 
 
 @router.get("/vaults/{vault_id}/posts", response_model=Page[PostBase])
-def get_vault_posts(vault_id: int, db: Session = Depends(get_db)):
+def get_vault_posts(
+    vault_id: int,
+    order: str = Query("recent", pattern="^(recent|position)$"),
+    db: Session = Depends(get_db),
+):
     db_vault = db.query(Vault).filter(Vault.id == vault_id).first()
     if not db_vault:
         raise HTTPException(status_code=404, detail="Vault not found")
 
-    paginated_posts = paginate(db_vault.posts)
-    for post in paginated_posts.items:
-        post_file = db.query(PostFile).filter(PostFile.post_id == post.id).first()
-        if post_file:
-            post.thumbnail = (
-                f"{settings.API_URL}/posts/{post.id}/files/{post_file.filename}"
-            )
+    posts = db_vault.posts
+    if order == "position":
+        posts = posts.order_by(post_vault.c.position.is_(None), post_vault.c.position)
+    posts = posts.order_by(desc(post_vault.c.date_added), desc(post_vault.c.post_id))
+
+    paginated_posts = paginate(posts)
+    set_post_thumbnails(db, paginated_posts.items)
     return paginated_posts
 
 
+@router.get("/vaults/{vault_id}/posts/recent", response_model=PostCursorPage)
+def get_recent_vault_posts(
+    vault_id: int,
+    cursor: str = Query(None),
+    size: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    db_vault = db.query(Vault).filter(Vault.id == vault_id).first()
+    if not db_vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    posts = (
+        db.query(Post, post_vault.c.date_added)
+        .join(post_vault, post_vault.c.post_id == Post.id)
+        .filter(post_vault.c.vault_id == vault_id)
+        .order_by(desc(post_vault.c.date_added), desc(post_vault.c.post_id))
+    )
+    if cursor:
+        try:
+            date_added, post_id = decode_cursor(cursor)
+            datetime.fromisoformat(date_added)
+            post_id = int(post_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Compare as text so SQLite matches the CURRENT_TIMESTAMP format
+        posts = posts.filter(
+            tuple_(post_vault.c.date_added, post_vault.c.post_id)
+            < tuple_(type_coerce(date_added, String), post_id)
+        )
+    rows = posts.limit(size + 1).all()
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].date_added, rows[-1].Post.id)
+
+    posts = [post for post, _ in rows]
+    set_post_thumbnails(db, posts)
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@router.post("/vaults/{vault_id}/posts")
+def add_posts_to_vault(
+    vault_id: int,
+    posts: VaultPostsUpdate,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_vault = (
+        db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
+    )
+    if not db_vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    saved_posts = select(post_vault.c.post_id).where(post_vault.c.vault_id == vault_id)
+    result = db.execute(
+        insert(post_vault).from_select(
+            ["post_id", "vault_id"],
+            select(Post.id, literal(vault_id)).where(
+                Post.id.in_(posts.post_ids), Post.id.not_in(saved_posts)
+            ),
+        )
+    )
+    db.commit()
+    return {"detail": "Added posts to vault", "count": result.rowcount}
+
+
+@router.delete("/vaults/{vault_id}/posts")
+def delete_posts_from_vault(
+    vault_id: int,
+    post_ids: list[int] = Query(..., min_length=1, max_length=500),
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_vault = (
+        db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
+    )
+    if not db_vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    result = db.execute(
+        delete(post_vault).where(
+            post_vault.c.vault_id == vault_id, post_vault.c.post_id.in_(post_ids)
+        )
+    )
+    db.commit()
+    return {"detail": "Removed posts from vault", "count": result.rowcount}
+
+
 @router.post("/vaults/{vault_id}/posts/{post_id}")
 def add_post_to_vault(
     post_id: int,
@@ -114,16 +237,44 @@ def add_post_to_vault(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    vault_post = any(post_id == post.id for post in db_vault.posts)
-    if vault_post:
+    if vault_has_post(db, vault_id, post_id):
         raise HTTPException(status_code=404, detail="Post is already in vault")
 
-    db_vault.posts.append(db_post)
+    notification = (db_post.user_id, NotificationType.POST_VAULT, post_id, post_id)
+    public, actor_id = db_vault.privacy == Privacy.PUBLIC, user.id
+    db.execute(insert(post_vault).values(post_id=post_id, vault_id=vault_id))
     db.commit()
-    db.refresh(db_vault)
+    if public:
+        notification_buffer.add(*notification, actor_id)
     return {"detail": "Added post to vault"}
 
 
+@router.put("/vaults/{vault_id}/posts/{post_id}")
+def update_vault_post_position(
+    post_id: int,
+    vault_id: int,
+    position: VaultPostPosition,
+    user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_vault = (
+        db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
+    )
+    if not db_vault:
+        raise HTTPException(status_code=404, detail="Vault not found")
+
+    result = db.execute(
+        update(post_vault)
+        .where(post_vault.c.vault_id == vault_id, post_vault.c.post_id == post_id)
+        .values(position=position.position)
+    )
+    if not result.rowcount:
+        raise HTTPException(status_code=400, detail="Post not in vault")
+
+    db.commit()
+    return {"detail": "Updated post position"}
+
+
 @router.delete("/vaults/{vault_id}/posts/{post_id}")
 def delete_post_from_vault(
     post_id: int,
@@ -141,10 +292,13 @@ def delete_post_from_vault(
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if not db_post in db_vault.posts:
+    result = db.execute(
+        delete(post_vault).where(
+            post_vault.c.vault_id == vault_id, post_vault.c.post_id == post_id
+        )
+    )
+    if not result.rowcount:
         raise HTTPException(status_code=400, detail="Post not in vault")
 
-    db_vault.posts.remove(db_post)
     db.commit()
-    db.refresh(db_vault)
     return {"detail": "Removed post from vault"}
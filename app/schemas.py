@@ -1,12 +1,21 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 
-from app.enums import TagType, ReactionType, ReportType, Privacy
+from app.enums import (
+    TagType,
+    ReactionType,
+    ReportType,
+    Privacy,
+    JobStatus,
+    AccountJobType,
+    NotificationType,
+)
 
 
 class UserBase(BaseModel):
     id: int
     username: str
+    avatar: str | None = None
 
 
 class UserResponse(BaseModel):
@@ -17,6 +26,11 @@ class UserResponse(BaseModel):
     post_count: int
     comment_count: int
     liked_posts: int
+    avatar: str | None = None
+
+
+class UserBatch(BaseModel):
+    usernames: list[str] = Field(..., min_length=1)
 
 
 class UserCreate(BaseModel):
@@ -32,7 +46,11 @@ class TagBase(BaseModel):
 
 class PostBase(BaseModel):
     id: int
-    thumbnail: str = None
+    thumbnail: str | None = None
+    preview: str | None = None
+    width: int | None = None
+    height: int | None = None
+    placeholder: str | None = None
 
 
 class PostCreate(BaseModel):
@@ -52,6 +70,19 @@ class PostResponse(BaseModel):
     tags: list[TagBase]
 
 
+class PostsDelete(BaseModel):
+    post_ids: list[int] = Field(..., min_length=1)
+
+
+class PostCreateResponse(PostResponse):
+    duplicates: list[int] = []
+
+
+class PostCursorPage(BaseModel):
+    items: list[PostBase]
+    next_cursor: str | None = None
+
+
 class VaultBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=30)
     privacy: Privacy
@@ -77,8 +108,17 @@ class UserVaultResponse(BaseModel):
     posts: list[PostBase]
 
 
+class VaultPostsUpdate(BaseModel):
+    post_ids: list[int] = Field(..., min_length=1, max_length=500)
+
+
+class VaultPostPosition(BaseModel):
+    position: int | None = None
+
+
 class CommentBase(BaseModel):
     content: str = Field(..., min_length=1, max_length=500)
+    parent_id: int | None = None
 
 
 class CommentResponse(BaseModel):
@@ -89,10 +129,22 @@ class CommentResponse(BaseModel):
     dislikes: int
     user_reaction: ReactionType = ReactionType.NONE
     content: str
+    parent_id: int | None = None
+    reply_count: int = 0
     user: UserBase
     post: PostBase
 
 
+class CommentThreadResponse(CommentResponse):
+    replies: list[CommentResponse] = []
+    next_cursor: str | None = None
+
+
+class CommentCursorPage(BaseModel):
+    items: list[CommentResponse]
+    next_cursor: str | None = None
+
+
 class ReactionBase(BaseModel):
     type: ReactionType
 
@@ -119,8 +171,66 @@ class ReportResponse(BaseModel):
     user: UserBase
 
 
+class ReportTarget(BaseModel):
+    target_type: ReportType
+    target_id: int
+
+
+class ReportSummaryResponse(ReportTarget):
+    report_count: int
+    date_created: datetime | None = None
+    last_reported: datetime
+
+
+class ReportResolve(BaseModel):
+    targets: list[ReportTarget] = Field(..., min_length=1)
+
+
 class FileBase(BaseModel):
     id: int
     filename: str
     content_type: str
+    width: int | None = None
+    height: int | None = None
+    placeholder: str | None = None
     src: str = None
+    preview: str | None = None
+    preview_path: str | None = Field(None, exclude=True)
+
+
+class PostFilesResponse(BaseModel):
+    post_id: int
+    files: list[FileBase]
+
+
+class AccountJobResponse(BaseModel):
+    id: int
+    type: AccountJobType
+    status: JobStatus
+    stage: str
+    progress: int
+    date_created: datetime
+    date_finished: datetime | None = None
+    download: str | None = None
+
+
+class NotificationResponse(BaseModel):
+    id: int
+    type: NotificationType
+    target_id: int
+    post_id: int
+    actor_count: int
+    actor: UserBase | None = None
+    date_updated: datetime
+    time_since: str
+    read: bool
+
+
+class NotificationCursorPage(BaseModel):
+    items: list[NotificationResponse]
+    next_cursor: str | None = None
+    unread_count: int
+
+
+class NotificationsRead(BaseModel):
+    ids: list[int] | None = Field(None, min_length=1)
@@ -0,0 +1,217 @@
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import MediaJob, Post, PostFile
+
+logger = logging.getLogger(__name__)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value: int, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+
+        node = self.root
+        while True:
+            node_value, items, children = node
+            distance = hamming(value, node_value)
+            if distance == 0:
+                items.append(item)
+                return
+            if distance not in children:
+                children[distance] = (value, [item], {})
+                return
+            node = children[distance]
+
+    def search(self, value: int, radius: int):
+        if self.root is None:
+            return []
+
+        results = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                results.extend((distance, item) for item in items)
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.tree = BKTree()
+        self.last_file_id = 0
+        self.pending = set()
+        self.built_at = None
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    def rebuild(self, db: Session):
+        with self.lock:
+            pending = set(self.pending)
+        last_file_id = db.scalar(select(func.max(PostFile.id))) or 0
+        rows = db.execute(
+            select(PostFile.id, PostFile.post_id, PostFile.phash)
+            .where(
+                PostFile.id <= last_file_id,
+                PostFile.phash.isnot(None),
+                PostFile.phash != "",
+            )
+            .execution_options(yield_per=settings.SIMILARITY_INDEX_BATCH_SIZE)
+        )
+        tree = BKTree()
+        for file_id, post_id, phash in rows:
+            if file_id not in pending:
+                tree.add(int(phash, 16), post_id)
+
+        with self.lock:
+            self.tree = tree
+            self.last_file_id = last_file_id
+            self.built_at = time.monotonic()
+
+    def add_new_files(self, db: Session):
+        with self.lock:
+            rows = (
+                db.query(PostFile.id, PostFile.post_id, PostFile.phash)
+                .filter(PostFile.id > self.last_file_id)
+                .order_by(PostFile.id)
+                .all()
+            )
+            for file_id, post_id, phash in rows:
+                if phash is None:
+                    self.pending.add(file_id)
+                elif phash:
+                    self.tree.add(int(phash, 16), post_id)
+                self.last_file_id = file_id
+
+    def check_pending(self, db: Session):
+        with self.lock:
+            pending = sorted(self.pending)
+        size = settings.SIMILARITY_INDEX_BATCH_SIZE
+        for start in range(0, len(pending), size):
+            rows = db.execute(
+                select(PostFile.id, PostFile.post_id, PostFile.phash).where(
+                    PostFile.id.in_(pending[start : start + size]),
+                    PostFile.phash.isnot(None),
+                )
+            ).all()
+            with self.lock:
+                for file_id, post_id, phash in rows:
+                    if phash and file_id in self.pending:
+                        self.tree.add(int(phash, 16), post_id)
+                    self.pending.discard(file_id)
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            if self.built_at is None or (
+                time.monotonic() - self.built_at
+                >= settings.SIMILARITY_INDEX_REFRESH_SECONDS
+            ):
+                self.rebuild(db)
+            self.add_new_files(db)
+            self.check_pending(db)
+        except Exception:
+            logger.exception("Failed to refresh the similarity index")
+        finally:
+            db.close()
+
+    def run(self):
+        while not self.stopped.wait(settings.SIMILARITY_PENDING_INTERVAL_SECONDS):
+            self.refresh()
+
+    def start(self):
+        self.refresh()
+        self.stopped.clear()
+        self.thread = Thread(target=self.run, name="similarity-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def similar_posts(self, db: Session, hashes: list[str], radius: int) -> dict:
+        if self.built_at is None:
+            self.rebuild(db)
+        self.add_new_files(db)
+        distances = {}
+        with self.lock:
+            for phash in hashes:
+                for distance, post_id in self.tree.search(int(phash, 16), radius):
+                    distances[post_id] = min(distance, distances.get(post_id, distance))
+        return distances
+
+
+similarity_index = SimilarityIndex()
+
+
+def find_similar_posts(
+    db: Session, post_id: int, hashes: list[str], radius: int = None, limit: int = None
+) -> list[int]:
+    if radius is None:
+        radius = settings.SIMILARITY_DISTANCE
+    distances = similarity_index.similar_posts(db, hashes, radius)
+    distances.pop(post_id, None)
+    if not distances:
+        return []
+    existing = set(db.scalars(select(Post.id).where(Post.id.in_(list(distances)))))
+    post_ids = [
+        similar_id
+        for similar_id in sorted(distances, key=distances.get)
+        if similar_id in existing
+    ]
+    return post_ids[:limit]
+
+
+def index_existing_files(db: Session, batch_size: int = None) -> int:
+    from app.media import file_hash
+
+    post_files = (
+        db.query(PostFile)
+        .filter(
+            PostFile.phash.is_(None),
+            ~exists().where(MediaJob.post_file_id == PostFile.id),
+        )
+        .order_by(PostFile.id)
+        .limit(batch_size or settings.SIMILARITY_INDEX_BATCH_SIZE)
+        .all()
+    )
+    for post_file in post_files:
+        path = os.path.join(settings.UPLOAD_FOLDER, post_file.thumbnail_path)
+        try:
+            post_file.phash = file_hash(path)
+        except (OSError, ValueError):
+            post_file.phash = ""
+    db.commit()
+    return len(post_files)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        while index_existing_files(db):
+            pass
+    finally:
+        db.close()
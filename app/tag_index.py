@@ -0,0 +1,117 @@
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from threading import Event, Lock, Thread
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import post_tag
+
+logger = logging.getLogger(__name__)
+
+
+class TagIndex:
+    def __init__(self):
+        self.post_tags = {}
+        self.tag_posts = defaultdict(set)
+        self.cooccurrence = defaultdict(Counter)
+        self.built_at = None
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    def rebuild(self, db: Session):
+        post_tags = defaultdict(set)
+        for post_id, tag_id in db.query(post_tag.c.post_id, post_tag.c.tag_id):
+            post_tags[post_id].add(tag_id)
+
+        tag_posts = defaultdict(set)
+        cooccurrence = defaultdict(Counter)
+        for post_id, tag_ids in post_tags.items():
+            for tag_id in tag_ids:
+                tag_posts[tag_id].add(post_id)
+                cooccurrence[tag_id].update(tag_ids - {tag_id})
+
+        with self.lock:
+            self.post_tags = dict(post_tags)
+            self.tag_posts = tag_posts
+            self.cooccurrence = cooccurrence
+            self.built_at = time.monotonic()
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception:
+            logger.exception("Failed to rebuild the tag index")
+        finally:
+            db.close()
+
+    def run(self):
+        while not self.stopped.wait(settings.TAG_INDEX_REFRESH_SECONDS):
+            self.refresh()
+
+    def start(self):
+        self.refresh()
+        self.stopped.clear()
+        self.thread = Thread(target=self.run, name="tag-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def set_post_tags(self, post_id: int, tag_ids: list[int]):
+        if self.built_at is None:
+            return
+
+        with self.lock:
+            self._remove(post_id)
+            tag_ids = set(tag_ids)
+            self.post_tags[post_id] = tag_ids
+            for tag_id in tag_ids:
+                self.tag_posts[tag_id].add(post_id)
+                self.cooccurrence[tag_id].update(tag_ids - {tag_id})
+
+    def remove_post(self, post_id: int):
+        if self.built_at is None:
+            return
+
+        with self.lock:
+            self._remove(post_id)
+
+    def _remove(self, post_id: int):
+        tag_ids = self.post_tags.pop(post_id, set())
+        for tag_id in tag_ids:
+            self.tag_posts[tag_id].discard(post_id)
+            self.cooccurrence[tag_id].subtract(tag_ids - {tag_id})
+            self.cooccurrence[tag_id] = +self.cooccurrence[tag_id]
+
+    def tag_count(self, tag_id: int) -> int:
+        return len(self.tag_posts.get(tag_id, ()))
+
+    def related_tags(self, tag_id: int, limit: int) -> list[tuple[int, int]]:
+        with self.lock:
+            return self.cooccurrence.get(tag_id, Counter()).most_common(limit)
+
+    def related_posts(self, post_id: int, limit: int) -> list[int]:
+        scores = defaultdict(float)
+        with self.lock:
+            post_count = len(self.post_tags)
+            for tag_id in self.post_tags.get(post_id, ()):
+                tag_posts = self.tag_posts[tag_id]
+                if len(tag_posts) > settings.RELATED_MAX_TAG_POSTS:
+                    continue
+                weight = math.log(1 + post_count / len(tag_posts))
+                for other_id in tag_posts:
+                    scores[other_id] += weight
+
+        scores.pop(post_id, None)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+
+tag_index = TagIndex()
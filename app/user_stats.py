@@ -0,0 +1,171 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from humanize import naturaltime
+from threading import Lock
+from sqlalchemy import bindparam, event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.avatars import avatar_url
+from app.config import settings
+from app.enums import ReactionType
+from app.models import Comment, Notification, Post, PostReaction, User, Vault
+
+
+class ProfileCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.usernames = {}
+        self.lock = Lock()
+
+    def get(self, username: str) -> dict | None:
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(username)
+                return entry[1]
+
+    def set(self, username: str, profile: dict):
+        with self.lock:
+            expires = time.monotonic() + settings.PROFILE_CACHE_SECONDS
+            self.entries[username] = (expires, profile)
+            self.entries.move_to_end(username)
+            self.usernames[profile["id"]] = username
+            while len(self.entries) > settings.PROFILE_CACHE_SIZE:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.usernames.pop(evicted["id"], None)
+
+    def invalidate(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                self.entries.pop(self.usernames.pop(user_id, None), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.usernames.clear()
+
+
+profile_cache = ProfileCache()
+
+
+def invalidate_profiles(db: Session, user_ids=None):
+    stale = db.info.setdefault("stale_profiles", set())
+    stale.update([None] if user_ids is None else user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def clear_stale_profiles(db: Session):
+    stale = db.info.pop("stale_profiles", set())
+    if None in stale:
+        profile_cache.clear()
+    elif stale:
+        profile_cache.invalidate(stale)
+
+
+def format_profile(profile: dict) -> dict:
+    return {
+        "id": profile["id"],
+        "username": profile["username"],
+        "time_since": naturaltime(datetime.now() - profile["date_created"]),
+        "vault_count": profile["vault_count"],
+        "post_count": profile["post_count"],
+        "comment_count": profile["comment_count"],
+        "liked_posts": profile["like_count"],
+        "avatar": avatar_url(profile["username"], profile["profile_picture"]),
+    }
+
+
+def get_profiles(db: Session, usernames: list[str]) -> list[dict]:
+    profiles = {}
+    for username in usernames:
+        profile = profile_cache.get(username)
+        if profile is not None:
+            profiles[username] = profile
+
+    missing = [username for username in usernames if username not in profiles]
+    if missing:
+        rows = db.execute(
+            select(
+                User.id,
+                User.username,
+                User.date_created,
+                User.vault_count,
+                User.post_count,
+                User.comment_count,
+                User.like_count,
+                User.profile_picture,
+            ).where(User.username.in_(missing))
+        )
+        for row in rows:
+            profiles[row.username] = row._asdict()
+            profile_cache.set(row.username, profiles[row.username])
+
+    return [
+        format_profile(profiles[username])
+        for username in usernames
+        if username in profiles
+    ]
+
+
+def get_profile(db: Session, username: str) -> dict | None:
+    profiles = get_profiles(db, [username])
+    return profiles[0] if profiles else None
+
+
+def update_user_counters(db: Session, column: str, deltas: dict):
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    counter = User.__table__.c[column]
+    db.connection().execute(
+        update(User)
+        .where(User.id == bindparam("user_id"))
+        .values({counter: counter + bindparam("delta")}),
+        [{"user_id": user_id, "delta": delta} for user_id, delta in deltas.items()],
+    )
+    invalidate_profiles(db, deltas)
+
+
+def subtract_user_counts(db: Session, column: str, user_column, *conditions):
+    counter = User.__table__.c[column]
+    count = (
+        select(func.count())
+        .select_from(user_column.table)
+        .where(user_column == User.id, *conditions)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(User)
+        .where(User.id.in_(select(user_column).where(*conditions)))
+        .values({counter: counter - count}),
+        execution_options={"synchronize_session": False},
+    )
+    invalidate_profiles(db)
+
+
+def reconcile_user_counters(db: Session):
+    def count(user_column, *conditions):
+        return (
+            select(func.count())
+            .select_from(user_column.table)
+            .where(user_column == User.id, *conditions)
+            .scalar_subquery()
+        )
+
+    db.execute(
+        update(User).values(
+            post_count=count(Post.user_id),
+            vault_count=count(Vault.user_id),
+            comment_count=count(Comment.user_id),
+            like_count=count(
+                PostReaction.user_id, PostReaction.type == ReactionType.LIKE
+            ),
+            unread_notification_count=count(
+                Notification.user_id, Notification.date_read.is_(None)
+            ),
+        )
+    )
+    db.commit()
+    profile_cache.clear()
@@ -1,19 +1,56 @@
+import json
 import jwt
 import os
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from argon2 import PasswordHasher
-from PIL import Image
-from moviepy import VideoFileClip
 from datetime import datetime, timezone, timedelta
 from fastapi import HTTPException, Depends, Cookie, UploadFile
+from fastapi.responses import ORJSONResponse
+from fastapi_pagination.api import resolve_params
+from humanize import naturaltime
+from collections import Counter
+from math import ceil
 from typing import Annotated
+from sqlalchemy import (
+    Select,
+    and_,
+    bindparam,
+    delete,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.orm import Session
 from uuid import uuid4
 
+from app.avatars import avatar_url
 from app.config import settings
 from app.database import get_db
-from app.models import Post, Tag, User, PostFile
+from app.enums import NotificationType, ReactionType
+from app.models import (
+    Post,
+    Tag,
+    User,
+    PostFile,
+    Comment,
+    CommentReaction,
+    FileDeletion,
+    MediaJob,
+    Notification,
+    PostReaction,
+    post_vault,
+)
+from app.notifications import delete_notifications
+from app.tag_index import tag_index
+from app.user_stats import subtract_user_counts, update_user_counters
 
 ph = PasswordHasher()
+EMPTY_THUMBNAIL = dict.fromkeys(
+    ["thumbnail", "preview", "width", "height", "placeholder"]
+)
 
 
 def hash_password(password: str) -> str:
@@ -40,6 +77,34 @@ def create_token(user_id):
     return token
 
 
+def encode_cursor(*values) -> str:
+    return urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def check_batch_size(items: list):
+    if len(items) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_SIZE} items per request",
+        )
+
+
+def parse_ids(ids: str) -> list[int]:
+    try:
+        ids = list(dict.fromkeys(int(value) for value in ids.split(",")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid ids")
+    check_batch_size(ids)
+    return ids
+
+
 def add_tag(db: Session, tags: list, db_post: Post):
     db_post.tags = []
     for tag in tags:
@@ -50,6 +115,15 @@ def add_tag(db: Session, tags: list, db_post: Post):
             db_tag = Tag(name=tag.name, type=tag.type)
         db_post.tags.append(db_tag)
     db.commit()
+    tag_index.set_post_tags(db_post.id, [tag.id for tag in db_post.tags])
+
+
+def vault_has_post(db: Session, vault_id: int, post_id: int) -> bool:
+    return db.query(
+        exists().where(
+            post_vault.c.vault_id == vault_id, post_vault.c.post_id == post_id
+        )
+    ).scalar()
 
 
 def get_current_user(
@@ -67,7 +141,11 @@ def get_current_user(
         if not user_id or user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.id == user_id).first()
+        user = (
+            db.query(User)
+            .filter(User.id == user_id, User.date_deleted.is_(None))
+            .first()
+        )
         if not user or user is None:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -75,6 +153,12 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+def get_moderator(user: User = Depends(get_current_user)):
+    if user.id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return user
+
+
 def get_optional_user(
     auth_token: Annotated[str | None, Cookie()] = None,
     db: Session = Depends(get_db),
@@ -90,7 +174,11 @@ def get_optional_user(
         if not user_id or user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.id == user_id).first()
+        user = (
+            db.query(User)
+            .filter(User.id == user_id, User.date_deleted.is_(None))
+            .first()
+        )
         if not user or user is None:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -98,16 +186,211 @@ def get_optional_user(
         return None
 
 
+def get_token_user_id(auth_token: str | None) -> int | None:
+    if not auth_token:
+        return None
+
+    try:
+        payload = jwt.decode(
+            auth_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        return payload.get("id")
+    except jwt.InvalidTokenError:
+        return None
+
+
 """
-File functions
+Comment functions
 """
 
 
-def get_image_size(file, file_path):
-    if file.content_type in settings.ALLOWED_IMAGE_TYPES:
-        with Image.open(file_path) as img:
-            return img.size
-    return (None, None)
+def comment_path(comment: Comment) -> str:
+    return comment.path or f"{comment.id:010d}"
+
+
+def comment_descendants(path: str):
+    return and_(Comment.path > f"{path}/", Comment.path < f"{path}0")
+
+
+def select_comments():
+    return select(
+        Comment.id,
+        Comment.date_created,
+        Comment.content,
+        Comment.parent_id,
+        Comment.reply_count,
+        Comment.path,
+        Comment.post_id,
+        Comment.user_id,
+        User.username,
+        User.profile_picture,
+    ).join(User, User.id == Comment.user_id)
+
+
+def load_comment_details(db: Session, comments: list, user) -> dict:
+    comment_ids = [comment.id for comment in comments]
+    counts = (
+        db.query(CommentReaction.comment_id, CommentReaction.type, func.count())
+        .filter(CommentReaction.comment_id.in_(comment_ids))
+        .group_by(CommentReaction.comment_id, CommentReaction.type)
+        .all()
+    )
+    count_map = {(comment_id, type): count for comment_id, type, count in counts}
+
+    reaction_map = {}
+    if user:
+        reaction_map = dict(
+            db.query(CommentReaction.comment_id, CommentReaction.type).filter(
+                CommentReaction.comment_id.in_(comment_ids),
+                CommentReaction.user_id == user.id,
+            )
+        )
+
+    now = datetime.now()
+    return {
+        comment.id: {
+            "id": comment.id,
+            "date_created": comment.date_created,
+            "time_since": naturaltime(now - comment.date_created),
+            "likes": count_map.get((comment.id, ReactionType.LIKE), 0),
+            "dislikes": count_map.get((comment.id, ReactionType.DISLIKE), 0),
+            "user_reaction": reaction_map.get(comment.id, ReactionType.NONE),
+            "content": comment.content,
+            "parent_id": comment.parent_id,
+            "reply_count": comment.reply_count,
+            "user": user_summary(
+                comment.user_id, comment.username, comment.profile_picture
+            ),
+            "post": {"id": comment.post_id, **EMPTY_THUMBNAIL},
+        }
+        for comment in comments
+    }
+
+
+"""
+Response functions
+"""
+
+
+def user_summary(user_id: int, username: str, profile_picture: str) -> dict:
+    return {
+        "id": user_id,
+        "username": username,
+        "avatar": avatar_url(username, profile_picture),
+    }
+
+
+def paginate_rows(db: Session, query: Select, transformer) -> ORJSONResponse:
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    total = db.scalar(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+    rows = db.execute(query.limit(raw_params.limit).offset(raw_params.offset)).all()
+    return ORJSONResponse(
+        {
+            "items": transformer(rows),
+            "total": total,
+            "page": params.page,
+            "size": params.size,
+            "pages": ceil(total / params.size),
+        }
+    )
+
+
+"""
+Deletion functions
+"""
+
+
+def post_file_paths(post_files) -> set[str]:
+    return {
+        path
+        for post_file in post_files
+        for path in (
+            post_file.file_path,
+            post_file.thumbnail_path,
+            post_file.preview_path,
+        )
+        if path
+    }
+
+
+def queue_file_deletions(db: Session, paths: set[str]):
+    if paths:
+        db.execute(insert(FileDeletion), [{"path": path} for path in sorted(paths)])
+
+
+def delete_posts(db: Session, post_ids: list[int]):
+    post_files = db.execute(
+        select(
+            PostFile.file_path, PostFile.thumbnail_path, PostFile.preview_path
+        ).where(PostFile.post_id.in_(post_ids))
+    ).all()
+    owners = db.execute(
+        select(Post.user_id, func.count())
+        .where(Post.id.in_(post_ids))
+        .group_by(Post.user_id)
+    ).all()
+
+    subtract_user_counts(
+        db, "comment_count", Comment.user_id, Comment.post_id.in_(post_ids)
+    )
+    subtract_user_counts(
+        db,
+        "like_count",
+        PostReaction.user_id,
+        PostReaction.post_id.in_(post_ids),
+        PostReaction.type == ReactionType.LIKE,
+    )
+    update_user_counters(
+        db, "post_count", {user_id: -count for user_id, count in owners}
+    )
+    queue_file_deletions(db, post_file_paths(post_files))
+    delete_notifications(db, Notification.post_id.in_(post_ids))
+    db.execute(
+        delete(Post).where(Post.id.in_(post_ids)),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def delete_comments(db: Session, comments):
+    replies = Counter(comment.parent_id for comment in comments if comment.parent_id)
+    if replies:
+        db.connection().execute(
+            update(Comment)
+            .where(Comment.id == bindparam("comment_id"))
+            .values(reply_count=Comment.reply_count - bindparam("replies")),
+            [
+                {"comment_id": comment_id, "replies": count}
+                for comment_id, count in replies.items()
+            ],
+        )
+
+    comment_ids = [comment.id for comment in comments]
+    thread = select(Comment.id).where(
+        or_(
+            Comment.id.in_(comment_ids),
+            *(comment_descendants(comment_path(comment)) for comment in comments),
+        )
+    )
+    subtract_user_counts(db, "comment_count", Comment.user_id, Comment.id.in_(thread))
+    delete_notifications(
+        db,
+        Notification.type.in_(
+            [NotificationType.COMMENT_LIKE, NotificationType.COMMENT_REPLY]
+        ),
+        Notification.target_id.in_(thread),
+    )
+    db.execute(
+        delete(Comment).where(Comment.id.in_(comment_ids)),
+        execution_options={"synchronize_session": False},
+    )
+
+
+"""
+File functions
+"""
 
 
 def unique_filename(file):
@@ -124,6 +407,14 @@ def create_thumbnail_filename(file, filename):
         return f"thumb_{name}.jpg"
 
 
+def create_preview_filename(file, filename):
+    name, _ = os.path.splitext(filename)
+    if file.content_type in settings.ANIMATED_IMAGE_TYPES:
+        return f"preview_{name}.webp"
+    if file.content_type in settings.ALLOWED_VIDEO_TYPES:
+        return f"preview_{name}.mp4"
+
+
 def create_file_path(filename, username, post_id):
     upload_path = os.path.join(settings.UPLOAD_FOLDER, username, "posts", str(post_id))
     file_path = os.path.join(upload_path, filename)
@@ -131,27 +422,89 @@ def create_file_path(filename, username, post_id):
     return file_path
 
 
-def create_image_thumbnail(file_path, thumbnail_path):
-    with Image.open(file_path) as img:
-        img.thumbnail(size=(1024, 1024))
-        img.save(thumbnail_path)
+def file_url(post_id: int, post_file) -> str:
+    return f"{settings.API_URL}/posts/{post_id}/files/{post_file.filename}"
 
 
-def create_video_thumbnail(file_path, thumbnail_path):
-    clip = VideoFileClip(file_path)
-    frame = clip.get_frame(1)
-    image = Image.fromarray(frame)
-    image.thumbnail(size=(1024, 1024))
-    image.save(thumbnail_path)
+def file_fields(post_id: int, post_file) -> dict:
+    src = file_url(post_id, post_file)
+    return {
+        "id": post_file.id,
+        "filename": post_file.filename,
+        "content_type": post_file.content_type,
+        "width": post_file.width,
+        "height": post_file.height,
+        "placeholder": post_file.placeholder,
+        "src": src,
+        "preview": f"{src}?type=preview" if post_file.preview_path else None,
+    }
 
 
-def create_thumbnail(file, file_path, thumbnail_path):
-    if file.content_type in settings.ALLOWED_IMAGE_TYPES:
-        create_image_thumbnail(file_path, thumbnail_path)
-    elif file.content_type in settings.ALLOWED_VIDEO_TYPES:
-        create_video_thumbnail(file_path, thumbnail_path)
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
+def thumbnail_fields(post_id: int, post_file) -> dict:
+    url = file_url(post_id, post_file)
+    return {
+        "thumbnail": f"{url}?type=thumbnail",
+        "preview": f"{url}?type=preview" if post_file.preview_path else None,
+        "width": post_file.width,
+        "height": post_file.height,
+        "placeholder": post_file.placeholder,
+    }
+
+
+def set_post_thumbnail(post: Post, post_file: PostFile):
+    for key, value in thumbnail_fields(post.id, post_file).items():
+        setattr(post, key, value)
+
+
+def set_post_thumbnails(db: Session, posts: list):
+    if not posts:
+        return
+
+    first_files = (
+        select(func.min(PostFile.id))
+        .where(PostFile.post_id.in_([post.id for post in posts]))
+        .group_by(PostFile.post_id)
+    )
+    post_files = db.query(PostFile).filter(PostFile.id.in_(first_files)).all()
+
+    file_map = {post_file.post_id: post_file for post_file in post_files}
+    for post in posts:
+        post_file = file_map.get(post.id)
+        if post_file:
+            set_post_thumbnail(post, post_file)
+
+
+def load_post_cards(db: Session, post_ids: list[int]) -> list[dict]:
+    if not post_ids:
+        return []
+
+    first_files = (
+        select(func.min(PostFile.id))
+        .where(PostFile.post_id.in_(post_ids))
+        .group_by(PostFile.post_id)
+    )
+    rows = db.execute(
+        select(
+            PostFile.post_id,
+            PostFile.filename,
+            PostFile.preview_path,
+            PostFile.width,
+            PostFile.height,
+            PostFile.placeholder,
+        ).where(PostFile.id.in_(first_files))
+    )
+    files = {row.post_id: row for row in rows}
+    return [
+        {
+            "id": post_id,
+            **(
+                thumbnail_fields(post_id, files[post_id])
+                if post_id in files
+                else EMPTY_THUMBNAIL
+            ),
+        }
+        for post_id in post_ids
+    ]
 
 
 async def download_file(file, file_path):
@@ -173,27 +526,31 @@ def validate_files(files: list[UploadFile]):
 
 
 async def add_files(db: Session, files: list[UploadFile], post: Post, user: dict):
+    post_files = []
     for file in files:
         filename = unique_filename(file)
-        thumbnail_filename = create_thumbnail_filename(file, filename)
         file_path = create_file_path(filename, user.username, post.id)
-        thumbnail_path = create_file_path(thumbnail_filename, user.username, post.id)
-
         await download_file(file, file_path)
-        create_thumbnail(file, file_path, thumbnail_path)
-        file_width, file_height = get_image_size(file, file_path)
 
+        path = os.path.relpath(file_path, settings.UPLOAD_FOLDER)
         post_file = PostFile(
             post_id=post.id,
             filename=filename,
             content_type=file.content_type,
-            file_path=os.path.relpath(file_path, settings.UPLOAD_FOLDER),
-            thumbnail_path=os.path.relpath(thumbnail_path, settings.UPLOAD_FOLDER),
+            file_path=path,
+            thumbnail_path=path,
             size=file.size,
-            width=file_width,
-            height=file_height,
         )
+        if settings.MEDIA_QUEUE:
+            post_file.jobs.append(MediaJob())
+        else:
+            # Only processes that render media inline pay for Pillow and moviepy
+            from app.media import process_post_file
+
+            process_post_file(post_file)
 
         db.add(post_file)
         db.commit()
         db.refresh(post_file)
+        post_files.append(post_file)
+    return post_files
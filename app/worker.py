@@ -0,0 +1,192 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import JobStatus
+from app.accounts import advance_job
+from app.avatars import is_avatar
+from app.models import AccountJob, FileDeletion, MediaJob, User
+from app.similarity import index_existing_files
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job(db: Session, model=MediaJob):
+    job_id = (
+        db.query(model.id)
+        .filter(model.status == JobStatus.PENDING)
+        .order_by(model.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar()
+    )
+    if job_id is None:
+        db.commit()
+        return None
+
+    claimed = db.execute(
+        update(model)
+        .where(model.id == job_id, model.status == JobStatus.PENDING)
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=model.attempts + 1,
+            locked_at=datetime.now(),
+        )
+    ).rowcount
+    db.commit()
+    return db.get(model, job_id) if claimed else None
+
+
+def release_job(db: Session, job, error: Exception, max_attempts: int):
+    if job.attempts < max_attempts:
+        job.status = JobStatus.PENDING
+    else:
+        job.status = JobStatus.FAILED
+    job.locked_at = None
+    job.error = str(error)[:1000]
+    db.commit()
+
+
+def run_job(db: Session, job: MediaJob):
+    from app.media import process_post_file
+
+    try:
+        if job.post_file:
+            process_post_file(job.post_file)
+        db.delete(job)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Media job %d failed", job.id)
+        if job.attempts >= settings.MEDIA_JOB_MAX_ATTEMPTS and job.post_file:
+            if job.post_file.phash is None:
+                job.post_file.phash = ""
+        release_job(db, job, e, settings.MEDIA_JOB_MAX_ATTEMPTS)
+
+
+def run_account_job(db: Session, job: AccountJob):
+    try:
+        while advance_job(db, job):
+            pass
+    except Exception as e:
+        db.rollback()
+        logger.exception("Account job %d failed", job.id)
+        release_job(db, job, e, settings.ACCOUNT_JOB_MAX_ATTEMPTS)
+
+
+def requeue_stale_jobs(db: Session):
+    cutoff = datetime.now() - timedelta(seconds=settings.MEDIA_JOB_TIMEOUT_SECONDS)
+    for model in (MediaJob, AccountJob):
+        db.execute(
+            update(model)
+            .where(model.status == JobStatus.RUNNING, model.locked_at < cutoff)
+            .values(status=JobStatus.PENDING, locked_at=None)
+        )
+    db.commit()
+
+
+def delete_queued_files(db: Session) -> int:
+    deletions = (
+        db.query(FileDeletion.id, FileDeletion.path)
+        .order_by(FileDeletion.id)
+        .limit(settings.FILE_DELETION_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    referenced = set()
+    if any(is_avatar(path) for _, path in deletions):
+        candidates = {path for _, path in deletions}
+        candidates.update(os.path.dirname(path) for _, path in deletions)
+        referenced = set(
+            db.scalars(
+                select(User.profile_picture).where(User.profile_picture.in_(candidates))
+            )
+        )
+    for _, path in deletions:
+        if path in referenced or os.path.dirname(path) in referenced:
+            continue
+        try:
+            os.remove(os.path.join(settings.UPLOAD_FOLDER, path))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception("Could not delete %s", path)
+        if os.path.dirname(path):
+            try:
+                os.rmdir(os.path.join(settings.UPLOAD_FOLDER, os.path.dirname(path)))
+            except OSError:
+                pass
+
+    if deletions:
+        db.execute(
+            delete(FileDeletion).where(
+                FileDeletion.id.in_([deletion_id for deletion_id, _ in deletions])
+            )
+        )
+    db.commit()
+    return len(deletions)
+
+
+def run_file_deletions():
+    db = SessionLocal()
+    try:
+        while delete_queued_files(db) == settings.FILE_DELETION_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
+
+
+def run_account_jobs():
+    db = SessionLocal()
+    try:
+        while job := claim_job(db, AccountJob):
+            run_account_job(db, job)
+    finally:
+        db.close()
+    run_file_deletions()
+
+
+def run(drain: bool = False):
+    while True:
+        db = SessionLocal()
+        done = 0
+        try:
+            if job := claim_job(db):
+                run_job(db, job)
+            elif job := claim_job(db, AccountJob):
+                run_account_job(db, job)
+            else:
+                requeue_stale_jobs(db)
+                done = delete_queued_files(db) + index_existing_files(db)
+        finally:
+            db.close()
+
+        if job is None and not done:
+            if drain:
+                return
+            time.sleep(settings.MEDIA_WORKER_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--drain", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run, args=(args.drain,), name=f"media-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
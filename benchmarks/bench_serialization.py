@@ -0,0 +1,131 @@
+"""Benchmark list endpoints with large pages and compare JSON encoding paths.
+
+python -m benchmarks.bench_serialization --rows 2e4 --size 100 --runs 50
+
+Reports latency for GET /posts and GET /posts/{post_id}/comments, then, for the
+same payloads, the cost of validating through the response model and encoding
+with the stdlib json module against encoding the rows directly with orjson.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def timings(function, runs: int) -> list[float]:
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        results.append((time.perf_counter() - start) * 1000)
+    return results
+
+
+def report(label: str, results: list[float]):
+    p95 = statistics.quantiles(results, n=20)[-1]
+    print(f"{label:<44} p50 {statistics.median(results):7.2f} ms  p95 {p95:7.2f} ms")
+
+
+def add_comments(db, post_id: int, count: int):
+    from sqlalchemy import func, insert
+
+    from app.models import Comment
+
+    first_id = (db.query(func.max(Comment.id)).scalar() or 0) + 1
+    now = datetime.now()
+    rows = []
+    for comment_id in range(first_id, first_id + count):
+        parent = comment_id - 1 if comment_id % 4 else None
+        path = f"{comment_id:010d}"
+        if parent:
+            path = f"{parent:010d}/{path}"
+        rows.append(
+            {
+                "id": comment_id,
+                "post_id": post_id,
+                "user_id": comment_id % 10 + 1,
+                "parent_id": parent,
+                "path": path,
+                "reply_count": 0 if parent else 3,
+                "content": f"benchmark comment {comment_id}",
+                "date_created": now - timedelta(minutes=comment_id),
+            }
+        )
+    db.execute(insert(Comment), rows)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", type=lambda value: int(float(value)), default=2 * 10**4
+    )
+    parser.add_argument("--comments", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vault34-serialization-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    os.environ["FEED_MODEL_PATH"] = os.path.join(workdir, "feed.npz")
+    os.environ.setdefault("ORIGINS", '["*"]')
+    os.environ.setdefault("API_URL", "http://benchmark")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ["METRICS_ENABLED"] = "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    import orjson
+    from fastapi.testclient import TestClient
+    from fastapi_pagination import Page
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.models import Base
+    from app.schemas import CommentThreadResponse, PostBase
+    from benchmarks.generate import generate
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        generate(db, args.rows)
+        add_comments(db, 1, args.comments)
+    finally:
+        db.close()
+
+    endpoints = [
+        ("/posts", Page[PostBase]),
+        ("/posts/1/comments", Page[CommentThreadResponse]),
+    ]
+    with TestClient(app) as client:
+        for url, model in endpoints:
+            params = {"size": args.size}
+            client.get(url, params=params)
+            report(
+                f"GET {url} (size={args.size})",
+                timings(lambda: client.get(url, params=params), args.runs),
+            )
+
+            payload = client.get(url, params=params).json()
+            page = model.model_validate(payload)
+            report(
+                "  response model + json",
+                timings(
+                    lambda: json.dumps(
+                        model.model_validate(page.model_dump()).model_dump(mode="json")
+                    ),
+                    args.runs,
+                ),
+            )
+            report(
+                "  rows + orjson",
+                timings(lambda: orjson.dumps(payload), args.runs),
+            )
+
+
+if __name__ == "__main__":
+    main()
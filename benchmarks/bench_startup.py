@@ -0,0 +1,100 @@
+"""Measure cold start: importing app.main and serving the first request.
+
+python -m benchmarks.bench_startup --runs 10
+python -m benchmarks.bench_startup --imports 15
+
+Each run is a fresh interpreter against an empty migrated SQLite database.
+--imports lists the slowest top-level packages from python -X importtime.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import time
+
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+
+with TestClient(app) as client:
+    client.get("/posts")
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def environment(workdir: str) -> dict:
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "UPLOAD_FOLDER": os.path.join(workdir, "uploads"),
+        "FEED_MODEL_PATH": os.path.join(workdir, "feed.npz"),
+        "ORIGINS": '["*"]',
+        "API_URL": "http://benchmark",
+        "SECRET_KEY": "bench",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+
+
+def slowest_packages(env: dict, count: int) -> list[tuple[int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+    return sorted(((us, name) for name, us in packages.items()), reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=0)
+    args = parser.parse_args()
+
+    env = environment(tempfile.mkdtemp(prefix="vault34-startup-"))
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        env=env,
+        capture_output=True,
+        check=True,
+    )
+
+    imports, first_requests = [], []
+    for _ in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported, served = map(float, result.stdout.split()[-2:])
+        imports.append(imported * 1000)
+        first_requests.append(served * 1000)
+
+    print(f"import app.main  median {statistics.median(imports):7.0f} ms")
+    print(f"first response   median {statistics.median(first_requests):7.0f} ms")
+
+    if args.imports:
+        print()
+        for microseconds, name in slowest_packages(env, args.imports):
+            print(f"{microseconds / 1000:7.0f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark GET /users/{username}/vaults for a user with many large vaults.
+
+python -m benchmarks.bench_user_vaults --vaults 200 --posts 5000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vaults", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vault34-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    os.environ.setdefault("ORIGINS", '["*"]')
+    os.environ.setdefault("API_URL", "http://localhost:8000")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, insert
+
+    from app.database import SessionLocal, engine
+    from app.enums import Privacy
+    from app.main import app
+    from app.models import Base, Post, PostFile, User, Vault, post_vault
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="bench", password="", profile_picture="")
+    db.add(user)
+    db.commit()
+
+    db.execute(insert(Post), [{"user_id": user.id} for _ in range(args.posts)])
+    db.execute(
+        insert(PostFile),
+        [
+            {
+                "post_id": post_id,
+                "filename": f"{post_id}.jpg",
+                "file_path": f"{post_id}.jpg",
+                "thumbnail_path": f"thumb_{post_id}.jpg",
+                "content_type": "image/jpeg",
+            }
+            for post_id in range(1, args.posts + 1)
+        ],
+    )
+    db.execute(
+        insert(Vault),
+        [
+            {"user_id": user.id, "title": f"vault {index}", "privacy": Privacy.PUBLIC}
+            for index in range(args.vaults)
+        ],
+    )
+    for vault_id in range(1, args.vaults + 1):
+        db.execute(
+            insert(post_vault),
+            [
+                {"vault_id": vault_id, "post_id": post_id}
+                for post_id in range(1, args.posts + 1)
+            ],
+        )
+    db.commit()
+    db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.append(1))
+
+    client = TestClient(app)
+    url = f"/users/bench/vaults?post_id=1&size={args.size}"
+    timings = []
+    for _ in range(args.runs):
+        statements.clear()
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+    print(f"{url}: {args.vaults} vaults x {args.posts} posts")
+    print(f"statements per request: {len(statements)}")
+    print(
+        f"median {statistics.median(timings):.1f} ms, "
+        f"max {max(timings):.1f} ms over {args.runs} runs"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Fill the configured database with a synthetic dataset using bulk inserts.
+
+python -m benchmarks.generate --rows 1e6 --seed 0
+
+--rows is the approximate total across all tables; roughly a tenth of it
+becomes posts. Media rows all point at a handful of small files written to
+UPLOAD_FOLDER/bench.
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 10000
+SYLLABLES = "ka ri to mo na shi ra ku ya me lo vin sa te no zu ha el mi da".split()
+MEDIA = [
+    ("jpg", "image/jpeg", (640, 480), "tomato"),
+    ("jpg", "image/jpeg", (480, 640), "steelblue"),
+    ("png", "image/png", (800, 800), "seagreen"),
+    ("gif", "image/gif", (320, 240), "gold"),
+]
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def write_media(upload_folder: str) -> list[dict]:
+    from PIL import Image
+
+    from app.media import create_placeholder
+
+    media_folder = os.path.join(upload_folder, "bench")
+    os.makedirs(media_folder, exist_ok=True)
+
+    media = []
+    for index, (ext, content_type, size, color) in enumerate(MEDIA):
+        file_path = os.path.join(media_folder, f"{index}.{ext}")
+        Image.new("RGB", size, color).save(file_path)
+        path = os.path.relpath(file_path, upload_folder)
+        media.append(
+            {
+                "ext": ext,
+                "file_path": path,
+                "thumbnail_path": path,
+                "content_type": content_type,
+                "size": os.path.getsize(file_path),
+                "width": size[0],
+                "height": size[1],
+                "placeholder": create_placeholder(file_path),
+            }
+        )
+    return media
+
+
+def insert_chunks(db, table, rows):
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(table), rows[start : start + CHUNK_SIZE])
+
+
+def generate(db, rows: int, seed: int = 0) -> dict:
+    from app.config import settings
+    from app.enums import Privacy, ReactionType, TagType
+    from app.models import (
+        Comment,
+        Post,
+        PostFile,
+        PostReaction,
+        Tag,
+        User,
+        Vault,
+        post_tag,
+        post_vault,
+    )
+    from app.user_stats import reconcile_user_counters
+    from app.utils import hash_password
+
+    if db.query(Post.id).first():
+        raise SystemExit("The database already contains posts")
+
+    rng = random.Random(seed)
+    n_posts = max(100, rows // 10)
+    n_users = max(10, n_posts // 10)
+    n_tags = max(50, n_posts // 20)
+    n_vaults = n_users * 2
+    now = datetime.now()
+    counts = dict.fromkeys(
+        [
+            "users",
+            "tags",
+            "posts",
+            "files",
+            "post_tags",
+            "reactions",
+            "comments",
+            "vaults",
+            "vault_posts",
+        ],
+        0,
+    )
+
+    def timestamp():
+        return now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+    password = hash_password("password")
+    users = [
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "password": password,
+            "profile_picture": "",
+            "date_created": timestamp(),
+        }
+        for user_id in range(1, n_users + 1)
+    ]
+    insert_chunks(db, User, users)
+    counts["users"] = n_users
+
+    names = set()
+    while len(names) < n_tags:
+        names.add(word(rng)[:30])
+    tag_types = list(TagType)
+    insert_chunks(
+        db,
+        Tag,
+        [
+            {
+                "id": tag_id,
+                "name": name,
+                "type": rng.choices(tag_types, weights=[1, 6, 2, 1])[0],
+                "date_created": timestamp(),
+            }
+            for tag_id, name in enumerate(sorted(names), start=1)
+        ],
+    )
+    counts["tags"] = n_tags
+    db.commit()
+
+    media = write_media(settings.UPLOAD_FOLDER)
+    tag_weights = [1 / rank for rank in range(1, n_tags + 1)]
+    tag_ids = list(range(1, n_tags + 1))
+    user_ids = range(1, n_users + 1)
+    comment_id = 0
+
+    for start in range(1, n_posts + 1, CHUNK_SIZE):
+        posts, files, links, reactions, comments = [], [], [], [], []
+        for post_id in range(start, min(start + CHUNK_SIZE, n_posts + 1)):
+            created = timestamp()
+            reacted = rng.sample(user_ids, min(n_users, int(rng.expovariate(1 / 3))))
+            types = [
+                ReactionType.LIKE if rng.random() < 0.85 else ReactionType.DISLIKE
+                for _ in reacted
+            ]
+            posts.append(
+                {
+                    "id": post_id,
+                    "user_id": rng.choice(user_ids),
+                    "title": " ".join(word(rng) for _ in range(rng.randint(1, 4))),
+                    "date_created": created,
+                    "like_count": types.count(ReactionType.LIKE),
+                    "dislike_count": types.count(ReactionType.DISLIKE),
+                }
+            )
+            reactions.extend(
+                {
+                    "user_id": user_id,
+                    "post_id": post_id,
+                    "type": reaction_type,
+                    "date_created": created + timedelta(minutes=rng.randrange(10000)),
+                }
+                for user_id, reaction_type in zip(reacted, types)
+            )
+
+            file = rng.choice(media)
+            files.append(
+                {
+                    "id": post_id,
+                    "post_id": post_id,
+                    "filename": f"{post_id}.{file['ext']}",
+                    "phash": f"{rng.getrandbits(64):016x}",
+                    "date_created": created,
+                    **{key: value for key, value in file.items() if key != "ext"},
+                }
+            )
+
+            links.extend(
+                {"post_id": post_id, "tag_id": tag_id}
+                for tag_id in set(rng.choices(tag_ids, weights=tag_weights, k=3))
+            )
+
+            post_comments = []
+            for _ in range(int(rng.expovariate(1))):
+                comment_id += 1
+                comment = {
+                    "id": comment_id,
+                    "post_id": post_id,
+                    "user_id": rng.choice(user_ids),
+                    "content": " ".join(word(rng) for _ in range(rng.randint(3, 12))),
+                    "date_created": created + timedelta(minutes=rng.randrange(10000)),
+                    "path": f"{comment_id:010d}",
+                    "reply_count": 0,
+                }
+                if post_comments and rng.random() < 0.3:
+                    parent = rng.choice(post_comments)
+                    parent["reply_count"] += 1
+                    comment["parent_id"] = parent["id"]
+                    comment["path"] = f"{parent['path']}/{comment_id:010d}"
+                post_comments.append(comment)
+            comments.extend(post_comments)
+
+        insert_chunks(db, Post, posts)
+        insert_chunks(db, PostFile, files)
+        insert_chunks(db, post_tag, links)
+        insert_chunks(db, PostReaction, reactions)
+        insert_chunks(
+            db, Comment, [{"parent_id": None, **comment} for comment in comments]
+        )
+        db.commit()
+        counts["posts"] += len(posts)
+        counts["files"] += len(files)
+        counts["post_tags"] += len(links)
+        counts["reactions"] += len(reactions)
+        counts["comments"] += len(comments)
+
+    insert_chunks(
+        db,
+        Vault,
+        [
+            {
+                "id": vault_id,
+                "user_id": (vault_id - 1) % n_users + 1,
+                "title": word(rng)[:30],
+                "privacy": Privacy.PUBLIC if rng.random() < 0.7 else Privacy.PRIVATE,
+                "date_created": timestamp(),
+            }
+            for vault_id in range(1, n_vaults + 1)
+        ],
+    )
+    vault_posts = []
+    for vault_id in range(1, n_vaults + 1):
+        post_ids = rng.sample(range(1, n_posts + 1), min(n_posts, rng.randint(0, 20)))
+        vault_posts.extend(
+            {
+                "vault_id": vault_id,
+                "post_id": post_id,
+                "date_added": timestamp(),
+                "position": position,
+            }
+            for position, post_id in enumerate(post_ids)
+        )
+        if len(vault_posts) >= CHUNK_SIZE:
+            insert_chunks(db, post_vault, vault_posts)
+            counts["vault_posts"] += len(vault_posts)
+            vault_posts = []
+    insert_chunks(db, post_vault, vault_posts)
+    db.commit()
+    reconcile_user_counters(db)
+    counts["vaults"] = n_vaults
+    counts["vault_posts"] += len(vault_posts)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=lambda value: int(float(value)), default=10**5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal, engine
+    from app.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        counts = generate(db, args.rows, args.seed)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table:>12} {count:>10}")
+    print(f"{total} rows in {elapsed:.1f} s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
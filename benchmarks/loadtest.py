@@ -0,0 +1,164 @@
+"""Run scripted workloads against the app in-process and report latency per route.
+
+python -m benchmarks.loadtest --rows 1e5 --duration 30 --concurrency 8
+python -m benchmarks.loadtest --workload feed --workload search --output base.json
+python -m benchmarks.loadtest --baseline base.json
+
+The rate limiter is off unless --rate-limit is given. The run fails if any request
+returns a non-2xx status.
+
+Without --database a temporary SQLite database is generated with --rows rows.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+async def run(app, dataset, workloads, args):
+    import httpx
+
+    from benchmarks.workloads import Recorder, Session
+
+    recorder = Recorder()
+    functions = [function for function, _ in workloads]
+    weights = [weight for _, weight in workloads]
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests]
+
+    async def worker(client, seed):
+        session = Session(client, dataset, recorder, random.Random(seed))
+        while time.perf_counter() < deadline and remaining[0] != 0:
+            remaining[0] -= 1
+            await session.rng.choices(functions, weights=weights)[0](session)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    worker(client, args.seed + index)
+                    for index in range(args.concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - start
+
+    return summarize(recorder, elapsed)
+
+
+def summarize(recorder, elapsed: float) -> dict:
+    routes = {}
+    for label, timings in sorted(recorder.timings.items()):
+        p50, p95, p99 = np.percentile(np.array(timings) * 1000, [50, 95, 99])
+        routes[label] = {
+            "count": len(timings),
+            "rps": len(timings) / elapsed,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "errors": recorder.errors[label],
+        }
+    total = sum(route["count"] for route in routes.values())
+    return {
+        "elapsed": elapsed,
+        "requests": total,
+        "rps": total / elapsed,
+        "routes": routes,
+    }
+
+
+def report(results: dict, baseline: dict = None):
+    print(
+        f"{'route':<42} {'count':>7} {'req/s':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+    )
+    for label, route in results["routes"].items():
+        line = (
+            f"{label:<42} {route['count']:>7} {route['rps']:>8.1f} "
+            f"{route['p50']:>8.1f} {route['p95']:>8.1f} {route['p99']:>8.1f} "
+            f"{route['errors']:>6}"
+        )
+        before = (baseline or {}).get("routes", {}).get(label)
+        if before:
+            line += f"  p95 {(route['p95'] / before['p95'] - 1) * 100:+.0f}%"
+        print(line)
+    print(
+        f"{results['requests']} requests in {results['elapsed']:.1f} s "
+        f"({results['rps']:.1f} req/s)"
+    )
+    if baseline:
+        print(f"baseline {baseline['rps']:.1f} req/s")
+
+
+def main():
+    from benchmarks.workloads import WORKLOADS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database")
+    parser.add_argument("--rows", type=lambda value: int(float(value)), default=10**5)
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS))
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--requests", type=int, default=-1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--rate-limit", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vault34-loadtest-")
+    os.environ["DATABASE_URL"] = args.database or (
+        f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    )
+    os.environ.setdefault("UPLOAD_FOLDER", os.path.join(workdir, "uploads"))
+    os.environ.setdefault("FEED_MODEL_PATH", os.path.join(workdir, "feed.npz"))
+    os.environ.setdefault("ORIGINS", '["*"]')
+    os.environ.setdefault("API_URL", "http://benchmark")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.models import Base
+    from benchmarks.generate import generate
+    from benchmarks.workloads import Dataset
+
+    db = SessionLocal()
+    try:
+        if not args.database:
+            Base.metadata.create_all(bind=engine)
+            generate(db, args.rows, args.seed)
+        dataset = Dataset(db)
+    finally:
+        db.close()
+
+    workloads = [WORKLOADS[name] for name in args.workload or sorted(WORKLOADS)]
+    results = asyncio.run(run(app, dataset, workloads, args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    errors = sum(route["errors"] for route in results["routes"].values())
+    if errors:
+        sys.exit(f"{errors} requests returned a non-2xx status")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import random
+import time
+from collections import Counter, defaultdict
+from io import BytesIO
+
+
+class Dataset:
+    def __init__(self, db):
+        from sqlalchemy import func
+
+        from app.enums import Privacy
+        from app.models import Post, Tag, User, Vault
+
+        self.max_post_id = db.query(func.max(Post.id)).scalar() or 0
+        self.users = db.query(User.id, User.username).limit(10000).all()
+        self.tags = [name for (name,) in db.query(Tag.name).limit(10000)]
+        self.vaults = [
+            vault_id
+            for (vault_id,) in db.query(Vault.id)
+            .filter(Vault.privacy == Privacy.PUBLIC)
+            .limit(10000)
+        ]
+
+
+class Session:
+    def __init__(self, client, dataset: Dataset, recorder, rng: random.Random):
+        self.client = client
+        self.dataset = dataset
+        self.recorder = recorder
+        self.rng = rng
+
+    def post_id(self) -> int:
+        return self.rng.randint(1, self.dataset.max_post_id)
+
+    def user(self):
+        return self.rng.choice(self.dataset.users)
+
+    def auth(self, user_id: int = None) -> dict:
+        from app.utils import create_token
+
+        user_id = user_id or self.user().id
+        return {"Cookie": f"auth_token={create_token(user_id)}"}
+
+    async def request(self, method: str, route: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.recorder.record(
+            f"{method} {route}", time.perf_counter() - start, response.status_code
+        )
+        return response
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+
+    def record(self, label: str, seconds: float, status_code: int):
+        self.timings[label].append(seconds)
+        if not 200 <= status_code < 300:
+            self.errors[label] += 1
+
+
+async def browse_feed(session: Session):
+    page = session.rng.randint(1, 20)
+    await session.request("GET", "/posts", "/posts", params={"page": page, "size": 50})
+
+    post_id = session.post_id()
+    await session.request("GET", "/posts/{post_id}", f"/posts/{post_id}")
+    await session.request("GET", "/posts/{post_id}/files", f"/posts/{post_id}/files")
+    await session.request(
+        "GET", "/posts/{post_id}/comments", f"/posts/{post_id}/comments"
+    )
+    await session.request(
+        "GET", "/posts/{post_id}/related", f"/posts/{post_id}/related"
+    )
+
+
+async def browse_for_you(session: Session):
+    await session.request(
+        "GET", "/feed/for-you", "/feed/for-you", headers=session.auth()
+    )
+
+
+async def search(session: Session):
+    query = session.rng.choice(session.dataset.tags)[:4]
+    await session.request("GET", "/posts", "/posts", params={"query": query})
+
+
+async def autocomplete_tags(session: Session):
+    name = session.rng.choice(session.dataset.tags)
+    for length in range(1, min(len(name), 4) + 1):
+        await session.request(
+            "GET", "/tags", "/tags", params={"query": name[:length], "size": 10}
+        )
+
+
+async def react(session: Session):
+    post_id = session.post_id()
+    reaction_type = session.rng.choice(["like", "like", "like", "dislike", "none"])
+    await session.request(
+        "POST",
+        "/posts/{post_id}/reactions",
+        f"/posts/{post_id}/reactions",
+        json={"type": reaction_type},
+        headers=session.auth(),
+    )
+
+
+async def upload(session: Session):
+    from PIL import Image
+
+    buffer = BytesIO()
+    color = tuple(session.rng.randrange(256) for _ in range(3))
+    Image.new("RGB", (320, 240), color).save(buffer, "JPEG")
+    await session.request(
+        "POST",
+        "/posts",
+        "/posts",
+        data={"title": "benchmark upload"},
+        files=[("files", ("upload.jpg", buffer.getvalue(), "image/jpeg"))],
+        headers=session.auth(),
+    )
+
+
+async def browse_vaults(session: Session):
+    user = session.user()
+    await session.request(
+        "GET",
+        "/users/{username}/vaults",
+        f"/users/{user.username}/vaults",
+        headers=session.auth(user.id),
+    )
+    if not session.dataset.vaults:
+        return
+
+    vault_id = session.rng.choice(session.dataset.vaults)
+    cursor = None
+    for _ in range(2):
+        response = await session.request(
+            "GET",
+            "/vaults/{vault_id}/posts/recent",
+            f"/vaults/{vault_id}/posts/recent",
+            params={"cursor": cursor} if cursor else {},
+        )
+        cursor = response.json().get("next_cursor")
+        if not cursor:
+            break
+
+
+WORKLOADS = {
+    "feed": (browse_feed, 30),
+    "for-you": (browse_for_you, 15),
+    "search": (search, 15),
+    "autocomplete": (autocomplete_tags, 15),
+    "react": (react, 15),
+    "upload": (upload, 2),
+    "vaults": (browse_vaults, 8),
+}
@@ -0,0 +1,118 @@
+"""previews, reaction counters, comment threads and vault ordering
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 19:09:58.708487
+
+Existing post files get their phash from
+python -m app.similarity after upgrading.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def reaction_count(reaction_type):
+    return (
+        f"(SELECT count(*) FROM post_reactions WHERE post_reactions.post_id = posts.id"
+        f" AND post_reactions.type = '{reaction_type}')"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    with op.batch_alter_table("comments") as batch_op:
+        batch_op.add_column(sa.Column("parent_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("path", sa.String(), nullable=True))
+        batch_op.add_column(
+            sa.Column("reply_count", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.create_index("ix_comments_parent_id", ["parent_id"], unique=False)
+        batch_op.create_index("ix_comments_path", ["path"], unique=False)
+        batch_op.create_foreign_key(
+            "fk_comments_parent_id_comments", "comments", ["parent_id"], ["id"]
+        )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("UPDATE comments SET path = lpad(id::text, 10, '0')")
+    else:
+        op.execute("UPDATE comments SET path = printf('%010d', id)")
+
+    with op.batch_alter_table("post_files") as batch_op:
+        batch_op.add_column(sa.Column("preview_path", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("placeholder", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("phash", sa.String(length=16), nullable=True))
+        batch_op.create_index("ix_post_files_phash", ["phash"], unique=False)
+
+    op.execute(
+        "DELETE FROM post_reactions WHERE id NOT IN "
+        "(SELECT max(id) FROM post_reactions GROUP BY user_id, post_id)"
+    )
+    with op.batch_alter_table("post_reactions") as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_post_reactions_user_id_post_id", ["user_id", "post_id"]
+        )
+
+    with op.batch_alter_table("post_vault") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "date_added",
+                sa.DateTime(),
+                server_default=sa.func.now(),
+                nullable=False,
+            )
+        )
+        batch_op.add_column(sa.Column("position", sa.Integer(), nullable=True))
+        batch_op.create_index(
+            "ix_post_vault_vault_id_date_added",
+            ["vault_id", "date_added", "post_id"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("posts") as batch_op:
+        batch_op.add_column(
+            sa.Column("like_count", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("dislike_count", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    op.execute(
+        f"UPDATE posts SET like_count = {reaction_count('LIKE')}, "
+        f"dislike_count = {reaction_count('DISLIKE')}"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("posts") as batch_op:
+        batch_op.drop_column("dislike_count")
+        batch_op.drop_column("like_count")
+
+    with op.batch_alter_table("post_vault") as batch_op:
+        batch_op.drop_index("ix_post_vault_vault_id_date_added")
+        batch_op.drop_column("position")
+        batch_op.drop_column("date_added")
+
+    with op.batch_alter_table("post_reactions") as batch_op:
+        batch_op.drop_constraint("uq_post_reactions_user_id_post_id", type_="unique")
+
+    with op.batch_alter_table("post_files") as batch_op:
+        batch_op.drop_index("ix_post_files_phash")
+        batch_op.drop_column("phash")
+        batch_op.drop_column("placeholder")
+        batch_op.drop_column("preview_path")
+
+    with op.batch_alter_table("comments") as batch_op:
+        batch_op.drop_constraint("fk_comments_parent_id_comments", type_="foreignkey")
+        batch_op.drop_index("ix_comments_path")
+        batch_op.drop_index("ix_comments_parent_id")
+        batch_op.drop_column("reply_count")
+        batch_op.drop_column("path")
+        batch_op.drop_column("parent_id")
@@ -0,0 +1,40 @@
+"""media job queue
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 20:02:11.415923
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+job_status = sa.Enum("PENDING", "RUNNING", "FAILED", name="jobstatus")
+
+
+def upgrade():
+    op.create_table(
+        "media_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("post_file_id", sa.Integer(), nullable=False),
+        sa.Column("date_created", sa.DateTime(), nullable=True),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["post_file_id"], ["post_files.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_jobs_status_id", "media_jobs", ["status", "id"])
+
+
+def downgrade():
+    op.drop_table("media_jobs")
+    job_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,48 @@
+"""unique usernames and user profile counters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 20:41:37.208113
+
+Upgrading fails if two users share a username; rename one of them first.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COUNTERS = {
+    "post_count": "SELECT count(*) FROM posts WHERE posts.user_id = users.id",
+    "vault_count": "SELECT count(*) FROM vaults WHERE vaults.user_id = users.id",
+    "comment_count": "SELECT count(*) FROM comments WHERE comments.user_id = users.id",
+    "like_count": (
+        "SELECT count(*) FROM post_reactions"
+        " WHERE post_reactions.user_id = users.id AND post_reactions.type = 'LIKE'"
+    ),
+}
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        for column in COUNTERS:
+            batch_op.add_column(
+                sa.Column(column, sa.Integer(), server_default="0", nullable=False)
+            )
+        batch_op.create_index("ix_users_username", ["username"], unique=True)
+
+    assignments = ", ".join(
+        f"{column} = ({count})" for column, count in COUNTERS.items()
+    )
+    op.execute(f"UPDATE users SET {assignments}")
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_index("ix_users_username")
+        for column in COUNTERS:
+            batch_op.drop_column(column)
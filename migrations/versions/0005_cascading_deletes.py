@@ -0,0 +1,103 @@
+"""cascading deletes and file deletion queue
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 21:32:08.114209
+
+Recreates the post and comment foreign keys with ON DELETE CASCADE and indexes
+the referencing columns so cascades do not scan.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"
+}
+FOREIGN_KEYS = {
+    "post_tag": [("post_id", "posts"), ("tag_id", "tags")],
+    "post_vault": [("post_id", "posts"), ("vault_id", "vaults")],
+    "post_files": [("post_id", "posts")],
+    "post_reactions": [("post_id", "posts")],
+    "comments": [("post_id", "posts"), ("parent_id", "comments")],
+    "comment_reactions": [("comment_id", "comments")],
+}
+INDEXES = {
+    "post_tag": ["tag_id"],
+    "post_files": ["post_id"],
+    "post_reactions": ["post_id"],
+    "comments": ["post_id"],
+    "comment_reactions": ["comment_id"],
+}
+
+
+def cascade_name(table, column, referred):
+    return f"fk_{table}_{column}_{referred}"
+
+
+def original_name(table, column, referred):
+    if (table, column) == ("comments", "parent_id"):
+        return cascade_name(table, column, referred)
+    if op.get_context().dialect.name == "postgresql":
+        return f"{table}_{column}_fkey"
+    return None
+
+
+def upgrade():
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            for column, referred in foreign_keys:
+                batch_op.drop_constraint(
+                    original_name(table, column, referred)
+                    or cascade_name(table, column, referred),
+                    type_="foreignkey",
+                )
+                batch_op.create_foreign_key(
+                    cascade_name(table, column, referred),
+                    referred,
+                    [column],
+                    ["id"],
+                    ondelete="CASCADE",
+                )
+            for column in INDEXES.get(table, []):
+                batch_op.create_index(f"ix_{table}_{column}", [column])
+
+    op.create_index("ix_media_jobs_post_file_id", "media_jobs", ["post_file_id"])
+    op.create_table(
+        "file_deletions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("date_created", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("file_deletions")
+    op.drop_index("ix_media_jobs_post_file_id", "media_jobs")
+
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            for column in INDEXES.get(table, []):
+                batch_op.drop_index(f"ix_{table}_{column}")
+            for column, referred in foreign_keys:
+                batch_op.drop_constraint(
+                    cascade_name(table, column, referred), type_="foreignkey"
+                )
+                batch_op.create_foreign_key(
+                    original_name(table, column, referred)
+                    or cascade_name(table, column, referred),
+                    referred,
+                    [column],
+                    ["id"],
+                )
@@ -0,0 +1,70 @@
+"""account export and deletion jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 22:14:51.630482
+
+Postgres cannot drop an enum value, so downgrading leaves DONE in jobstatus.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+account_job_type = sa.Enum("EXPORT", "DELETE", name="accountjobtype")
+job_status = postgresql.ENUM(
+    "PENDING", "RUNNING", "FAILED", "DONE", name="jobstatus", create_type=False
+)
+USER_INDEXES = ["posts", "vaults", "comments", "comment_reactions", "reports"]
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE jobstatus ADD VALUE IF NOT EXISTS 'DONE'")
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("date_deleted", sa.DateTime(), nullable=True))
+    for table in USER_INDEXES:
+        op.create_index(f"ix_{table}_user_id", table, ["user_id"])
+
+    op.create_table(
+        "account_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("date_created", sa.DateTime(), nullable=True),
+        sa.Column("type", account_job_type, nullable=False),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("cursor", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("progress", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("path", sa.String(), nullable=True),
+        sa.Column("date_finished", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+            name="fk_account_jobs_user_id_users",
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_account_jobs_status_id", "account_jobs", ["status", "id"])
+    op.create_index("ix_account_jobs_user_id", "account_jobs", ["user_id"])
+
+
+def downgrade():
+    op.drop_table("account_jobs")
+    account_job_type.drop(op.get_bind(), checkfirst=True)
+    for table in USER_INDEXES:
+        op.drop_index(f"ix_{table}_user_id", table)
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("date_deleted")
@@ -0,0 +1,78 @@
+"""report summary and report deduplication
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 23:02:37.519840
+
+Upgrading keeps only the first report each user filed against a target.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+report_type = postgresql.ENUM(
+    "USER", "POST", "COMMENT", name="reporttype", create_type=False
+)
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM reports WHERE id NOT IN "
+        "(SELECT min(id) FROM reports GROUP BY user_id, target_type, target_id)"
+    )
+    op.drop_index("ix_reports_user_id", "reports")
+    with op.batch_alter_table("reports") as batch_op:
+        batch_op.create_unique_constraint(
+            "uq_reports_user_id_target", ["user_id", "target_type", "target_id"]
+        )
+        batch_op.create_index(
+            "ix_reports_target_type_target_id", ["target_type", "target_id"]
+        )
+
+    op.create_table(
+        "report_summary",
+        sa.Column("target_type", report_type, nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("report_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("date_created", sa.DateTime(), nullable=True),
+        sa.Column("last_reported", sa.DateTime(), nullable=False),
+        sa.Column("date_resolved", sa.DateTime(), nullable=True),
+        sa.Column("resolved_by", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["resolved_by"],
+            ["users.id"],
+            name="fk_report_summary_resolved_by_users",
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint("target_type", "target_id"),
+    )
+    op.create_index(
+        "ix_report_summary_report_count",
+        "report_summary",
+        ["report_count", "last_reported"],
+    )
+    op.create_index(
+        "ix_report_summary_last_reported", "report_summary", ["last_reported"]
+    )
+    op.execute(
+        "INSERT INTO report_summary "
+        "(target_type, target_id, report_count, date_created, last_reported) "
+        "SELECT target_type, target_id, count(*), min(date_created), "
+        "coalesce(max(date_created), CURRENT_TIMESTAMP) "
+        "FROM reports GROUP BY target_type, target_id"
+    )
+
+
+def downgrade():
+    op.drop_table("report_summary")
+    with op.batch_alter_table("reports") as batch_op:
+        batch_op.drop_index("ix_reports_target_type_target_id")
+        batch_op.drop_constraint("uq_reports_user_id_target", type_="unique")
+    op.create_index("ix_reports_user_id", "reports", ["user_id"])
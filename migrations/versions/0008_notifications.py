@@ -0,0 +1,99 @@
+"""notifications
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 23:41:08.204917
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+notification_type = sa.Enum(
+    "POST_LIKE",
+    "POST_COMMENT",
+    "POST_VAULT",
+    "COMMENT_LIKE",
+    "COMMENT_REPLY",
+    name="notificationtype",
+)
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "unread_notification_count",
+                sa.Integer(),
+                server_default="0",
+                nullable=False,
+            )
+        )
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("type", notification_type, nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("actor_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_actor_id", sa.Integer(), nullable=True),
+        sa.Column("date_created", sa.DateTime(), nullable=True),
+        sa.Column("date_updated", sa.DateTime(), nullable=False),
+        sa.Column("date_read", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+            name="fk_notifications_user_id_users",
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["last_actor_id"],
+            ["users.id"],
+            name="fk_notifications_last_actor_id_users",
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id", "type", "target_id", name="uq_notifications_user_id_target"
+        ),
+    )
+    op.create_index(
+        "ix_notifications_user_id_date_updated",
+        "notifications",
+        ["user_id", "date_updated", "id"],
+    )
+
+    op.create_table(
+        "notification_actors",
+        sa.Column("notification_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["notification_id"],
+            ["notifications.id"],
+            name="fk_notification_actors_notification_id_notifications",
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+            name="fk_notification_actors_user_id_users",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("notification_id", "user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("notification_actors")
+    op.drop_table("notifications")
+    notification_type.drop(op.get_bind(), checkfirst=True)
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("unread_notification_count")
@@ -0,0 +1,325 @@
+import os
+import tempfile
+import zipfile
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="vault34-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(WORKDIR, "uploads")
+os.environ["FEED_MODEL_PATH"] = os.path.join(WORKDIR, "models", "feed.npz")
+os.environ["PROFILE_DIR"] = os.path.join(WORKDIR, "profiles")
+os.environ.setdefault("ORIGINS", '["*"]')
+os.environ.setdefault("API_URL", "http://testserver")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMIN_USER_IDS"] = "[1]"
+os.environ["NOTIFICATION_FLUSH_INTERVAL_MS"] = "3600000"
+os.environ["SIMILARITY_PENDING_INTERVAL_SECONDS"] = "3600"
+os.environ["LIVE_MAX_SECONDS"] = "0.1"
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import event, insert
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.enums import (
+    AccountJobType,
+    JobStatus,
+    NotificationType,
+    Privacy,
+    ReactionType,
+    TagType,
+)
+from app.main import app
+from app.models import (
+    AccountJob,
+    Comment,
+    CommentReaction,
+    Notification,
+    Post,
+    PostFile,
+    PostReaction,
+    Tag,
+    User,
+    Vault,
+    notification_actor,
+    post_tag,
+    post_vault,
+)
+from app.recommender import save_model
+from app.user_stats import reconcile_user_counters
+from app.utils import create_token, hash_password
+
+ITEMS = 60
+OWNER_ID, VIEWER_ID, SCRATCH_USER_ID = 1, 2, 3
+PASSWORD = "password"
+SCRATCH_POST_ID = ITEMS + 1
+BULK_POST_ID = SCRATCH_POST_ID + 1
+SCRATCH_VAULT_ID = ITEMS + 1
+EXPORT_JOB_ID = 1
+AVATAR_ID = "a" * 32
+ALEMBIC_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+def auth_headers(user_id: int) -> dict:
+    return {"Cookie": f"auth_token={create_token(user_id)}"}
+
+
+OWNER = auth_headers(OWNER_ID)
+VIEWER = auth_headers(VIEWER_ID)
+
+
+def register(client, username: str) -> dict:
+    response = client.post("/users", json={"username": username, "password": "pw1"})
+    assert response.status_code == 200, response.text
+    client.cookies.clear()
+    return {"Cookie": f"auth_token={response.cookies['auth_token']}"}
+
+
+def create_post(
+    client,
+    headers: dict,
+    data: bytes,
+    title: str = "post",
+    filename: str = "upload.jpg",
+    content_type: str = "image/jpeg",
+) -> int:
+    response = client.post(
+        "/posts",
+        data={"title": title},
+        files=[("files", (filename, data, content_type))],
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def write_image(path: str, color: str = "red"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", (64, 48), color).save(path, "JPEG")
+
+
+def seed_database():
+    db = SessionLocal()
+    db.execute(
+        insert(User),
+        [
+            {
+                "id": OWNER_ID,
+                "username": "owner",
+                "password": hash_password(PASSWORD),
+                "profile_picture": "owner.jpg",
+            },
+            {
+                "id": VIEWER_ID,
+                "username": "viewer",
+                "password": hash_password(PASSWORD),
+                "profile_picture": "",
+            },
+            {
+                "id": SCRATCH_USER_ID,
+                "username": "scratch",
+                "password": hash_password(PASSWORD),
+                "profile_picture": f"avatars/{AVATAR_ID}",
+            },
+        ],
+    )
+    write_image(os.path.join(settings.UPLOAD_FOLDER, "owner.jpg"))
+    for size in settings.AVATAR_SIZES:
+        path = os.path.join(settings.UPLOAD_FOLDER, "avatars", AVATAR_ID)
+        os.makedirs(path, exist_ok=True)
+        path = os.path.join(path, f"{size}.webp")
+        Image.new("RGB", (size, size), "blue").save(path, "WEBP")
+
+    post_ids = range(1, BULK_POST_ID + 1)
+    db.execute(
+        insert(Post),
+        [
+            {"id": post_id, "user_id": OWNER_ID, "title": f"post {post_id}"}
+            for post_id in post_ids
+        ],
+    )
+    write_image(os.path.join(settings.UPLOAD_FOLDER, "1.jpg"))
+    db.execute(
+        insert(PostFile),
+        [
+            {
+                "id": file_id,
+                "post_id": post_id,
+                "filename": f"{file_id}.jpg",
+                "file_path": "1.jpg",
+                "thumbnail_path": "1.jpg",
+                "content_type": "image/jpeg",
+                "width": 64,
+                "height": 48,
+                "phash": f"{post_id % 4:016x}",
+            }
+            for file_id, post_id in enumerate(
+                [post_id for post_id in post_ids for _ in range(2)], start=1
+            )
+        ],
+    )
+
+    db.execute(
+        insert(Tag),
+        [
+            {"id": tag_id, "name": f"tag{tag_id}", "type": TagType.GENERAL}
+            for tag_id in range(1, ITEMS + 1)
+        ],
+    )
+    db.execute(
+        insert(post_tag),
+        [
+            {"post_id": post_id, "tag_id": (post_id + offset) % ITEMS + 1}
+            for post_id in range(1, ITEMS + 1)
+            for offset in range(3)
+        ],
+    )
+    db.execute(
+        insert(PostReaction),
+        [
+            {"user_id": user_id, "post_id": post_id, "type": ReactionType.LIKE}
+            for user_id in (OWNER_ID, VIEWER_ID)
+            for post_id in range(1, ITEMS + 1)
+        ],
+    )
+    db.execute(Post.__table__.update().values(like_count=2))
+
+    db.execute(
+        insert(Vault),
+        [
+            {
+                "id": vault_id,
+                "user_id": OWNER_ID,
+                "title": f"vault {vault_id}",
+                "privacy": Privacy.PUBLIC,
+            }
+            for vault_id in range(1, SCRATCH_VAULT_ID + 1)
+        ],
+    )
+    db.execute(
+        insert(post_vault),
+        [
+            {"vault_id": vault_id, "post_id": post_id, "position": post_id}
+            for vault_id in range(1, ITEMS + 1)
+            for post_id in (range(1, ITEMS + 1) if vault_id == 1 else range(1, 6))
+        ],
+    )
+
+    comments = [
+        {
+            "id": top_id,
+            "post_id": 1,
+            "user_id": VIEWER_ID,
+            "path": f"{top_id:010d}",
+            "reply_count": ITEMS if top_id == 1 else 3,
+            "content": f"comment {top_id}",
+        }
+        for top_id in range(1, ITEMS + 1)
+    ]
+    for parent in list(comments):
+        for _ in range(parent["reply_count"]):
+            reply_id = len(comments) + 1
+            comments.append(
+                {
+                    "id": reply_id,
+                    "post_id": 1,
+                    "user_id": OWNER_ID,
+                    "parent_id": parent["id"],
+                    "path": f"{parent['path']}/{reply_id:010d}",
+                    "reply_count": 0,
+                    "content": f"comment {reply_id}",
+                }
+            )
+    db.execute(insert(Comment), comments)
+    db.execute(
+        insert(CommentReaction),
+        [
+            {
+                "user_id": VIEWER_ID,
+                "comment_id": comment["id"],
+                "type": ReactionType.LIKE,
+            }
+            for comment in comments
+        ],
+    )
+
+    db.execute(
+        insert(Notification),
+        [
+            {
+                "id": post_id,
+                "user_id": OWNER_ID,
+                "type": NotificationType.POST_LIKE,
+                "target_id": post_id,
+                "post_id": post_id,
+                "actor_count": 1,
+                "last_actor_id": VIEWER_ID,
+                "date_updated": datetime(2026, 1, 1) + timedelta(minutes=post_id),
+            }
+            for post_id in range(1, ITEMS + 1)
+        ],
+    )
+    db.execute(
+        insert(notification_actor),
+        [
+            {"notification_id": post_id, "user_id": VIEWER_ID}
+            for post_id in range(1, ITEMS + 1)
+        ],
+    )
+
+    os.makedirs(os.path.join(settings.UPLOAD_FOLDER, "exports"))
+    path = os.path.join("exports", f"{EXPORT_JOB_ID}.zip")
+    with zipfile.ZipFile(
+        os.path.join(settings.UPLOAD_FOLDER, path), "w", zipfile.ZIP_DEFLATED
+    ) as archive:
+        archive.writestr("profile.jsonl", '{"id": 1, "username": "owner"}\n' * 100)
+    db.execute(
+        insert(AccountJob),
+        [
+            {
+                "id": EXPORT_JOB_ID,
+                "user_id": OWNER_ID,
+                "type": AccountJobType.EXPORT,
+                "status": JobStatus.DONE,
+                "stage": "archive",
+                "path": path,
+            }
+        ],
+    )
+    db.commit()
+    reconcile_user_counters(db)
+    db.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    command.upgrade(Config(ALEMBIC_CONFIG), "head")
+    seed_database()
+    save_model()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def image():
+    path = os.path.join(WORKDIR, "upload.jpg")
+    write_image(path, "blue")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def statements():
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        captured.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield captured
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,121 @@
+"""Account exports and deletions run as chunked, resumable background jobs."""
+
+import io
+import os
+import zipfile
+
+import orjson
+
+import app.accounts as accounts
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import AccountJobType, JobStatus
+from app.models import AccountJob, Post, User
+from app.user_stats import reconcile_user_counters
+from app.worker import run_account_jobs
+from tests.conftest import VIEWER, create_post, register
+from tests.test_user_counters import profile
+
+
+def read_lines(archive: zipfile.ZipFile, name: str) -> list[dict]:
+    return [orjson.loads(line) for line in archive.read(name).splitlines()]
+
+
+def test_export_streams_a_zip_with_range_support(client, monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNT_JOB_CHUNK_SIZE", 7)
+    job = client.post("/users/viewer/export", headers=VIEWER).json()
+
+    job = client.get(f"/jobs/{job['id']}", headers=VIEWER).json()
+    assert job["status"] == JobStatus.DONE
+    assert job["stage"] == "archive"
+    assert job["download"].endswith(f"/jobs/{job['id']}/download")
+
+    response = client.get(f"/jobs/{job['id']}/download", headers=VIEWER)
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert read_lines(archive, "profile.jsonl")[0]["username"] == "viewer"
+    comments = read_lines(archive, "comments.jsonl")
+    assert len(comments) == len({comment["id"] for comment in comments}) > 7
+    assert job["progress"] >= len(comments)
+    assert not os.path.exists(accounts.export_folder(AccountJob(id=job["id"])))
+
+    partial = client.get(
+        f"/jobs/{job['id']}/download",
+        headers={**VIEWER, "Range": "bytes=10-19"},
+    )
+    assert partial.status_code == 206
+    assert partial.content == response.content[10:20]
+
+
+def test_failed_export_resumes_from_its_cursor(client, monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNT_JOB_CHUNK_SIZE", 7)
+    monkeypatch.setattr(settings, "MEDIA_QUEUE", True)
+    export_comments = accounts.EXPORTS["comments"]
+    calls = []
+
+    def flaky(db, job):
+        calls.append(job.cursor)
+        if len(calls) == 3:
+            raise OSError("disk full")
+        return export_comments(db, job)
+
+    stage = accounts.export_stage(flaky)
+    monkeypatch.setitem(accounts.STAGES[AccountJobType.EXPORT], "comments", stage)
+    job_id = client.post("/users/viewer/export", headers=VIEWER).json()["id"]
+
+    run_account_jobs()
+    assert calls[2] == calls[3] > 0
+
+    db = SessionLocal()
+    job = db.get(AccountJob, job_id)
+    assert (job.status, job.attempts) == (JobStatus.DONE, 2)
+    with zipfile.ZipFile(os.path.join(settings.UPLOAD_FOLDER, job.path)) as archive:
+        comments = read_lines(archive, "comments.jsonl")
+    db.close()
+    assert len(comments) == len({comment["id"] for comment in comments})
+
+
+def test_account_deletion_removes_everything(client, image):
+    leaving = register(client, "leaving")
+    before = profile(client, "viewer")
+    likes = client.get("/posts/3").json()["likes"]
+
+    post_id = create_post(client, leaving, image, "leaving")
+    client.post(f"/posts/{post_id}/comments", json={"content": "hi"}, headers=VIEWER)
+    comment = client.post(
+        "/posts/3/comments", json={"content": "bye"}, headers=leaving
+    ).json()
+    client.post(
+        "/posts/3/comments",
+        json={"content": "reply", "parent_id": comment["id"]},
+        headers=VIEWER,
+    )
+    client.post("/posts/3/reactions", json={"type": "like"}, headers=leaving)
+    client.post("/vaults", json={"title": "mine", "privacy": "public"}, headers=leaving)
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "leaving").one()
+    paths = [
+        os.path.join(settings.UPLOAD_FOLDER, post_file.file_path)
+        for post_file in db.get(Post, post_id).files
+    ]
+    db.close()
+
+    response = client.delete("/users/leaving", headers=leaving)
+    assert response.status_code == 200, response.text
+    assert response.json()["type"] == "delete"
+
+    assert client.get("/users/leaving").status_code == 404
+    assert client.get("/verify-token", headers=leaving).status_code == 401
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.get("/posts/3").json()["likes"] == likes
+    assert not any(os.path.exists(path) for path in paths)
+
+    db = SessionLocal()
+    job = db.query(AccountJob).filter(AccountJob.id == response.json()["id"]).one()
+    assert (job.status, job.user_id) == (JobStatus.DONE, None)
+    assert db.get(User, user.id) is None
+    assert profile(client, "viewer") == before
+    reconcile_user_counters(db)
+    db.close()
+    assert profile(client, "viewer") == before
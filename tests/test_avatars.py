@@ -0,0 +1,89 @@
+"""Profile pictures are stored as square WebP renditions behind immutable URLs."""
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.worker import run_file_deletions
+from tests.conftest import register
+
+
+@pytest.fixture(scope="module")
+def portrait(client) -> dict:
+    return register(client, "portrait")
+
+
+def upload(client, headers, data: bytes, content_type: str = "image/jpeg"):
+    return client.post(
+        "/users/portrait/profile-picture",
+        files={"file": ("upload.jpg", data, content_type)},
+        headers=headers,
+    )
+
+
+def encode(size: tuple[int, int], color: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def local_path(url: str) -> str:
+    return os.path.join(settings.UPLOAD_FOLDER, url.split("/", 3)[3])
+
+
+def test_uploads_are_served_as_square_webp(client, portrait):
+    response = upload(client, portrait, encode((300, 120), "green"))
+    assert response.status_code == 200, response.text
+    avatar = response.json()["avatar"]
+    assert client.get("/verify-token", headers=portrait).json()["avatar"] == avatar
+    assert client.get("/users/portrait").json()["avatar"] == avatar
+
+    for size in settings.AVATAR_SIZES:
+        response = client.get(avatar.replace("/40.webp", f"/{size}.webp"))
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "immutable" in response.headers["cache-control"]
+        assert Image.open(io.BytesIO(response.content)).size == (size, size)
+
+    response = client.get(
+        "/users/portrait/profile-picture", params={"size": 100}, follow_redirects=False
+    )
+    assert response.status_code == 307
+    assert response.headers["location"] == avatar.replace("/40.webp", "/128.webp")
+
+
+def test_replaced_avatars_are_deleted(client, portrait):
+    first = upload(client, portrait, encode((64, 64), "red")).json()["avatar"]
+    second = upload(client, portrait, encode((64, 64), "yellow")).json()["avatar"]
+    assert first != second
+    assert not os.path.exists(local_path(first))
+    assert os.path.exists(local_path(second))
+    assert client.get(first).status_code == 404
+
+
+def test_queued_deletions_skip_avatars_in_use_again(client, portrait, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_QUEUE", True)
+    first = upload(client, portrait, encode((64, 64), "purple")).json()["avatar"]
+    second = upload(client, portrait, encode((64, 64), "orange")).json()["avatar"]
+    third = upload(client, portrait, encode((64, 64), "purple")).json()["avatar"]
+    assert third == first
+
+    run_file_deletions()
+    assert os.path.exists(local_path(first))
+    assert not os.path.exists(local_path(second))
+    assert client.get(first).status_code == 200
+
+
+def test_invalid_uploads_are_rejected(client, portrait, monkeypatch):
+    assert upload(client, portrait, b"not an image").status_code == 400
+    monkeypatch.setattr(settings, "AVATAR_MAX_FILE_SIZE", 16)
+    response = upload(client, portrait, encode((64, 64), "red"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large"
+
+
+def test_users_without_a_picture_get_404(client):
+    assert client.get("/users/viewer/profile-picture").status_code == 404
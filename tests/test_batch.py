@@ -0,0 +1,76 @@
+"""Batch endpoints return known items in request order and reject oversized lists."""
+
+import pytest
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import ReactionType
+from app.models import Post
+from app.reactions import ReactionBuffer, get_reaction_type
+from app.routers import post as post_router
+from tests.conftest import VIEWER, VIEWER_ID
+
+BATCHES = [
+    ("GET", "/posts:batch", "id"),
+    ("GET", "/posts:files", "post_id"),
+    ("POST", "/users:batch", "username"),
+]
+
+
+def fetch(client, method: str, url: str, ids: list, headers: dict = None):
+    if method == "POST":
+        return client.post(url, json={"usernames": ids}, headers=headers)
+    return client.get(url, params={"ids": ",".join(map(str, ids))}, headers=headers)
+
+
+def valid_ids(method: str) -> list:
+    if method == "POST":
+        return ["viewer", "nobody", "owner", "viewer"]
+    return [5, 999999, 2, 5]
+
+
+@pytest.mark.parametrize("method, url, key", BATCHES)
+def test_batches_keep_request_order_and_skip_unknown_ids(client, method, url, key):
+    response = fetch(client, method, url, valid_ids(method))
+    assert response.status_code == 200, response.text
+    expected = ["viewer", "owner"] if method == "POST" else [5, 2]
+    assert [item[key] for item in response.json()] == expected
+
+
+@pytest.mark.parametrize("method, url, key", BATCHES)
+def test_batches_reject_more_than_the_maximum(client, method, url, key):
+    ids = [f"user{index}" for index in range(settings.BATCH_MAX_SIZE + 1)]
+    if method == "GET":
+        ids = list(range(1, settings.BATCH_MAX_SIZE + 2))
+    response = fetch(client, method, url, ids)
+    assert response.status_code == 400
+    assert response.json()["detail"] == (
+        f"At most {settings.BATCH_MAX_SIZE} items per request"
+    )
+
+
+@pytest.mark.parametrize("url", ["/posts:batch", "/posts:files"])
+def test_batches_reject_malformed_ids(client, url):
+    for ids in ("1,x", "1,,2", "1.5"):
+        response = client.get(url, params={"ids": ids})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid ids"
+
+
+def test_post_batches_include_buffered_reactions(client, monkeypatch):
+    buffer = ReactionBuffer()
+    monkeypatch.setattr(settings, "REACTION_WRITE_BEHIND", True)
+    monkeypatch.setattr(post_router, "reaction_buffer", buffer)
+    db = SessionLocal()
+    try:
+        likes = db.get(Post, 7).likes
+        liked = get_reaction_type(db, VIEWER_ID, 7) == ReactionType.LIKE
+        reaction_type = ReactionType.NONE if liked else ReactionType.LIKE
+        buffer.add(db, VIEWER_ID, 7, reaction_type)
+    finally:
+        db.close()
+    assert buffer.delta(7)[0] != 0
+
+    post = fetch(client, "GET", "/posts:batch", [7], VIEWER).json()[0]
+    assert post["likes"] == likes + buffer.delta(7)[0]
+    assert post["user_reaction"] == reaction_type
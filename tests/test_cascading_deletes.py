@@ -0,0 +1,72 @@
+"""Post deletes cascade in the database and clean up media in the background."""
+
+import os
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Comment, CommentReaction, FileDeletion, Post, PostFile
+from tests.conftest import OWNER, VIEWER, create_post
+
+def test_bulk_delete_cascades_and_removes_files(client, image):
+    post_id = create_post(client, OWNER, image)
+    other_id = create_post(client, VIEWER, image)
+    comment = client.post(
+        f"/posts/{post_id}/comments", json={"content": "top"}, headers=VIEWER
+    ).json()
+    reply = client.post(
+        f"/posts/{post_id}/comments",
+        json={"content": "reply", "parent_id": comment["id"]},
+        headers=OWNER,
+    ).json()
+    client.post(
+        f"/posts/{post_id}/comments/{reply['id']}/reactions",
+        json={"type": "like"},
+        headers=VIEWER,
+    )
+    client.post(f"/posts/{post_id}/reactions", json={"type": "like"}, headers=VIEWER)
+
+    db = SessionLocal()
+    paths = [
+        os.path.join(settings.UPLOAD_FOLDER, post_file.file_path)
+        for post_file in db.query(PostFile).filter(PostFile.post_id == post_id)
+    ]
+    db.close()
+    assert paths and all(os.path.exists(path) for path in paths)
+
+    response = client.request(
+        "DELETE", "/posts", json={"post_ids": [post_id, other_id]}, headers=OWNER
+    )
+    assert response.json() == {"detail": "Posts removed", "count": 1}
+
+    db = SessionLocal()
+    assert db.query(Post).filter(Post.id == post_id).count() == 0
+    assert db.query(Post).filter(Post.id == other_id).count() == 1
+    assert db.query(PostFile).filter(PostFile.post_id == post_id).count() == 0
+    assert db.query(Comment).filter(Comment.post_id == post_id).count() == 0
+    assert (
+        db.query(CommentReaction)
+        .filter(CommentReaction.comment_id == reply["id"])
+        .count()
+        == 0
+    )
+    assert db.query(FileDeletion).count() == 0
+    db.close()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_deleting_a_comment_cascades_to_replies(client):
+    comment = client.post(
+        "/posts/2/comments", json={"content": "top"}, headers=VIEWER
+    ).json()
+    client.post(
+        "/posts/2/comments",
+        json={"content": "reply", "parent_id": comment["id"]},
+        headers=VIEWER,
+    )
+
+    response = client.delete(f"/posts/2/comments/{comment['id']}", headers=VIEWER)
+    assert response.status_code == 200, response.text
+
+    db = SessionLocal()
+    assert db.query(Comment).filter(Comment.parent_id == comment["id"]).count() == 0
+    db.close()
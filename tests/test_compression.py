@@ -0,0 +1,69 @@
+"""Response compression and conditional GETs."""
+
+import pytest
+
+from app.compression import choose_encoding
+from tests.conftest import VIEWER
+
+
+def test_large_json_is_gzipped(client):
+    response = client.get(
+        "/posts", params={"size": 50}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert len(response.json()["items"]) == 50
+
+    identity = client.get(
+        "/posts", params={"size": 50}, headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in identity.headers
+    assert identity.json() == response.json()
+
+
+def test_small_json_is_not_compressed(client):
+    response = client.get("/users/owner", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_brotli_is_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    response = client.get(
+        "/posts", params={"size": 50}, headers={"Accept-Encoding": "gzip, br"}
+    )
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_encoding_negotiation():
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("deflate, gzip; q=0.5") == "gzip"
+    assert choose_encoding("") is None
+
+
+def test_unchanged_pages_return_304(client):
+    response = client.get("/posts/1/comments", params={"size": 5})
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get(
+        "/posts/1/comments", params={"size": 5}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    other = client.get(
+        "/posts/1/comments", params={"size": 6}, headers={"If-None-Match": etag}
+    )
+    assert other.status_code == 200
+
+
+def test_etag_changes_after_a_write(client):
+    response = client.get("/users/viewer")
+    etag = response.headers["etag"]
+    vault = {"title": "etag", "privacy": "public"}
+    assert client.post("/vaults", json=vault, headers=VIEWER).status_code == 200
+
+    response = client.get("/users/viewer", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
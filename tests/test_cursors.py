@@ -0,0 +1,31 @@
+"""Cursor pages stay stable under concurrent writes and reject malformed cursors."""
+
+from app.utils import encode_cursor
+from tests.conftest import OWNER
+
+
+def test_vault_pages_survive_removed_cursor_posts(client):
+    vault = client.post(
+        "/vaults", json={"title": "cursor", "privacy": "public"}, headers=OWNER
+    ).json()
+    url = f"/vaults/{vault['id']}/posts"
+    client.post(url, json={"post_ids": [1, 2, 3, 4, 5]}, headers=OWNER)
+
+    first = client.get(f"{url}/recent", params={"size": 2}).json()
+    assert [post["id"] for post in first["items"]] == [5, 4]
+    client.delete(url, params={"post_ids": [4]}, headers=OWNER)
+    second = client.get(
+        f"{url}/recent", params={"size": 2, "cursor": first["next_cursor"]}
+    ).json()
+    assert [post["id"] for post in second["items"]] == [3, 2]
+
+    for cursor in (encode_cursor(4), encode_cursor("x", 1), encode_cursor()):
+        response = client.get(f"{url}/recent", params={"cursor": cursor})
+        assert response.status_code == 400
+
+
+def test_reply_cursors_must_hold_a_path(client):
+    url = "/posts/1/comments/1/replies"
+    for cursor in (encode_cursor(), encode_cursor(1), encode_cursor("a", "b")):
+        assert client.get(url, params={"cursor": cursor}).status_code == 400
+    assert client.get(url, params={"cursor": encode_cursor("9")}).status_code == 200
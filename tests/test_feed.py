@@ -0,0 +1,72 @@
+"""The for-you feed never trains a model inside a request."""
+
+import numpy as np
+from sqlalchemy import desc, func, select
+
+from app import recommender as recommender_module
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import ReactionType
+from app.models import Post, PostReaction
+from app.recommender import recommender
+
+
+def test_feed_serves_popular_posts_until_a_model_is_saved(
+    client, monkeypatch, tmp_path
+):
+    def train(db):
+        raise AssertionError("trained in the request path")
+
+    monkeypatch.setattr(recommender_module, "train", train)
+    monkeypatch.setattr(settings, "FEED_MODEL_PATH", str(tmp_path / "feed.npz"))
+    monkeypatch.setattr(recommender, "model", None)
+    monkeypatch.setattr(recommender, "model_mtime", None)
+
+    response = client.get("/feed/for-you", params={"size": 100})
+    assert response.status_code == 200
+    db = SessionLocal()
+    try:
+        popular = db.scalars(
+            select(Post.id).order_by(desc(Post.like_count), desc(Post.id)).limit(100)
+        ).all()
+    finally:
+        db.close()
+    assert [post["id"] for post in response.json()["items"]] == popular
+
+
+def test_co_like_pairs_do_not_depend_on_the_chunk_size(monkeypatch):
+    rng = np.random.default_rng(0)
+    user_posts = rng.integers(0, 40, 600)
+    user_ptr = np.arange(0, 601, 20)
+    expected = recommender_module._co_like_pairs(user_ptr, user_posts, 40)
+    monkeypatch.setattr(settings, "FEED_PAIR_CHUNK_SIZE", 1)
+    for actual, wanted in zip(
+        recommender_module._co_like_pairs(user_ptr, user_posts, 40), expected
+    ):
+        assert np.array_equal(actual, wanted)
+
+
+def test_training_skips_likes_on_posts_deleted_mid_run(client):
+    db = SessionLocal()
+    try:
+        deleted_id = db.scalar(select(func.max(PostReaction.post_id)))
+        query = db.query
+
+        def snapshot(*entities):
+            if entities == (Post.id,):
+                return query(*entities).filter(Post.id != deleted_id)
+            return query(*entities)
+
+        db.query = snapshot
+        model = recommender_module.train(db)
+        likes = db.scalar(
+            select(func.count()).where(
+                PostReaction.type == ReactionType.LIKE,
+                PostReaction.post_id != deleted_id,
+            )
+        )
+    finally:
+        db.close()
+    assert deleted_id not in model["post_ids"]
+    assert len(model["popularity"]) == len(model["post_ids"])
+    assert model["popularity"].sum() == likes
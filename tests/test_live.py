@@ -0,0 +1,70 @@
+"""Post pages receive reaction and comment deltas over server-sent events."""
+
+import asyncio
+import threading
+import time
+
+import orjson
+
+from app.config import settings
+from app.live import RESYNC, Subscription, live_updates
+from tests.conftest import VIEWER
+
+
+def parse_events(body: bytes) -> list[tuple[str, dict]]:
+    events = []
+    for frame in body.decode().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in frame.splitlines() if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["event"], orjson.loads(fields["data"])))
+    return events
+
+
+def test_writes_are_pushed_to_post_subscribers(client, monkeypatch):
+    monkeypatch.setattr(settings, "LIVE_MAX_SECONDS", 1.0)
+    live_updates.get_broker()
+
+    def write():
+        while live_updates.broker.count == 0:
+            time.sleep(0.01)
+        client.post("/posts/6/reactions", json={"type": "dislike"}, headers=VIEWER)
+        client.post("/posts/7/reactions", json={"type": "like"}, headers=VIEWER)
+        client.post("/posts/6/comments", json={"content": "live"}, headers=VIEWER)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    response = client.get("/posts/6/live")
+    writer.join()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    events = parse_events(response.content)
+    likes = client.get("/posts/6").json()
+    assert [event for event, _ in events] == ["reaction", "comment"]
+    assert events[0][1] == {"likes": likes["likes"], "dislikes": likes["dislikes"]}
+    assert events[1][1]["parent_id"] is None
+    assert live_updates.broker.count == 0
+
+
+def test_missing_posts_have_no_channel(client):
+    assert client.get("/posts/999999/live").status_code == 404
+
+
+def test_slow_subscribers_are_told_to_resync():
+    async def overflow():
+        subscription = Subscription("post:1", asyncio.get_running_loop())
+        for index in range(settings.LIVE_QUEUE_SIZE + 5):
+            subscription.put(b"frame %d" % index)
+        frames = []
+        while not subscription.queue.empty():
+            frames.append(subscription.queue.get_nowait())
+        return frames
+
+    frames = asyncio.run(overflow())
+    assert frames[0] == RESYNC
+    assert frames[1:] == [
+        b"frame %d" % index
+        for index in range(settings.LIVE_QUEUE_SIZE + 1, settings.LIVE_QUEUE_SIZE + 5)
+    ]
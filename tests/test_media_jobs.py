@@ -0,0 +1,174 @@
+"""Uploads with MEDIA_QUEUE enabled are stored as-is and rendered by the worker."""
+
+import io
+import os
+
+from PIL import Image
+
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import JobStatus
+from app.models import MediaJob, PostFile
+from app.similarity import index_existing_files, similarity_index
+from app.worker import run
+from tests.conftest import OWNER, create_post
+
+
+def test_worker_processes_queued_uploads(client, image, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_QUEUE", True)
+    post_id = create_post(client, OWNER, image, "queued")
+
+    db = SessionLocal()
+    try:
+        post_file = db.query(PostFile).filter(PostFile.post_id == post_id).one()
+        assert post_file.thumbnail_path == post_file.file_path
+        assert post_file.phash is None
+        assert [job.status for job in post_file.jobs] == [JobStatus.PENDING]
+
+        run(drain=True)
+        db.expire_all()
+
+        assert post_file.jobs == []
+        assert post_file.thumbnail_path != post_file.file_path
+        assert (post_file.width, post_file.height) == (64, 48)
+        assert post_file.placeholder and post_file.phash
+    finally:
+        db.close()
+
+
+def test_worker_gives_up_after_max_attempts(client, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_JOB_MAX_ATTEMPTS", 2)
+    db = SessionLocal()
+    try:
+        post_file = PostFile(
+            post_id=1,
+            filename="missing.jpg",
+            file_path="missing.jpg",
+            thumbnail_path="missing.jpg",
+            content_type="image/jpeg",
+        )
+        post_file.jobs.append(MediaJob())
+        db.add(post_file)
+        db.commit()
+
+        run(drain=True)
+        job = db.query(MediaJob).filter(MediaJob.post_file_id == post_file.id).one()
+        assert (job.status, job.attempts) == (JobStatus.FAILED, 2)
+        assert job.error
+        db.refresh(post_file)
+        assert post_file.phash == ""
+
+        db.delete(post_file)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_unhashed_files_do_not_stall_the_similarity_index(client):
+    db = SessionLocal()
+    try:
+        pending, hashed = (
+            PostFile(
+                post_id=1,
+                filename=f"{name}.jpg",
+                file_path=f"{name}.jpg",
+                thumbnail_path=f"{name}.jpg",
+                content_type="image/jpeg",
+                phash=phash,
+            )
+            for name, phash in (("pending", None), ("hashed", "f0f0f0f0f0f0f0f0"))
+        )
+        db.add_all([pending, hashed])
+        db.commit()
+
+        assert similarity_index.similar_posts(db, [hashed.phash], 0) == {1: 0}
+        assert similarity_index.last_file_id >= hashed.id
+        assert pending.id in similarity_index.pending
+
+        pending.phash = "0f0f0f0f0f0f0f0f"
+        db.commit()
+        assert similarity_index.similar_posts(db, [pending.phash], 0) == {}
+        similarity_index.check_pending(db)
+        assert similarity_index.similar_posts(db, [pending.phash], 0) == {1: 0}
+        assert pending.id not in similarity_index.pending
+    finally:
+        db.close()
+
+
+def test_maintenance_hashes_legacy_files_outside_the_index(client, image):
+    with open(os.path.join(settings.UPLOAD_FOLDER, "legacy.jpg"), "wb") as f:
+        f.write(image)
+    db = SessionLocal()
+    try:
+        legacy, queued = (
+            PostFile(
+                post_id=1,
+                filename=f"{name}.jpg",
+                file_path=f"{name}.jpg",
+                thumbnail_path=f"{name}.jpg",
+                content_type="image/jpeg",
+            )
+            for name in ("legacy", "queued")
+        )
+        queued.jobs.append(MediaJob())
+        db.add_all([legacy, queued])
+        db.commit()
+
+        similarity_index.rebuild(db)
+        assert not {legacy.id, queued.id} & similarity_index.pending
+        assert index_existing_files(db) == 1
+        db.refresh(legacy)
+        db.refresh(queued)
+        assert legacy.phash and queued.phash is None
+
+        db.delete(queued.jobs[0])
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_rows_committed_below_the_high_water_mark_are_indexed(client, monkeypatch):
+    db = SessionLocal()
+    try:
+        post_file = db.query(PostFile).filter(PostFile.post_id == 2).first()
+        phash = post_file.phash
+        similarity_index.add_new_files(db)
+        assert similarity_index.last_file_id >= post_file.id
+
+        post_file.phash = "3c3c3c3c3c3c3c3c"
+        db.commit()
+        assert similarity_index.similar_posts(db, [post_file.phash], 0) == {}
+
+        monkeypatch.setattr(settings, "SIMILARITY_INDEX_REFRESH_SECONDS", 0)
+        similarity_index.refresh()
+        assert similarity_index.similar_posts(db, [post_file.phash], 0) == {2: 0}
+
+        post_file.phash = phash
+        db.commit()
+        similarity_index.refresh()
+    finally:
+        db.close()
+
+
+def test_similar_posts_skip_deleted_posts(client):
+    stripes = Image.new("L", (64, 64))
+    stripes.putdata([255 * (x // 8 % 2) for _ in range(64) for x in range(64)])
+    upload = io.BytesIO()
+    stripes.save(upload, "PNG")
+    post_ids = [
+        create_post(
+            client, OWNER, upload.getvalue(), "twin", "stripes.png", "image/png"
+        )
+        for _ in range(3)
+    ]
+
+    def similar(limit: int) -> list[int]:
+        response = client.get(
+            f"/posts/{post_ids[0]}/similar", params={"distance": 0, "limit": limit}
+        )
+        return [post["id"] for post in response.json()]
+
+    assert similar(100) == post_ids[1:]
+    assert similar(1) == post_ids[1:2]
+    client.delete(f"/posts/{post_ids[1]}", headers=OWNER)
+    assert similar(100) == post_ids[2:]
@@ -0,0 +1,13 @@
+"""The migration history must produce exactly the schema the models describe."""
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from app.database import engine
+from app.models import Base
+
+
+def test_migrations_match_models(client):
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
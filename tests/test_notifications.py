@@ -0,0 +1,176 @@
+"""Activity is coalesced per target and delivered to inboxes in the background."""
+
+import pytest
+
+from app.notifications import notification_buffer
+from tests.conftest import OWNER, VIEWER, create_post, register
+
+
+@pytest.fixture(scope="module")
+def fans(client) -> list[dict]:
+    return [register(client, username) for username in ("fan1", "fan2")]
+
+
+def inbox(client, headers, **params) -> dict:
+    response = client.get("/notifications", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def find(page: dict, notification_type: str, target_id: int) -> dict | None:
+    for item in page["items"]:
+        if (item["type"], item["target_id"]) == (notification_type, target_id):
+            return item
+
+
+def test_likes_are_coalesced_per_post(client, fans):
+    notification_buffer.flush()
+    page = inbox(client, OWNER, size=100)
+    unread_count = page["unread_count"]
+    actor_count = find(page, "post_like", 2)["actor_count"]
+    for headers in [*fans, fans[0]]:
+        client.post("/posts/2/reactions", json={"type": "like"}, headers=headers)
+    client.post("/posts/2/reactions", json={"type": "like"}, headers=OWNER)
+    page = inbox(client, OWNER, size=100)
+    assert find(page, "post_like", 2)["actor_count"] == actor_count
+
+    notification_buffer.flush()
+    page = inbox(client, OWNER)
+    item = page["items"][0]
+    assert (item["type"], item["target_id"]) == ("post_like", 2)
+    assert item["actor_count"] == actor_count + 2
+    assert item["actor"]["username"] == "fan2"
+    assert not item["read"]
+    assert page["unread_count"] == unread_count
+
+
+def test_repeated_likes_do_not_notify_again(client, fans):
+    client.post("/posts/4/reactions", json={"type": "like"}, headers=fans[0])
+    notification_buffer.flush()
+    client.post("/notifications:read", json={}, headers=OWNER)
+    client.post("/posts/4/reactions", json={"type": "like"}, headers=fans[0])
+    notification_buffer.flush()
+    page = inbox(client, OWNER, size=100)
+    assert find(page, "post_like", 4)["read"]
+    assert page["unread_count"] == 0
+
+
+def test_comments_replies_and_saves_notify_their_owners(client, fans):
+    notification_buffer.flush()
+    unread_count = inbox(client, VIEWER)["unread_count"]
+    comment = client.post(
+        "/posts/1/comments", json={"content": "hello"}, headers=VIEWER
+    ).json()
+    client.post(
+        "/posts/1/comments",
+        json={"content": "hi", "parent_id": comment["id"]},
+        headers=fans[0],
+    )
+    client.post(
+        f"/posts/1/comments/{comment['id']}/reactions",
+        json={"type": "like"},
+        headers=fans[1],
+    )
+    for privacy, post_id in (("public", 3), ("private", 5)):
+        vault = client.post(
+            "/vaults", json={"title": privacy, "privacy": privacy}, headers=fans[1]
+        ).json()
+        client.post(f"/vaults/{vault['id']}/posts/{post_id}", headers=fans[1])
+    notification_buffer.flush()
+
+    owner = inbox(client, OWNER)
+    assert find(owner, "post_comment", 1)["actor_count"] >= 2
+    assert find(owner, "post_vault", 3)["actor"]["username"] == "fan2"
+    assert find(owner, "post_vault", 5) is None
+    viewer = inbox(client, VIEWER)
+    assert find(viewer, "comment_reply", comment["id"])["actor"]["username"] == "fan1"
+    assert find(viewer, "comment_like", comment["id"])["post_id"] == 1
+    assert viewer["unread_count"] == unread_count + 2
+
+
+def test_inbox_pages_with_a_keyset_cursor(client):
+    expected = [item["id"] for item in inbox(client, OWNER, size=100)["items"]]
+    seen, cursor = [], None
+    while True:
+        params = {"size": 7, **({"cursor": cursor} if cursor else {})}
+        page = inbox(client, OWNER, **params)
+        seen += [item["id"] for item in page["items"]]
+        if not (cursor := page["next_cursor"]):
+            break
+    assert seen == expected
+    assert client.get("/notifications?cursor=bad", headers=OWNER).status_code == 400
+
+
+def test_reading_updates_the_unread_count(client, fans):
+    unread_count = inbox(client, OWNER)["unread_count"]
+    first = inbox(client, OWNER, unread=True)["items"][0]
+    response = client.post(
+        "/notifications:read", json={"ids": [first["id"]]}, headers=OWNER
+    )
+    assert response.json()["count"] == 1
+    assert inbox(client, OWNER)["unread_count"] == unread_count - 1
+    unread = inbox(client, OWNER, unread=True)
+    assert find(unread, first["type"], first["target_id"]) is None
+
+    client.post("/notifications:read", json={}, headers=OWNER)
+    response = client.get("/notifications/unread-count", headers=OWNER)
+    assert response.json() == {"unread_count": 0}
+    assert inbox(client, OWNER, unread=True)["items"] == []
+
+    client.post("/posts/4/reactions", json={"type": "like"}, headers=fans[1])
+    notification_buffer.flush()
+    page = inbox(client, OWNER)
+    assert page["unread_count"] == 1
+    assert (page["items"][0]["target_id"], page["items"][0]["read"]) == (4, False)
+
+
+def test_deleting_content_withdraws_its_notifications(client, fans, image):
+    notification_buffer.flush()
+    unread_count = inbox(client, VIEWER)["unread_count"]
+    comment = client.post(
+        "/posts/1/comments", json={"content": "bye"}, headers=VIEWER
+    ).json()
+    client.post(
+        f"/posts/1/comments/{comment['id']}/reactions",
+        json={"type": "like"},
+        headers=fans[0],
+    )
+    notification_buffer.flush()
+    assert inbox(client, VIEWER)["unread_count"] == unread_count + 1
+    client.delete(f"/posts/1/comments/{comment['id']}", headers=VIEWER)
+    viewer = inbox(client, VIEWER, size=100)
+    assert find(viewer, "comment_like", comment["id"]) is None
+    assert viewer["unread_count"] == unread_count
+
+    post_id = create_post(client, fans[0], image, "short-lived")
+    client.post(f"/posts/{post_id}/reactions", json={"type": "like"}, headers=VIEWER)
+    notification_buffer.flush()
+    assert inbox(client, fans[0])["unread_count"] == 1
+    client.delete(f"/posts/{post_id}", headers=fans[0])
+    assert inbox(client, fans[0]) == {
+        "items": [],
+        "next_cursor": None,
+        "unread_count": 0,
+    }
+
+
+def test_events_for_content_deleted_before_the_flush_are_dropped(client, fans, image):
+    notification_buffer.flush()
+    unread_count = inbox(client, fans[1])["unread_count"]
+    post_id = create_post(client, fans[1], image, "gone before flush")
+    comment = client.post(
+        f"/posts/{post_id}/comments", json={"content": "soon"}, headers=fans[1]
+    ).json()
+    client.post(f"/posts/{post_id}/reactions", json={"type": "like"}, headers=VIEWER)
+    client.post(
+        f"/posts/{post_id}/comments/{comment['id']}/reactions",
+        json={"type": "like"},
+        headers=VIEWER,
+    )
+    client.delete(f"/posts/{post_id}", headers=fans[1])
+    notification_buffer.flush()
+
+    page = inbox(client, fans[1], size=100)
+    assert find(page, "post_like", post_id) is None
+    assert find(page, "comment_like", comment["id"]) is None
+    assert page["unread_count"] == unread_count
@@ -0,0 +1,62 @@
+"""Animated uploads get a small animated WebP preview; static images get none."""
+
+import io
+
+from PIL import Image, ImageDraw
+
+from app.config import settings
+from tests.conftest import OWNER, create_post
+
+
+def encode_gif(frame_count: int, duration: int) -> bytes:
+    frames = []
+    for index in range(frame_count):
+        frame = Image.new("RGB", (640, 480), "black")
+        ImageDraw.Draw(frame).rectangle((index * 10, 0, index * 10 + 40, 480), "white")
+        frames.append(frame)
+    buffer = io.BytesIO()
+    frames[0].save(
+        buffer,
+        "GIF",
+        save_all=True,
+        append_images=frames[1:],
+        duration=duration,
+        loop=0,
+    )
+    return buffer.getvalue()
+
+
+def upload(client, filename: str, data: bytes, content_type: str) -> tuple[int, dict]:
+    post_id = create_post(client, OWNER, data, filename, filename, content_type)
+    return post_id, client.get(f"/posts/{post_id}/files").json()["items"][0]
+
+
+def test_gifs_get_an_animated_webp_preview(client):
+    post_id, post_file = upload(client, "loop.gif", encode_gif(60, 40), "image/gif")
+    assert post_file["preview"] == f"{post_file['src']}?type=preview"
+    batch = client.get("/posts:files", params={"ids": post_id}).json()
+    assert batch[0]["files"][0]["preview"] == post_file["preview"]
+
+    response = client.get(post_file["preview"])
+    assert response.status_code == 200
+    with Image.open(io.BytesIO(response.content)) as preview:
+        assert preview.format == "WEBP"
+        assert preview.n_frames == settings.PREVIEW_FRAMES
+        assert max(preview.size) == settings.PREVIEW_SIZE
+        preview.load()
+        assert preview.info["duration"] == 80
+
+
+def test_fast_gifs_get_a_playable_frame_rate(client):
+    _, post_file = upload(client, "fast.gif", encode_gif(4, 10), "image/gif")
+    with Image.open(io.BytesIO(client.get(post_file["preview"]).content)) as preview:
+        assert preview.n_frames == 4
+        preview.load()
+        assert preview.info["duration"] >= 20
+
+
+def test_static_images_get_no_preview(client, image):
+    _, post_file = upload(client, "still.jpg", image, "image/jpeg")
+    assert post_file["preview"] is None
+    response = client.get(f"{post_file['src']}?type=preview")
+    assert response.status_code == 404
@@ -0,0 +1,570 @@
+"""SQL statement and response size budgets for every route.
+
+Each case records how many statements a request may issue and how large its
+response may be. Paginated cases are measured at two page sizes and must issue
+the same number of statements at both, so a per-item query fails here instead
+of in production. When an endpoint legitimately changes, update its budget in
+the same commit.
+"""
+
+from dataclasses import dataclass, field
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.config import settings
+from app.main import app
+from tests.conftest import (
+    AVATAR_ID,
+    BULK_POST_ID,
+    EXPORT_JOB_ID,
+    ITEMS,
+    OWNER_ID,
+    PASSWORD,
+    SCRATCH_POST_ID,
+    SCRATCH_USER_ID,
+    SCRATCH_VAULT_ID,
+    VIEWER_ID,
+    auth_headers,
+)
+
+PAGE_SIZES = (5, 50)
+# Seeded posts padded with unknown ids, so posts created by other tests don't count.
+UNKNOWN_IDS = range(10**6, 10**6 + settings.BATCH_MAX_SIZE - ITEMS)
+BATCH_IDS = ",".join(map(str, [*range(1, ITEMS + 1), *UNKNOWN_IDS]))
+
+
+@dataclass
+class Case:
+    method: str
+    route: str
+    url: str
+    max_statements: int
+    max_bytes: int = 512
+    page_param: str = None
+    max_item_bytes: int = 0
+    user_id: int = None
+    json: dict = None
+    data: dict = None
+    params: dict = field(default_factory=dict)
+    upload: str = None
+    name: str = None
+
+    @property
+    def id(self) -> str:
+        return self.name or f"{self.method} {self.url}"
+
+
+CASES = [
+    Case(
+        "GET",
+        "/posts",
+        "/posts",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/posts",
+        "/posts?query=post",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case("GET", "/posts/{post_id}", "/posts/1", max_statements=8, user_id=VIEWER_ID),
+    Case(
+        "GET",
+        "/posts:batch",
+        "/posts:batch",
+        max_statements=5,
+        max_bytes=24576,
+        user_id=VIEWER_ID,
+        params={"ids": BATCH_IDS},
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/similar",
+        "/posts/1/similar",
+        max_statements=6,
+        page_param="limit",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/related",
+        "/posts/1/related",
+        max_statements=3,
+        page_param="limit",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/posts:files",
+        "/posts:files",
+        max_statements=2,
+        max_bytes=24000,
+        params={"ids": BATCH_IDS},
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/files",
+        "/posts/1/files",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/files/{filename}",
+        "/posts/1/files/1.jpg",
+        max_statements=1,
+        max_bytes=1024,
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/comments",
+        "/posts/1/comments",
+        max_statements=7,
+        page_param="size",
+        max_item_bytes=1536,
+        user_id=VIEWER_ID,
+    ),
+    Case(
+        "GET",
+        "/posts/{post_id}/comments/{comment_id}/replies",
+        "/posts/1/comments/1/replies",
+        max_statements=6,
+        page_param="size",
+        max_item_bytes=384,
+        user_id=VIEWER_ID,
+    ),
+    Case("GET", "/vaults/{vault_id}", "/vaults/1", max_statements=3),
+    Case(
+        "GET",
+        "/vaults/{vault_id}/posts",
+        "/vaults/1/posts",
+        max_statements=4,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/vaults/{vault_id}/posts",
+        "/vaults/1/posts?order=position",
+        max_statements=4,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/vaults/{vault_id}/posts/recent",
+        "/vaults/1/posts/recent",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case("GET", "/users/{username}", "/users/owner", max_statements=1),
+    Case(
+        "POST",
+        "/users:batch",
+        "/users:batch",
+        max_statements=1,
+        json={"usernames": ["owner", "viewer", "missing"]},
+    ),
+    Case(
+        "GET",
+        "/users/{username}/posts",
+        "/users/owner/posts",
+        max_statements=4,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/users/{username}/posts/reactions",
+        "/users/viewer/posts/reactions",
+        max_statements=4,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/users/{username}/comments",
+        "/users/viewer/comments",
+        max_statements=6,
+        page_param="size",
+        max_item_bytes=384,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "GET",
+        "/users/{username}/vaults",
+        "/users/owner/vaults?post_id=1",
+        max_statements=7,
+        page_param="size",
+        max_item_bytes=640,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "GET",
+        "/users/{username}/profile-picture",
+        "/users/owner/profile-picture",
+        max_statements=1,
+        max_bytes=1024,
+    ),
+    Case(
+        "GET",
+        "/avatars/{avatar_id}/{size}.webp",
+        f"/avatars/{AVATAR_ID}/40.webp",
+        max_statements=0,
+        max_bytes=1024,
+    ),
+    Case(
+        "GET",
+        "/tags",
+        "/tags",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=64,
+    ),
+    Case(
+        "GET",
+        "/tags/{name}/related",
+        "/tags/tag1/related",
+        max_statements=2,
+        page_param="limit",
+        max_item_bytes=64,
+    ),
+    Case(
+        "GET",
+        "/feed/for-you",
+        "/feed/for-you",
+        max_statements=2,
+        page_param="size",
+        max_item_bytes=160,
+    ),
+    Case(
+        "GET",
+        "/feed/for-you",
+        "/feed/for-you",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+        user_id=VIEWER_ID,
+        name="GET /feed/for-you (signed in)",
+    ),
+    Case("GET", "/verify-token", "/verify-token", max_statements=1, user_id=OWNER_ID),
+    Case("GET", "/metrics", "/metrics", max_statements=0, max_bytes=1024 * 1024),
+    Case(
+        "POST",
+        "/login",
+        "/login",
+        max_statements=1,
+        json={"username": "owner", "password": PASSWORD},
+    ),
+    Case("POST", "/logout", "/logout", max_statements=0),
+    Case(
+        "POST",
+        "/users",
+        "/users",
+        max_statements=3,
+        json={"username": "newuser", "password": PASSWORD},
+    ),
+    Case(
+        "POST",
+        "/users/{username}/profile-picture",
+        "/users/owner/profile-picture",
+        max_statements=5,
+        user_id=OWNER_ID,
+        upload="file",
+    ),
+    Case(
+        "POST",
+        "/posts",
+        "/posts",
+        max_statements=10,
+        user_id=OWNER_ID,
+        data={"title": "new post"},
+        upload="files",
+    ),
+    Case(
+        "PUT",
+        "/posts/{post_id}",
+        "/posts/2",
+        max_statements=12,
+        user_id=OWNER_ID,
+        json={
+            "title": "updated",
+            "tags": [{"name": "tag1", "type": "general", "count": 0}],
+        },
+    ),
+    Case(
+        "POST",
+        "/posts/{post_id}/reactions",
+        "/posts/2/reactions",
+        max_statements=8,
+        user_id=VIEWER_ID,
+        json={"type": "dislike"},
+    ),
+    Case(
+        "POST",
+        "/posts/{post_id}/files",
+        f"/posts/{SCRATCH_POST_ID}/files",
+        max_statements=4,
+        user_id=OWNER_ID,
+        upload="files",
+    ),
+    Case(
+        "POST",
+        "/posts/{post_id}/comments",
+        "/posts/1/comments",
+        max_statements=12,
+        user_id=OWNER_ID,
+        json={"content": "reply", "parent_id": 2},
+    ),
+    Case(
+        "POST",
+        "/posts/{post_id}/comments/{comment_id}/reactions",
+        "/posts/1/comments/2/reactions",
+        max_statements=8,
+        user_id=OWNER_ID,
+        json={"type": "dislike"},
+    ),
+    Case(
+        "POST",
+        "/vaults",
+        "/vaults",
+        max_statements=7,
+        user_id=OWNER_ID,
+        json={"title": "new vault", "privacy": "public"},
+    ),
+    Case(
+        "PUT",
+        "/vaults/{vault_id}",
+        "/vaults/2",
+        max_statements=6,
+        user_id=OWNER_ID,
+        json={"title": "renamed", "privacy": "private"},
+    ),
+    Case(
+        "POST",
+        "/vaults/{vault_id}/posts",
+        f"/vaults/{SCRATCH_VAULT_ID}/posts",
+        max_statements=3,
+        user_id=OWNER_ID,
+        json={"post_ids": list(range(1, ITEMS + 1))},
+    ),
+    Case(
+        "POST",
+        "/vaults/{vault_id}/posts/{post_id}",
+        f"/vaults/{SCRATCH_VAULT_ID}/posts/{SCRATCH_POST_ID}",
+        max_statements=5,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "PUT",
+        "/vaults/{vault_id}/posts/{post_id}",
+        "/vaults/1/posts/1",
+        max_statements=3,
+        user_id=OWNER_ID,
+        json={"position": 3},
+    ),
+    Case(
+        "DELETE",
+        "/vaults/{vault_id}/posts",
+        f"/vaults/{SCRATCH_VAULT_ID}/posts",
+        max_statements=3,
+        user_id=OWNER_ID,
+        params={"post_ids": list(range(1, ITEMS + 1))},
+    ),
+    Case(
+        "DELETE",
+        "/vaults/{vault_id}/posts/{post_id}",
+        f"/vaults/{SCRATCH_VAULT_ID}/posts/{SCRATCH_POST_ID}",
+        max_statements=4,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "POST",
+        "/reports",
+        "/reports",
+        max_statements=6,
+        user_id=VIEWER_ID,
+        json={"detail": "spam", "target_id": 1, "target_type": "post"},
+    ),
+    Case(
+        "GET",
+        "/reports",
+        "/reports",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=160,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "GET",
+        "/reports/{target_type}/{target_id}",
+        "/reports/post/1",
+        max_statements=3,
+        page_param="size",
+        max_item_bytes=200,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "POST",
+        "/reports:resolve",
+        "/reports:resolve",
+        max_statements=2,
+        user_id=OWNER_ID,
+        json={"targets": [{"target_type": "post", "target_id": 1}]},
+    ),
+    Case("GET", "/posts/{post_id}/live", "/posts/1/live", max_statements=1),
+    Case(
+        "GET",
+        "/notifications",
+        "/notifications",
+        max_statements=2,
+        page_param="size",
+        max_item_bytes=224,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "GET",
+        "/notifications/unread-count",
+        "/notifications/unread-count",
+        max_statements=1,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "POST",
+        "/notifications:read",
+        "/notifications:read",
+        max_statements=3,
+        user_id=OWNER_ID,
+        json={"ids": [ITEMS]},
+    ),
+    Case(
+        "DELETE",
+        "/posts/{post_id}/comments/{comment_id}",
+        f"/posts/1/comments/{ITEMS + 1}",
+        max_statements=6,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "DELETE",
+        "/posts/{post_id}/files/{file_id}",
+        f"/posts/{SCRATCH_POST_ID}/files/{SCRATCH_POST_ID * 2}",
+        max_statements=7,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "DELETE",
+        "/vaults/{vault_id}",
+        f"/vaults/{SCRATCH_VAULT_ID}",
+        max_statements=5,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "DELETE",
+        "/posts/{post_id}",
+        f"/posts/{SCRATCH_POST_ID}",
+        max_statements=12,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "DELETE",
+        "/posts",
+        "/posts",
+        max_statements=12,
+        user_id=OWNER_ID,
+        json={"post_ids": [BULK_POST_ID, BULK_POST_ID + 1]},
+    ),
+    Case(
+        "GET",
+        "/jobs/{job_id}",
+        f"/jobs/{EXPORT_JOB_ID}",
+        max_statements=2,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "GET",
+        "/jobs/{job_id}/download",
+        f"/jobs/{EXPORT_JOB_ID}/download",
+        max_statements=2,
+        max_bytes=1024,
+        user_id=OWNER_ID,
+    ),
+    Case(
+        "POST",
+        "/users/{username}/export",
+        "/users/scratch/export",
+        max_statements=40,
+        user_id=SCRATCH_USER_ID,
+    ),
+    Case(
+        "DELETE",
+        "/users/{username}",
+        "/users/scratch",
+        max_statements=37,
+        user_id=SCRATCH_USER_ID,
+    ),
+]
+
+PAGINATED_CASES = [case for case in CASES if case.page_param]
+
+
+def request(client, case: Case, image: bytes, **params):
+    headers = auth_headers(case.user_id) if case.user_id else {}
+
+    files = None
+    if case.upload:
+        files = [(case.upload, ("upload.jpg", image, "image/jpeg"))]
+
+    return client.request(
+        case.method,
+        case.url,
+        headers=headers,
+        params={**case.params, **params},
+        json=case.json,
+        data=case.data,
+        files=files,
+    )
+
+
+def test_every_route_has_a_budget():
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    assert routes - {(case.method, case.route) for case in CASES} == set()
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.id)
+def test_query_budget(client, statements, image, case: Case):
+    params = {case.page_param: PAGE_SIZES[-1]} if case.page_param else {}
+    if case.method == "GET":
+        request(client, case, image, **params)
+        statements.clear()
+
+    response = request(client, case, image, **params)
+
+    assert response.status_code == 200, response.text
+    assert len(statements) <= case.max_statements, "\n\n".join(statements)
+    max_bytes = case.max_bytes + case.max_item_bytes * params.get(case.page_param, 0)
+    assert len(response.content) <= max_bytes
+
+
+@pytest.mark.parametrize("case", PAGINATED_CASES, ids=lambda case: case.id)
+def test_queries_do_not_grow_with_page_size(client, statements, image, case: Case):
+    counts = []
+    for size in PAGE_SIZES:
+        request(client, case, image, **{case.page_param: size})
+        statements.clear()
+        response = request(client, case, image, **{case.page_param: size})
+        assert response.status_code == 200, response.text
+        counts.append(len(statements))
+
+    assert counts[0] == counts[-1], f"{counts} statements for page sizes {PAGE_SIZES}"
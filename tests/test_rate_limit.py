@@ -0,0 +1,78 @@
+"""Token-bucket rate limiting and per-route admission control."""
+
+import pytest
+
+from app.config import settings
+from app.ratelimit import (
+    MemoryBackend,
+    RedisBackend,
+    concurrency_limiter,
+    rate_limiter,
+)
+from tests.conftest import VIEWER
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def register_script(self, script):
+        async def run(keys, args):
+            capacity, rate, now, cost = map(float, args)
+            bucket = self.hashes.get(keys[0], {})
+            tokens = bucket.get("tokens", capacity)
+            updated = bucket.get("updated", now)
+            tokens = min(capacity, tokens + max(0, now - updated) * rate)
+            retry_after = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            self.hashes[keys[0]] = {"tokens": tokens, "updated": now}
+            return str(retry_after).encode()
+
+        return run
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limited(request, monkeypatch):
+    backend = MemoryBackend()
+    if request.param == "redis":
+        backend = RedisBackend(FakeRedis())
+    monkeypatch.setattr(rate_limiter, "backend", backend)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CAPACITY", 10)
+    monkeypatch.setattr(settings, "RATE_LIMIT_REFILL_PER_SECOND", 0.01)
+    return backend
+
+
+def test_requests_over_budget_get_429(client, limited):
+    for _ in range(10):
+        assert client.get("/tags", headers=VIEWER).status_code == 200
+
+    response = client.get("/tags", headers=VIEWER)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+
+    assert client.get("/tags").status_code == 200
+
+
+def test_route_costs_are_weighted(client, limited):
+    for _ in range(2):
+        assert client.get("/posts", params={"query": "post"}).status_code == 200
+    assert client.get("/posts", params={"query": "post"}).status_code == 429
+    assert client.get("/posts").status_code == 429
+
+
+def test_concurrency_limit_rejects_with_503(client, limited, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CAPACITY", 100)
+    monkeypatch.setattr(settings, "CONCURRENCY_LIMITS", {"GET /posts?query": 1})
+    assert concurrency_limiter.acquire("GET /posts?query")
+    try:
+        response = client.get("/posts", params={"query": "post"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert client.get("/posts").status_code == 200
+    finally:
+        concurrency_limiter.release("GET /posts?query")
+    assert client.get("/posts", params={"query": "post"}).status_code == 200
@@ -0,0 +1,116 @@
+"""Write-behind reactions are flushed in batches without blocking request threads."""
+
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import reactions
+from app.config import settings
+from app.database import SessionLocal
+from app.enums import ReactionType
+from app.models import Post
+from app.reactions import ReactionBuffer, apply_reaction, get_reaction_type
+from tests.conftest import OWNER, VIEWER_ID, create_post
+
+
+def likes(post_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.get(Post, post_id).likes
+    finally:
+        db.close()
+
+
+def toggle(buffer: ReactionBuffer, user_id: int, post_id: int) -> ReactionType:
+    db = SessionLocal()
+    try:
+        liked = get_reaction_type(db, user_id, post_id) == ReactionType.LIKE
+        reaction_type = ReactionType.NONE if liked else ReactionType.LIKE
+        buffer.add(db, user_id, post_id, reaction_type)
+        return reaction_type
+    finally:
+        db.close()
+
+
+def test_flush_commits_without_blocking_readers(client):
+    buffer = ReactionBuffer()
+    toggle(buffer, VIEWER_ID, 5)
+    expected = likes(5) + buffer.delta(5)[0]
+    assert buffer.delta(5)[0] != 0
+
+    readers = []
+
+    def read(_):
+        reader = threading.Thread(target=buffer.delta, args=(5,))
+        reader.start()
+        reader.join(1)
+        readers.append(reader.is_alive())
+
+    event.listen(Session, "after_commit", read)
+    try:
+        buffer.flush()
+    finally:
+        event.remove(Session, "after_commit", read)
+
+    assert readers == [False]
+    assert likes(5) == expected
+    assert buffer.delta(5) == (0, 0)
+
+
+def test_reactions_on_deleted_posts_are_dropped(client, image):
+    post_id = create_post(client, OWNER, image, "gone")
+    buffer = ReactionBuffer()
+    toggle(buffer, VIEWER_ID, post_id)
+    client.delete(f"/posts/{post_id}", headers=OWNER)
+    reaction_type = toggle(buffer, VIEWER_ID, 3)
+
+    buffer.flush()
+    assert buffer.pending == {}
+    db = SessionLocal()
+    try:
+        assert get_reaction_type(db, VIEWER_ID, 3) == reaction_type
+    finally:
+        db.close()
+
+
+def test_failing_batches_are_dropped_after_max_attempts(client, monkeypatch):
+    def upsert_reactions(db, reactions):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(reactions, "upsert_reactions", upsert_reactions)
+    monkeypatch.setattr(settings, "REACTION_FLUSH_MAX_ATTEMPTS", 2)
+    buffer = ReactionBuffer()
+    toggle(buffer, VIEWER_ID, 3)
+    likes = buffer.delta(3)
+
+    buffer.flush()
+    assert buffer.pending and buffer.delta(3) == likes
+    buffer.flush()
+    assert buffer.pending == {}
+    assert buffer.delta(3) == (0, 0)
+
+
+def test_concurrent_first_reactions_are_counted_once(client, image):
+    post_id = create_post(client, OWNER, image, "double click")
+    start, errors = threading.Barrier(2), []
+
+    def react():
+        db = SessionLocal()
+        try:
+            start.wait()
+            apply_reaction(db, VIEWER_ID, post_id, ReactionType.LIKE)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=react) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert likes(post_id) == 1
+    client.delete(f"/posts/{post_id}", headers=OWNER)
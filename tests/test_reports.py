@@ -0,0 +1,88 @@
+"""Reports are deduplicated per user and aggregated into a moderation queue."""
+
+import pytest
+
+from tests.conftest import OWNER, VIEWER, register
+
+
+@pytest.fixture(scope="module")
+def reporter(client) -> dict:
+    return register(client, "reporter")
+
+
+def report(client, headers, target_type, target_id):
+    response = client.post(
+        "/reports",
+        json={"detail": "spam", "target_type": target_type, "target_id": target_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def queue(client, **params) -> list[tuple]:
+    response = client.get("/reports", params=params, headers=OWNER)
+    assert response.status_code == 200, response.text
+    return [
+        (item["target_type"], item["target_id"], item["report_count"])
+        for item in response.json()["items"]
+    ]
+
+
+def test_anonymous_reports_are_rejected(client):
+    response = client.post(
+        "/reports", json={"detail": "spam", "target_type": "post", "target_id": 1}
+    )
+    assert response.status_code == 401
+
+
+def test_queue_counts_each_reporter_once(client, reporter):
+    first = report(client, VIEWER, "comment", 7)
+    assert report(client, VIEWER, "comment", 7)["id"] == first["id"]
+    report(client, reporter, "comment", 7)
+    report(client, VIEWER, "comment", 8)
+
+    by_count = queue(client, target_type="comment")
+    assert by_count.index(("comment", 7, 2)) < by_count.index(("comment", 8, 1))
+    assert queue(client, target_type="comment", sort="recent")[0] == ("comment", 8, 1)
+
+    response = client.get("/reports/comment/7", headers=OWNER)
+    assert {item["user"]["username"] for item in response.json()["items"]} == {
+        "viewer",
+        "reporter",
+    }
+
+
+def test_only_moderators_see_the_queue(client):
+    assert client.get("/reports", headers=VIEWER).status_code == 403
+    resolve = {"targets": [{"target_type": "post", "target_id": 1}]}
+    response = client.post("/reports:resolve", json=resolve, headers=VIEWER)
+    assert response.status_code == 403
+
+
+def test_bulk_resolve_clears_targets_until_reported_again(client, reporter):
+    report(client, VIEWER, "post", 4)
+    report(client, VIEWER, "post", 5)
+    targets = [
+        {"target_type": "post", "target_id": 4},
+        {"target_type": "post", "target_id": 5},
+        {"target_type": "post", "target_id": 4},
+    ]
+    response = client.post("/reports:resolve", json={"targets": targets}, headers=OWNER)
+    assert response.json() == {"detail": "Reports resolved", "count": 2}
+    assert not {("post", 4), ("post", 5)} & {
+        (target_type, target_id) for target_type, target_id, _ in queue(client)
+    }
+
+    report(client, reporter, "post", 5)
+    assert ("post", 5, 1) in queue(client, target_type="post")
+
+
+def test_deleted_accounts_withdraw_their_reports(client, reporter):
+    flagger = register(client, "flagger")
+    report(client, reporter, "post", 6)
+    report(client, flagger, "post", 6)
+    assert ("post", 6, 2) in queue(client, target_type="post")
+
+    assert client.delete("/users/flagger", headers=flagger).status_code == 200
+    assert ("post", 6, 1) in queue(client, target_type="post")
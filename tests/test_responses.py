@@ -0,0 +1,29 @@
+"""Routes that build their payload from rows must still match their response model."""
+
+import pytest
+from fastapi_pagination import Page
+
+from app.schemas import CommentResponse, CommentThreadResponse, PostBase
+from tests.conftest import VIEWER
+
+
+@pytest.mark.parametrize(
+    "url, model",
+    [
+        ("/posts", Page[PostBase]),
+        ("/posts?query=post", Page[PostBase]),
+        ("/posts/1/comments", Page[CommentThreadResponse]),
+        ("/users/viewer/comments", Page[CommentResponse]),
+    ],
+)
+def test_row_payload_matches_response_model(client, url, model):
+    response = client.get(
+        url,
+        params={"size": 10, "page": 2},
+        headers=VIEWER,
+    )
+
+    assert response.status_code == 200, response.text
+    payload = response.json()
+    assert payload["items"]
+    assert model.model_validate(payload).model_dump(mode="json") == payload
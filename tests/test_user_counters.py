@@ -0,0 +1,62 @@
+"""Write paths keep the user counter columns in step with the rows they count."""
+
+from app.database import SessionLocal
+from app.user_stats import get_profile, reconcile_user_counters, update_user_counters
+from tests.conftest import OWNER, VIEWER, VIEWER_ID, create_post
+
+COUNTERS = ["post_count", "vault_count", "comment_count", "liked_posts"]
+
+
+def profile(client, username: str) -> dict:
+    response = client.get(f"/users/{username}")
+    assert response.status_code == 200, response.text
+    return {counter: response.json()[counter] for counter in COUNTERS}
+
+
+def test_write_paths_match_reconciled_counters(client, image):
+    before = profile(client, "viewer")
+
+    post_id = create_post(client, OWNER, image, "counted")
+    client.post(f"/posts/{post_id}/reactions", json={"type": "like"}, headers=VIEWER)
+    client.post(f"/posts/{post_id}/comments", json={"content": "hi"}, headers=VIEWER)
+    vault = {"title": "counted", "privacy": "public"}
+    client.post("/vaults", json=vault, headers=VIEWER)
+    assert profile(client, "viewer") == {
+        **before,
+        "vault_count": before["vault_count"] + 1,
+        "comment_count": before["comment_count"] + 1,
+        "liked_posts": before["liked_posts"] + 1,
+    }
+
+    client.delete(f"/posts/{post_id}", headers=OWNER)
+    counted = {name: profile(client, name) for name in ("owner", "viewer")}
+    assert counted["viewer"]["vault_count"] == before["vault_count"] + 1
+    assert counted["viewer"]["comment_count"] == before["comment_count"]
+    assert counted["viewer"]["liked_posts"] == before["liked_posts"]
+
+    db = SessionLocal()
+    try:
+        reconcile_user_counters(db)
+    finally:
+        db.close()
+    assert {name: profile(client, name) for name in counted} == counted
+
+
+def test_profiles_are_invalidated_when_counters_commit(client):
+    before = profile(client, "viewer")["post_count"]
+    db = SessionLocal()
+    try:
+        update_user_counters(db, "post_count", {VIEWER_ID: 1})
+        reader = SessionLocal()
+        try:
+            assert get_profile(reader, "viewer")["post_count"] == before
+        finally:
+            reader.close()
+        db.commit()
+        assert profile(client, "viewer")["post_count"] == before + 1
+
+        update_user_counters(db, "post_count", {VIEWER_ID: -1})
+        db.commit()
+        assert profile(client, "viewer")["post_count"] == before
+    finally:
+        db.close()